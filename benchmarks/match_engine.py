@@ -0,0 +1,109 @@
+# Compares matcher.engine against the aggregation pipelines on the live database:
+# checks that both return the same scores and reports per-query latency, then
+# compares the engine with and without skill-index pruning (also under every
+# profile with a min_score floor).
+# Usage: python benchmarks/match_engine.py [--queries N] [--top-n N] [--profile NAME]
+import sys
+import time
+import random
+import argparse
+import statistics
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "src"))
+
+from database.mongo import resume_collection, job_collection
+from matcher.matcher import match_resume_to_jobs, match_job_to_resumes
+from matcher.engine import MatchEngine
+from matcher.profiles import PROFILES
+
+
+def timed(fn, *args):
+    started = time.perf_counter()
+    result = fn(*args)
+    return result, (time.perf_counter() - started) * 1000
+
+
+def scores(results):
+    # Tie order is unspecified in $sort, so compare the score multiset
+    return sorted(r["total_score"] for r in results)
+
+
+def compare(label, ids, pipeline_fn, engine_fn, top_n, profile):
+    pipeline_ms, engine_ms, mismatches = [], [], 0
+    for doc_id in ids:
+        expected, ms = timed(pipeline_fn, doc_id, top_n, profile)
+        pipeline_ms.append(ms)
+        actual, ms = timed(engine_fn, doc_id, top_n, profile)
+        engine_ms.append(ms)
+        if scores(expected) != scores(actual):
+            mismatches += 1
+            print(f"   mismatch for {doc_id}: {scores(expected)} != {scores(actual)}")
+
+    if not ids:
+        print(f"{label}: no documents")
+        return
+
+    print(
+        f"{label}: {len(ids)} queries, {mismatches} mismatches | "
+        f"pipeline avg {statistics.mean(pipeline_ms):.1f} ms, "
+        f"engine avg {statistics.mean(engine_ms):.2f} ms"
+    )
+
+
+def compare_pruning(label, ids, engine, engine_fn, top_n, profile):
+    # Pruned and full scans must return the same shortlist, ties included
+    pruned_ms, full_ms, mismatches = [], [], 0
+    for doc_id in ids:
+        engine.pruning = True
+        pruned, ms = timed(engine_fn, doc_id, top_n, profile)
+        pruned_ms.append(ms)
+        engine.pruning = False
+        full, ms = timed(engine_fn, doc_id, top_n, profile)
+        full_ms.append(ms)
+        if pruned != full:
+            mismatches += 1
+
+    if ids:
+        print(
+            f"{label} pruning: {mismatches} mismatches | "
+            f"full scan avg {statistics.mean(full_ms):.2f} ms, "
+            f"pruned avg {statistics.mean(pruned_ms):.2f} ms"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check matcher.engine against the Mongo pipelines")
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--top-n", type=int, default=10)
+    parser.add_argument("--profile", default=None, help="scoring profile (default: SCORING_PROFILE)")
+    args = parser.parse_args()
+
+    engine, load_ms = timed(MatchEngine.from_mongo)
+    print(f"Engine loaded {len(engine.resumes)} resumes / {len(engine.jobs)} jobs in {load_ms:.0f} ms")
+
+    candidate_ids = [d["candidate_id"] for d in resume_collection.find({}, {"candidate_id": 1})]
+    job_ids = [d["job_id"] for d in job_collection.find({}, {"job_id": 1})]
+    random.seed(0)
+
+    resume_sample = random.sample(candidate_ids, min(args.queries, len(candidate_ids)))
+    job_sample = random.sample(job_ids, min(args.queries, len(job_ids)))
+
+    profile = args.profile
+    compare("resume → jobs", resume_sample, match_resume_to_jobs, engine.match_resume_to_jobs, args.top_n, profile)
+    compare("job → resumes", job_sample, match_job_to_resumes, engine.match_job_to_resumes, args.top_n, profile)
+
+    compare_pruning("resume → jobs", resume_sample, engine, engine.match_resume_to_jobs, args.top_n, profile)
+    compare_pruning("job → resumes", job_sample, engine, engine.match_job_to_resumes, args.top_n, profile)
+
+    # A min_score floor can rule out every block, leaving pruning with no candidates at all
+    for name, floor_profile in PROFILES.items():
+        if floor_profile.min_score is None or name == profile:
+            continue
+        compare_pruning(f"resume → jobs [{name}]", resume_sample, engine, engine.match_resume_to_jobs, args.top_n, name)
+        compare_pruning(f"job → resumes [{name}]", job_sample, engine, engine.match_job_to_resumes, args.top_n, name)
+
+
+if __name__ == "__main__":
+    main()
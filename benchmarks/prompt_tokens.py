@@ -0,0 +1,75 @@
+# Prompt size per document for each PROMPT_TECH_MODE.
+# Usage: python benchmarks/prompt_tokens.py [--kind resume|jd|all] [--limit N]
+import sys
+import argparse
+import statistics
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "src"))
+
+from parsers.pdf_extractor import extract_text_from_pdf
+from parsers import resume_parser, jd_parser
+
+try:
+    import tiktoken
+    _encoding = tiktoken.get_encoding("o200k_base")
+    TOKENIZER = "tiktoken o200k_base"
+
+    def count_tokens(text: str) -> int:
+        return len(_encoding.encode(text))
+except ImportError:
+    TOKENIZER = "estimate (chars / 4)"
+
+    def count_tokens(text: str) -> int:
+        return len(text) // 4
+
+MODES = ("full", "compact", "local")
+
+KINDS = {
+    "resume": (ROOT / "data/input/resumes", resume_parser.build_prompt),
+    "jd": (ROOT / "data/input/jd", jd_parser.build_prompt),
+}
+
+
+def benchmark(kind: str, limit: int):
+    directory, build_prompt = KINDS[kind]
+    files = sorted(p for p in directory.iterdir() if p.suffix.lower() == ".pdf")[:limit or None]
+
+    tokens = {mode: [] for mode in MODES}
+    for path in files:
+        text = extract_text_from_pdf(str(path))
+        if not text.strip():
+            continue
+        for mode in MODES:
+            tokens[mode].append(count_tokens(build_prompt(text, mode)))
+
+    docs = len(tokens["full"])
+    if not docs:
+        print(f"{kind}: no documents with text")
+        return
+
+    full_avg = statistics.mean(tokens["full"])
+    print(f"\n{kind} — {docs} documents")
+    print(f"   {'mode':<8} {'avg tokens':>10} {'median':>8} {'max':>8} {'vs full':>8}")
+    for mode in MODES:
+        avg = statistics.mean(tokens[mode])
+        print(
+            f"   {mode:<8} {avg:>10.0f} {statistics.median(tokens[mode]):>8.0f} "
+            f"{max(tokens[mode]):>8} {(avg - full_avg) / full_avg * 100:>7.1f}%"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Prompt tokens per document for each PROMPT_TECH_MODE")
+    parser.add_argument("--kind", choices=["resume", "jd", "all"], default="all")
+    parser.add_argument("--limit", type=int, default=0, help="max documents per kind (0 = all)")
+    args = parser.parse_args()
+
+    print(f"Tokenizer: {TOKENIZER}")
+    for kind in (["resume", "jd"] if args.kind == "all" else [args.kind]):
+        benchmark(kind, args.limit)
+
+
+if __name__ == "__main__":
+    main()
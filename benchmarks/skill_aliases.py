@@ -0,0 +1,72 @@
+# Measures config.skill_aliases on the live database: canonicalization throughput
+# (uncached and cached), and how many resume/job skill strings share a skill before
+# and after canonicalization (the matcher only scores shared skills).
+# Usage: python benchmarks/skill_aliases.py [--repeat N]
+import sys
+import time
+import argparse
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "src"))
+
+from database.mongo import resume_collection, job_collection
+from config.skill_aliases import SKILL_ALIASES, canonical_skills, canonicalize_skills
+
+SKILL_FIELDS = ("primary_skills", "secondary_skills")
+
+
+def raw_skills(collection):
+    skills = []
+    for doc in collection.find({}, {f: 1 for f in SKILL_FIELDS}):
+        for field in SKILL_FIELDS:
+            values = doc.get(field) or []
+            skills.extend(v for v in values if isinstance(v, str))
+    return skills
+
+
+def shared(resume_skills, job_skills):
+    return len(set(resume_skills) & set(job_skills))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Skill canonicalization throughput and recall")
+    parser.add_argument("--repeat", type=int, default=20, help="passes over the stored skills for timing")
+    args = parser.parse_args()
+
+    resume_skills = raw_skills(resume_collection)
+    job_skills = raw_skills(job_collection)
+    everything = resume_skills + job_skills
+    print(f"{len(SKILL_ALIASES)} alias keys | {len(resume_skills)} resume / {len(job_skills)} job skill strings")
+
+    if not everything:
+        return
+
+    canonical_skills.cache_clear()
+    started = time.perf_counter()
+    canonicalize_skills(everything)
+    cold = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for _ in range(args.repeat):
+        canonicalize_skills(everything)
+    warm = (time.perf_counter() - started) / args.repeat
+
+    print(
+        f"canonicalize: {len(everything) / cold:,.0f} skills/s uncached, "
+        f"{len(everything) / warm:,.0f} skills/s cached"
+    )
+
+    lower = [s.lower() for s in resume_skills], [s.lower() for s in job_skills]
+    canonical = canonicalize_skills(resume_skills), canonicalize_skills(job_skills)
+    print(
+        f"distinct skills: {len(set(lower[0] + lower[1]))} lowercased → "
+        f"{len(set(canonical[0] + canonical[1]))} canonical"
+    )
+    print(
+        f"skills shared by resumes and jobs: {shared(*lower)} lowercased → {shared(*canonical)} canonical"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+# Compares weighted skill scoring (JD importance of the shared skills) with the
+# binary primary/secondary intersection scoring on the live database.
+# Ranking quality has no labels to check against, so it is measured by how well the
+# shortlisted pairs cover the job's requirements: importance-weighted coverage and
+# coverage of its core skills (JD score >= CORE_SCORE). Latency is per query on the
+# in-process engine (pruned) and, with --pipeline, on the aggregation pipelines.
+# Usage: python benchmarks/skill_scoring.py [--queries N] [--top-n N] [--profile NAME] [--pipeline]
+import sys
+import time
+import random
+import argparse
+import statistics
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "src"))
+
+from matcher.engine import MatchEngine
+from matcher.matcher import match
+from matcher.normalize import SKILL_FIELDS, UNSCORED_IMPORTANCE
+from matcher.profiles import ScoringProfile, get_profile
+
+CORE_SCORE = 9
+
+
+def with_skill_scoring(profile, mode: str):
+    return ScoringProfile(
+        f"{profile.name}:{mode}",
+        weights=profile.weights,
+        components=profile.components,
+        experience_grace_years=profile.experience_grace_years,
+        experience_hard_filter=profile.experience_hard_filter,
+        min_score=profile.min_score,
+        skill_scoring=mode,
+    )
+
+
+def requirements(jobs, row):
+    # Job skill → importance over both skill fields
+    return {
+        skill: importance
+        for field in SKILL_FIELDS
+        for skill, importance in zip(jobs.values[row][field], jobs.importance[row][field])
+    }
+
+
+def coverage(required: dict, skills: set):
+    total = sum(required.values())
+    core = [s for s, importance in required.items() if importance >= CORE_SCORE]
+    weighted = sum(i for s, i in required.items() if s in skills) / total if total else 0.0
+    core_covered = sum(s in skills for s in core) / len(core) if core else None
+    return weighted, core_covered
+
+
+def skills_of(side, row):
+    return {s for field in SKILL_FIELDS for s in side.values[row][field]}
+
+
+def evaluate(engine, direction, ids, profile, top_n):
+    latencies, weighted, core, shortlists = [], [], [], {}
+    resumes, jobs = engine.resumes, engine.jobs
+
+    for doc_id in ids:
+        started = time.perf_counter()
+        results = engine.match(direction, doc_id, top_n, profile)
+        latencies.append((time.perf_counter() - started) * 1000)
+        shortlists[doc_id] = [r.get("job_id") or r.get("candidate_id") for r in results]
+
+        for result in results:
+            if direction == "job_to_resumes":
+                job_row, resume_row = jobs.position[doc_id], resumes.position[result["candidate_id"]]
+            else:
+                job_row, resume_row = jobs.position[result["job_id"]], resumes.position[doc_id]
+            w, c = coverage(requirements(jobs, job_row), skills_of(resumes, resume_row))
+            weighted.append(w)
+            if c is not None:
+                core.append(c)
+
+    return {
+        "avg_ms": statistics.mean(latencies) if latencies else 0.0,
+        "p95_ms": sorted(latencies)[int(len(latencies) * 0.95)] if latencies else 0.0,
+        "weighted_coverage": statistics.mean(weighted) if weighted else 0.0,
+        "core_coverage": statistics.mean(core) if core else 0.0,
+        "shortlists": shortlists,
+    }
+
+
+def pipeline_latency(direction, ids, profile, top_n):
+    latencies = []
+    for doc_id in ids:
+        started = time.perf_counter()
+        match(direction, doc_id, top_n, profile)
+        latencies.append((time.perf_counter() - started) * 1000)
+    return statistics.mean(latencies) if latencies else 0.0
+
+
+def overlap_at_n(a: dict, b: dict):
+    # Mean share of one shortlist that is also in the other
+    shares = [
+        len(set(a[k]) & set(b[k])) / max(len(a[k]), len(b[k]))
+        for k in a
+        if a[k] or b[k]
+    ]
+    return statistics.mean(shares) if shares else 1.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Weighted vs binary skill scoring")
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--top-n", type=int, default=10)
+    parser.add_argument("--profile", default=None, help="base scoring profile (default: SCORING_PROFILE)")
+    parser.add_argument("--pipeline", action="store_true", help="also time the aggregation pipelines")
+    args = parser.parse_args()
+
+    base = get_profile(args.profile)
+    modes = {mode: with_skill_scoring(base, mode) for mode in ("binary", "weighted")}
+
+    engine = MatchEngine.from_mongo()
+    print(f"Engine loaded {len(engine.resumes)} resumes / {len(engine.jobs)} jobs")
+    scored = sum(
+        any(i != UNSCORED_IMPORTANCE for f in SKILL_FIELDS for i in row[f])
+        for row in engine.jobs.importance
+    )
+    print(f"{scored} jobs carry JD skill scores")
+
+    random.seed(0)
+    for direction, side in (("job_to_resumes", engine.jobs), ("resume_to_jobs", engine.resumes)):
+        ids = random.sample(side.ids, min(args.queries, len(side.ids)))
+        results = {mode: evaluate(engine, direction, ids, profile, args.top_n) for mode, profile in modes.items()}
+
+        print(f"\n{direction} ({len(ids)} queries, top {args.top_n}):")
+        for mode, r in results.items():
+            line = (
+                f"  {mode:<8} engine avg {r['avg_ms']:.2f} ms, p95 {r['p95_ms']:.2f} ms | "
+                f"weighted coverage {r['weighted_coverage']:.3f}, core coverage {r['core_coverage']:.3f}"
+            )
+            if args.pipeline:
+                line += f" | pipeline avg {pipeline_latency(direction, ids, modes[mode], args.top_n):.1f} ms"
+            print(line)
+        print(f"  shortlist overlap@{args.top_n}: {overlap_at_n(results['binary']['shortlists'], results['weighted']['shortlists']):.3f}")
+
+
+if __name__ == "__main__":
+    main()
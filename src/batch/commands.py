@@ -0,0 +1,172 @@
+import sys
+import json
+import time
+import asyncio
+import contextlib
+from database.mongo import resume_collection, job_collection
+from matcher.matcher import match, compare_profiles
+from matcher.engine import get_engine
+from matcher.bulk import DIRECTIONS, iter_all_matches
+from matcher.profiles import get_profile
+from batch.sharding import in_shard, in_range, range_filter
+from config.settings import MATCH_ENGINE, INCREMENTAL_INGEST, RESUME_INPUT_DIR, JD_INPUT_DIR
+
+# Non-interactive commands behind `python src/main.py ingest|match ...`.
+# Results go out as JSON Lines (stdout or --output) one record at a time, as they
+# are produced; progress logging is moved to stderr so stdout stays pipeable.
+
+INGEST_KINDS = {
+    "resumes": ("resume", RESUME_INPUT_DIR),
+    "jds": ("jd", JD_INPUT_DIR),
+}
+
+MATCH_KINDS = {
+    "resume": {"direction": "resume_to_jobs", "collection": resume_collection, "key": "candidate_id"},
+    "job": {"direction": "job_to_resumes", "collection": job_collection, "key": "job_id"},
+}
+
+ID_SCAN_BATCH_SIZE = 1000
+
+
+class JsonLinesWriter:
+
+    def __init__(self, path: str = None):
+        self.path = None if path in (None, "-") else path
+        self.stream = None
+        self.count = 0
+
+    def __enter__(self):
+        # Bound before stdout is redirected to stderr
+        self.stream = open(self.path, "w", encoding="utf-8") if self.path else sys.stdout
+        return self
+
+    def __exit__(self, *exc):
+        if self.path:
+            self.stream.close()
+        else:
+            self.stream.flush()
+
+    def write(self, record: dict):
+        self.stream.write(json.dumps(record, default=str, ensure_ascii=False) + "\n")
+        self.stream.flush()
+        self.count += 1
+
+
+@contextlib.contextmanager
+def jsonl_output(path: str = None):
+    with JsonLinesWriter(path) as out, contextlib.redirect_stdout(sys.stderr):
+        yield out
+
+
+# -----------------------------
+# ingest resumes|jds
+# -----------------------------
+def ingest(name: str, directory: str = None, workers: int = None, full: bool = False,
+           shard=None, output: str = None) -> int:
+    # Imported here: the ingestion pipeline loads the LLM client, match commands do not need it
+    from ingestion.pipeline import run_ingestion
+
+    kind, default_directory = INGEST_KINDS[name]
+    write_errors = 0
+
+    with jsonl_output(output) as out:
+        # Records arrive from the writer's flush, so each one reflects the stored outcome
+        def on_result(record):
+            nonlocal write_errors
+            write_errors += "error" in record
+            out.write(record)
+
+        stats = asyncio.run(run_ingestion(
+            kind, directory or default_directory, INCREMENTAL_INGEST and not full,
+            llm_workers=workers, shard=shard, on_result=on_result
+        ))
+    return 1 if write_errors or any(s.errors for s in stats) else 0
+
+
+# -----------------------------
+# match resume|job
+# -----------------------------
+def read_ids(ids=(), ids_file: str = None):
+    yield from ids
+    if ids_file:
+        stream = sys.stdin if ids_file == "-" else open(ids_file, encoding="utf-8")
+        try:
+            for line in stream:
+                line = line.strip()
+                if line:
+                    yield line
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+
+
+def scan_ids(spec: dict, id_range=None):
+    # Every stored id in key order, streamed from the unique key index
+    cursor = spec["collection"].find(
+        range_filter(spec["key"], id_range), {"_id": 0, spec["key"]: 1}
+    ).sort(spec["key"], 1).batch_size(ID_SCAN_BATCH_SIZE)
+    for doc in cursor:
+        if doc.get(spec["key"]):
+            yield doc[spec["key"]]
+
+
+def match_ids(kind: str, ids=(), ids_file: str = None, top_n: int = 5, profile=None,
+              shard=None, id_range=None, output: str = None, profiles=None) -> int:
+    # With several profiles (A/B) each record's matches are {profile name: shortlist}
+    spec = MATCH_KINDS[kind]
+    direction = spec["direction"]
+    profile = get_profile(profile)
+    profiles = [get_profile(p) for p in profiles] if profiles else None
+    source = read_ids(ids, ids_file) if ids or ids_file else scan_ids(spec, id_range)
+    failures = 0
+    started = time.perf_counter()
+
+    with jsonl_output(output) as out:
+        engine = get_engine() if MATCH_ENGINE == "memory" else None
+
+        for doc_id in source:
+            if not (in_shard(doc_id, shard) and in_range(doc_id, id_range)):
+                continue
+            try:
+                if profiles and engine is not None:
+                    matches = engine.compare_profiles(direction, doc_id, profiles, top_n)
+                elif profiles:
+                    matches = compare_profiles(direction, doc_id, profiles, top_n)
+                elif engine is not None:
+                    matches = engine.match(direction, doc_id, top_n, profile)
+                else:
+                    matches = match(direction, doc_id, top_n, profile)
+            except Exception as e:
+                failures += 1
+                out.write({"direction": direction, "source_id": doc_id, "error": str(e)})
+                continue
+            out.write({"direction": direction, "source_id": doc_id, "matches": matches})
+
+        print(
+            f"🔗 Matched {out.count - failures} {kind}s ({failures} failed) "
+            f"in {time.perf_counter() - started:.1f}s"
+        )
+    return 1 if failures else 0
+
+
+# -----------------------------
+# match all
+# -----------------------------
+def match_all_pairs(top_n: int = 5, profile=None, directions=DIRECTIONS, shard=None,
+                    id_range=None, output: str = None) -> int:
+    # Streams every shortlist of the selected rows; nothing is written to the matches collection
+    started = time.perf_counter()
+
+    with jsonl_output(output) as out:
+        engine = get_engine()
+        for direction in directions:
+            queries = engine.jobs if direction == "job_to_resumes" else engine.resumes
+            rows = [
+                row for row, doc_id in enumerate(queries.ids)
+                if in_shard(doc_id, shard) and in_range(doc_id, id_range)
+            ]
+            for shortlist in iter_all_matches(engine, top_n, (direction,), rows, profile):
+                out.write(shortlist)
+
+        print(f"🔗 Streamed {out.count} shortlists in {time.perf_counter() - started:.1f}s")
+    return 0
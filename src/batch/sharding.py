@@ -0,0 +1,51 @@
+import zlib
+import argparse
+
+# Work splitting for batch commands run as many processes / hosts:
+#   --shard K/N      stable hash of the id (or file name) → every id lands in exactly one shard
+#   --id-range A:B   half-open key range [A, B); either end may be empty
+
+
+def parse_shard(text: str):
+    try:
+        index, count = (int(part) for part in text.split("/"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected K/N, got {text!r}")
+    if count < 1 or not 0 <= index < count:
+        raise argparse.ArgumentTypeError(f"shard index must be in 0..N-1, got {text!r}")
+    return index, count
+
+
+def parse_id_range(text: str):
+    if ":" not in text:
+        raise argparse.ArgumentTypeError(f"expected START:END, got {text!r}")
+    start, end = text.split(":", 1)
+    return start or None, end or None
+
+
+def in_shard(value, shard) -> bool:
+    # crc32 rather than hash(): the same id must map to the same shard on every host
+    if shard is None:
+        return True
+    index, count = shard
+    return zlib.crc32(str(value).encode("utf-8")) % count == index
+
+
+def in_range(value, id_range) -> bool:
+    if id_range is None:
+        return True
+    start, end = id_range
+    return (start is None or value >= start) and (end is None or value < end)
+
+
+def range_filter(key: str, id_range) -> dict:
+    # The same range as a Mongo filter, so unsharded id scans stay index-bounded
+    if id_range is None:
+        return {}
+    start, end = id_range
+    bounds = {}
+    if start is not None:
+        bounds["$gte"] = start
+    if end is not None:
+        bounds["$lt"] = end
+    return {key: bounds} if bounds else {}
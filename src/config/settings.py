@@ -3,20 +3,126 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
+# Credentials and MONGO_URI are read through get_env by the Mongo / LLM client factories
+# when first used, so match-only processes import this module without any credentials
 def get_env(key):
     value = os.getenv(key)
     if not value:
         raise ValueError(f"{key} not set in environment variables")
     return value
 
-AZURE_OPENAI_API_KEY = get_env("AZURE_OPENAI_API_KEY")
-AZURE_OPENAI_ENDPOINT = get_env("AZURE_OPENAI_ENDPOINT")
-AZURE_OPENAI_DEPLOYMENT = get_env("AZURE_OPENAI_DEPLOYMENT_NAME")
-AZURE_OPENAI_API_VERSION = get_env("AZURE_OPENAI_API_VERSION")
-MONGO_URI = get_env("MONGO_URI")
+AZURE_OPENAI_DEPLOYMENT = os.getenv("AZURE_OPENAI_DEPLOYMENT_NAME")
 
 RESUME_INPUT_DIR = "data/input/resumes"
 JD_INPUT_DIR = "data/input/jd"
 
 
-AZURE_CONCURRENCY = 10
\ No newline at end of file
+AZURE_CONCURRENCY = 10
+
+# Parse cache (LLM results keyed by extracted text + prompt version + deployment)
+PARSE_CACHE_ENABLED = os.getenv("PARSE_CACHE_ENABLED", "true").lower() == "true"
+PARSE_CACHE_MAX_ENTRIES = int(os.getenv("PARSE_CACHE_MAX_ENTRIES", "200000"))
+PARSE_CACHE_TTL_DAYS = int(os.getenv("PARSE_CACHE_TTL_DAYS", "90"))
+
+# PDF text extraction runs in a process pool so it never blocks the event loop
+PDF_EXTRACT_WORKERS = int(os.getenv("PDF_EXTRACT_WORKERS", str(os.cpu_count() or 1)))
+
+# Optional caps for oversized documents (0 = no limit)
+PDF_MAX_PAGES = int(os.getenv("PDF_MAX_PAGES", "0"))
+PDF_MAX_CHARS = int(os.getenv("PDF_MAX_CHARS", "0"))
+
+# Threads used to run blocking pymongo calls for the async parsers
+MONGO_IO_THREADS = int(os.getenv("MONGO_IO_THREADS", "8"))
+
+# Buffered bulk writes for parsed documents
+BULK_WRITE_BATCH_SIZE = int(os.getenv("BULK_WRITE_BATCH_SIZE", "500"))
+BULK_WRITE_FLUSH_SECONDS = float(os.getenv("BULK_WRITE_FLUSH_SECONDS", "2"))
+
+# Only enqueue input files that are new or changed since the last successful run
+INCREMENTAL_INGEST = os.getenv("INCREMENTAL_INGEST", "true").lower() == "true"
+
+# Ingestion pipeline: bounded queues between stages and workers per stage
+PIPELINE_QUEUE_SIZE = int(os.getenv("PIPELINE_QUEUE_SIZE", "64"))
+PIPELINE_EXTRACT_WORKERS = int(os.getenv("PIPELINE_EXTRACT_WORKERS", str(PDF_EXTRACT_WORKERS)))
+PIPELINE_NORMALIZE_WORKERS = int(os.getenv("PIPELINE_NORMALIZE_WORKERS", "2"))
+PIPELINE_WRITE_WORKERS = int(os.getenv("PIPELINE_WRITE_WORKERS", "2"))
+
+# Distributed ingestion queue (ingestion.work_queue): lease length, heartbeat interval,
+# attempts before an item is marked failed, base retry delay, idle poll interval
+QUEUE_LEASE_SECONDS = float(os.getenv("QUEUE_LEASE_SECONDS", "300"))
+QUEUE_HEARTBEAT_SECONDS = float(os.getenv("QUEUE_HEARTBEAT_SECONDS", "60"))
+QUEUE_MAX_ATTEMPTS = int(os.getenv("QUEUE_MAX_ATTEMPTS", "5"))
+QUEUE_RETRY_DELAY_SECONDS = float(os.getenv("QUEUE_RETRY_DELAY_SECONDS", "30"))
+QUEUE_POLL_SECONDS = float(os.getenv("QUEUE_POLL_SECONDS", "5"))
+
+# Offline batch ingestion (ingestion.batch_mode): "azure" = Azure OpenAI Batch API,
+# "local" = file-based stand-in under BATCH_DIR. The batch deployment defaults to the live one.
+BATCH_BACKEND = os.getenv("BATCH_BACKEND", "azure").lower()
+BATCH_DIR = os.getenv("BATCH_DIR", "data/batch")
+AZURE_OPENAI_BATCH_DEPLOYMENT = os.getenv("AZURE_OPENAI_BATCH_DEPLOYMENT", "")
+BATCH_MAX_REQUESTS = int(os.getenv("BATCH_MAX_REQUESTS", "50000"))
+BATCH_POLL_SECONDS = float(os.getenv("BATCH_POLL_SECONDS", "60"))
+
+# Adaptive rate limiting for Azure OpenAI (0 = no client-side RPM/TPM cap)
+AZURE_RPM_LIMIT = int(os.getenv("AZURE_RPM_LIMIT", "0"))
+AZURE_TPM_LIMIT = int(os.getenv("AZURE_TPM_LIMIT", "0"))
+AZURE_MIN_CONCURRENCY = int(os.getenv("AZURE_MIN_CONCURRENCY", "1"))
+AZURE_MAX_CONCURRENCY = int(os.getenv("AZURE_MAX_CONCURRENCY", "50"))
+LLM_TARGET_LATENCY_SECONDS = float(os.getenv("LLM_TARGET_LATENCY_SECONDS", "30"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "6"))
+LLM_BACKOFF_BASE_SECONDS = float(os.getenv("LLM_BACKOFF_BASE_SECONDS", "1"))
+LLM_BACKOFF_MAX_SECONDS = float(os.getenv("LLM_BACKOFF_MAX_SECONDS", "60"))
+LLM_EST_COMPLETION_TOKENS = int(os.getenv("LLM_EST_COMPLETION_TOKENS", "1500"))
+
+# LLM stage workers cap how far the adaptive limiter can raise concurrency
+PIPELINE_LLM_WORKERS = int(os.getenv("PIPELINE_LLM_WORKERS", str(AZURE_MAX_CONCURRENCY)))
+
+# How the technology/category mapping is sent to the LLM:
+# full = whole mapping (default), compact = minified subset from keyword hits,
+# local = none (classified after extraction); compact and local are opt-in
+PROMPT_TECH_MODE = os.getenv("PROMPT_TECH_MODE", "full").lower()
+PROMPT_TECH_SUBSET_SIZE = int(os.getenv("PROMPT_TECH_SUBSET_SIZE", "6"))
+
+# Matching backend: "mongo" (aggregation pipelines) or "memory" (matcher.engine)
+MATCH_ENGINE = os.getenv("MATCH_ENGINE", "mongo").lower()
+
+# Bulk all-pairs matching: score cells per block (rows × candidates) and write batch size
+MATCH_BLOCK_CELLS = int(os.getenv("MATCH_BLOCK_CELLS", "2000000"))
+MATCH_WRITE_BATCH_SIZE = int(os.getenv("MATCH_WRITE_BATCH_SIZE", "1000"))
+
+# Inverted skill index: prune candidates that cannot reach the top-N before scoring
+SKILL_INDEX_PRUNING = os.getenv("SKILL_INDEX_PRUNING", "true").lower() == "true"
+SKILL_INDEX_CHUNK_SIZE = int(os.getenv("SKILL_INDEX_CHUNK_SIZE", "5000"))
+# Largest candidate id list a pruned Mongo query carries before using the plain prefilter
+SKILL_INDEX_MAX_IDS = int(os.getenv("SKILL_INDEX_MAX_IDS", "50000"))
+
+# Match result cache (LRU + TTL), invalidated from per-collection change counters
+MATCH_CACHE_ENABLED = os.getenv("MATCH_CACHE_ENABLED", "true").lower() == "true"
+MATCH_CACHE_MAX_ENTRIES = int(os.getenv("MATCH_CACHE_MAX_ENTRIES", "10000"))
+MATCH_CACHE_TTL_SECONDS = float(os.getenv("MATCH_CACHE_TTL_SECONDS", "600"))
+MATCH_CACHE_POLL_SECONDS = float(os.getenv("MATCH_CACHE_POLL_SECONDS", "2"))
+CHANGE_LOG_SIZE = int(os.getenv("CHANGE_LOG_SIZE", "100"))
+
+# CLI candidate/job pickers: rows per keyset page
+LIST_PAGE_SIZE = int(os.getenv("LIST_PAGE_SIZE", "20"))
+
+# Long-running match service (python src/main.py serve)
+SERVICE_HOST = os.getenv("SERVICE_HOST", "127.0.0.1")
+SERVICE_PORT = int(os.getenv("SERVICE_PORT", "8080"))
+SERVICE_REFRESH_SECONDS = float(os.getenv("SERVICE_REFRESH_SECONDS", "5"))
+# A side's engine rebuild is O(all its documents): at most one per side per this interval
+SERVICE_REBUILD_SECONDS = float(os.getenv("SERVICE_REBUILD_SECONDS", "60"))
+SERVICE_MAX_BODY_BYTES = int(os.getenv("SERVICE_MAX_BODY_BYTES", str(10 * 1024 * 1024)))
+
+# Experience fit: full score when the requirement is met, linear decay for candidates
+# up to EXPERIENCE_GRACE_YEARS short; anyone further short is filtered out when the
+# hard filter is on (pushed into the $match prefilter)
+EXPERIENCE_GRACE_YEARS = float(os.getenv("EXPERIENCE_GRACE_YEARS", "2"))
+EXPERIENCE_HARD_FILTER = os.getenv("EXPERIENCE_HARD_FILTER", "true").lower() == "true"
+
+# Scoring profiles (scoring_profiles.json at the repo root unless overridden)
+SCORING_PROFILE = os.getenv("SCORING_PROFILE", "default")
+SCORING_PROFILES_PATH = os.getenv("SCORING_PROFILES_PATH", "")
+
+# Skill alias dictionary (skill_aliases.json at the repo root unless overridden)
+SKILL_ALIASES_PATH = os.getenv("SKILL_ALIASES_PATH", "")
@@ -0,0 +1,124 @@
+from pathlib import Path
+from functools import lru_cache
+import json
+import re
+from config.settings import SKILL_ALIASES_PATH
+from config.tech_mapping import TECH_CATEGORIES_LIST, split_terms
+
+# Canonical skill IDs shared by both parsers and the matcher's norm fields.
+#
+# Every technology / category in technologies_categories.json is a canonical skill;
+# skill_aliases.json (canonical → aliases) adds spelling variants and wins on
+# conflicts. Names are compared by skill_key, so "Node.JS", "node js" and "nodejs"
+# only differ in the alias entries, not in casing or punctuation.
+#
+# Lookups are a dict hit on the key; strings that hold several skills
+# ("Java/Spring Boot", "HTML and CSS") are split with a word trie, longest match first.
+
+# Words allowed between skills in one string
+_CONNECTORS = {"and", "or", "with"}
+
+_END = ""
+
+
+def skill_key(text: str) -> str:
+    # "C++" → "c plus plus", "C#" → "c sharp", ".NET" → "dot net", "Node.js" → "node js"
+    text = (text or "").lower().replace("+", " plus ").replace("#", " sharp ")
+    text = re.sub(r"(^|[^a-z0-9])\.(?=[a-z0-9])", r"\1 dot ", text)
+    return " ".join(re.sub(r"[^a-z0-9]+", " ", text).split())
+
+
+def _canonical_name(name: str) -> str:
+    return " ".join(name.lower().split())
+
+
+def _load_custom():
+    root = Path(__file__).resolve().parents[2]
+    p = Path(SKILL_ALIASES_PATH) if SKILL_ALIASES_PATH else root / "skill_aliases.json"
+    try:
+        return json.loads(p.read_text(encoding="utf-8"))
+    except FileNotFoundError:
+        return {}
+    except Exception as e:
+        print(f"⚠ Could not load skill aliases from {p}: {e}")
+        return {}
+
+
+def _build():
+    aliases = {}
+
+    for item in TECH_CATEGORIES_LIST:
+        if not isinstance(item, dict):
+            continue
+        for name in [item.get("Technology", "")] + item.get("Categories", []):
+            for term in split_terms(name):
+                canonical = _canonical_name(term)
+                aliases.setdefault(skill_key(canonical), canonical)
+
+    for canonical, names in _load_custom().items():
+        canonical = _canonical_name(canonical)
+        for name in [canonical] + list(names or []):
+            key = skill_key(name)
+            if key:
+                aliases[key] = canonical
+
+    trie = {}
+    for key, canonical in aliases.items():
+        node = trie
+        for word in key.split():
+            node = node.setdefault(word, {})
+        node[_END] = canonical
+
+    return aliases, trie
+
+
+SKILL_ALIASES, _SKILL_TRIE = _build()
+
+
+def _scan(words):
+    # Longest-match walk of the word trie; None unless every word is part of a
+    # skill or a connector
+    found, i = [], 0
+    while i < len(words):
+        node, match, j = _SKILL_TRIE, None, i
+        while j < len(words) and words[j] in node:
+            node = node[words[j]]
+            j += 1
+            if _END in node:
+                match = (node[_END], j)
+
+        if match:
+            found.append(match[0])
+            i = match[1]
+        elif words[i] in _CONNECTORS:
+            i += 1
+        else:
+            return None
+    return found
+
+
+@lru_cache(maxsize=100_000)
+def canonical_skills(skill: str) -> tuple:
+    # Canonical IDs for one extracted skill string; unknown skills keep their key
+    key = skill_key(skill)
+    if not key:
+        return ()
+
+    canonical = SKILL_ALIASES.get(key)
+    if canonical:
+        return (canonical,)
+
+    found = _scan(key.split())
+    if found:
+        return tuple(dict.fromkeys(found))
+    return (key,)
+
+
+def canonicalize_skills(skills) -> list:
+    # Canonical IDs of a list of skill strings, de-duplicated, order kept
+    seen = {}
+    for skill in skills or []:
+        if isinstance(skill, str):
+            for canonical in canonical_skills(skill):
+                seen.setdefault(canonical, None)
+    return list(seen)
@@ -1,5 +1,7 @@
 from pathlib import Path
+from collections import Counter
 import json
+import re
 
 
 def _load():
@@ -18,3 +20,114 @@ TECH_CATEGORIES_MAP = {
     for item in TECH_CATEGORIES_LIST
     if isinstance(item, dict)
 }
+TECH_CATEGORIES_MIN_STR = json.dumps(TECH_CATEGORIES_LIST, separators=(",", ":"))
+
+
+# -----------------------------
+# Keyword index over the mapping
+# -----------------------------
+# Mapping entries too generic to say anything about a document on their own
+_GENERIC_TERMS = {"others", "core", "backend", "full stack", "other automation tool", "monitoring"}
+
+
+def split_terms(name: str):
+    # "Maven/Gradle" → ["maven", "gradle"], "Selenium - Java" → ["selenium", "java"]
+    parts = re.split(r"/|\s-\s|[()]", name.lower())
+    return [
+        p.strip() for p in parts
+        if len(p.strip()) >= 2 and p.strip() not in _GENERIC_TERMS
+    ]
+
+
+def _build_keywords():
+    # term → list of (technology, category or None)
+    keywords = {}
+    for item in TECH_CATEGORIES_LIST:
+        if not isinstance(item, dict):
+            continue
+        technology = item.get("Technology", "")
+        for term in split_terms(technology):
+            keywords.setdefault(term, []).append((technology, None))
+        for category in item.get("Categories", []):
+            for term in split_terms(category):
+                keywords.setdefault(term, []).append((technology, category))
+    return keywords
+
+
+TECH_KEYWORDS = _build_keywords()
+
+# Longest terms first so "spring boot" wins over "spring"; boundaries allow "c++", ".net"
+TECH_KEYWORD_PATTERN = re.compile(
+    r"(?<![a-z0-9])("
+    + "|".join(re.escape(t) for t in sorted(TECH_KEYWORDS, key=len, reverse=True))
+    + r")(?![a-z0-9])"
+) if TECH_KEYWORDS else None
+
+
+def mapping_hits(text: str, weight: float = 1.0, technologies=None, categories=None):
+    technologies = technologies if technologies is not None else Counter()
+    categories = categories if categories is not None else Counter()
+    if not TECH_KEYWORD_PATTERN or not text:
+        return technologies, categories
+
+    for term in TECH_KEYWORD_PATTERN.findall(text.lower()):
+        for technology, category in TECH_KEYWORDS[term]:
+            technologies[technology] += weight
+            if category:
+                categories[(technology, category)] += weight
+    return technologies, categories
+
+
+# -----------------------------
+# Compact prompt mapping
+# -----------------------------
+def select_mapping_subset(text: str, max_technologies: int = 6):
+    technologies, _ = mapping_hits(text)
+    top = {t for t, _ in technologies.most_common(max_technologies)}
+    return [
+        item for item in TECH_CATEGORIES_LIST
+        if isinstance(item, dict) and item.get("Technology") in top
+    ]
+
+
+LOCAL_CLASSIFICATION_NOTE = (
+    "Not provided: technology and category are assigned after extraction. "
+    "Return \"Others\" for both and an empty justification."
+)
+
+
+def mapping_for_prompt(text: str, mode: str, full, max_technologies: int = 6):
+    # full: the whole mapping as before; compact: minified subset picked from keyword
+    # hits in the text; local: no mapping, classify_locally runs after extraction
+    if mode == "local":
+        return LOCAL_CLASSIFICATION_NOTE
+    if mode == "compact":
+        subset = select_mapping_subset(text, max_technologies)
+        if subset:
+            return json.dumps(subset, separators=(",", ":"))
+        return TECH_CATEGORIES_MIN_STR
+    return full
+
+
+# -----------------------------
+# Local classification
+# -----------------------------
+def classify_locally(weighted_terms):
+    # weighted_terms: iterable of (text, weight), e.g. parsed skills
+    technologies, categories = Counter(), Counter()
+    for term, weight in weighted_terms:
+        if isinstance(term, str):
+            mapping_hits(term, weight, technologies, categories)
+
+    if not technologies:
+        return "Others", "Others", ""
+
+    technology = technologies.most_common(1)[0][0]
+    in_technology = [(c, n) for (t, c), n in categories.items() if t == technology]
+    category = max(in_technology, key=lambda x: x[1])[0] if in_technology else "Others"
+
+    justification = (
+        f"Classified locally from skill matches: {technology} "
+        f"({technologies[technology]:g} weighted hits), category {category}."
+    )
+    return technology, category, justification
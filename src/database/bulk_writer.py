@@ -0,0 +1,133 @@
+import asyncio
+from pymongo.errors import BulkWriteError
+from config.settings import BULK_WRITE_BATCH_SIZE, BULK_WRITE_FLUSH_SECONDS
+
+
+class BulkWriter:
+    # Buffers write operations and sends them as unordered bulk_write batches,
+    # flushing whenever the buffer is full or the flush interval elapses.
+    # on_flush(keys), if given, is awaited after each batch with the keys passed to add()
+    # whose operations were applied; on_error(failed), with (key, error message) pairs for
+    # the operations that failed (all of them when the whole batch failed). A key belongs
+    # to one add() call, so operations sharing a key are still reported one by one.
+
+    def __init__(
+        self,
+        collection,
+        name: str,
+        batch_size: int = BULK_WRITE_BATCH_SIZE,
+        flush_interval: float = BULK_WRITE_FLUSH_SECONDS,
+        on_flush=None,
+        on_error=None
+    ):
+        self.collection = collection
+        self.name = name
+        self.batch_size = max(batch_size, 1)
+        self.flush_interval = flush_interval
+        self.on_flush = on_flush
+        self.on_error = on_error
+
+        self._buffer = []
+        self._keys = []
+        self._lock = asyncio.Lock()
+        self._flusher = None
+
+        self.batches = 0
+        self.totals = {"operations": 0, "upserted": 0, "modified": 0, "matched": 0, "errors": 0}
+
+    async def __aenter__(self):
+        self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    def start(self):
+        if self._flusher is None and self.flush_interval > 0:
+            self._flusher = asyncio.create_task(self._flush_periodically())
+
+    async def add(self, operation, key=None):
+        self._buffer.append(operation)
+        if key is not None:
+            # Position in the batch, matched against the writeErrors indexes
+            self._keys.append((len(self._buffer) - 1, key))
+        if len(self._buffer) >= self.batch_size:
+            await self.flush()
+
+    async def flush(self):
+        async with self._lock:
+            if not self._buffer:
+                return
+            batch, self._buffer = self._buffer, []
+            keys, self._keys = self._keys, []
+            self.batches += 1
+            batch_no = self.batches
+
+        errors = 0
+        failed = {}
+        try:
+            result = await self.collection.bulk_write(batch, ordered=False)
+            counts = result.bulk_api_result
+        except BulkWriteError as e:
+            # Unordered: everything except the failed operations was applied
+            counts = e.details
+            errors = len(counts.get("writeErrors", []))
+            failed = {err.get("index"): err.get("errmsg") for err in counts.get("writeErrors", [])}
+            for err in counts.get("writeErrors", [])[:5]:
+                print(f"❌ {self.name} batch {batch_no} op {err.get('index')}: {err.get('errmsg')}")
+        except Exception as e:
+            counts = {}
+            errors = len(batch)
+            failed = {index: str(e) for index in range(len(batch))}
+            print(f"❌ {self.name} batch {batch_no} failed: {e}")
+
+        upserted = counts.get("nUpserted", 0)
+        modified = counts.get("nModified", 0)
+        matched = counts.get("nMatched", 0)
+
+        self.totals["operations"] += len(batch)
+        self.totals["upserted"] += upserted
+        self.totals["modified"] += modified
+        self.totals["matched"] += matched
+        self.totals["errors"] += errors
+
+        print(
+            f"📦 {self.name} batch {batch_no}: {len(batch)} ops | "
+            f"{upserted} upserted, {matched} matched, {modified} modified, {errors} errors"
+        )
+
+        written = [key for index, key in keys if index not in failed]
+        if self.on_flush is not None and written:
+            try:
+                await self.on_flush(written)
+            except Exception as e:
+                print(f"⚠ {self.name} batch {batch_no}: change notification failed: {e}")
+
+        not_written = [(key, failed[index]) for index, key in keys if index in failed]
+        if self.on_error is not None and not_written:
+            try:
+                await self.on_error(not_written)
+            except Exception as e:
+                print(f"⚠ {self.name} batch {batch_no}: failure notification failed: {e}")
+
+    async def _flush_periodically(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    async def close(self):
+        if self._flusher is not None:
+            self._flusher.cancel()
+            try:
+                await self._flusher
+            except asyncio.CancelledError:
+                pass
+            self._flusher = None
+
+        await self.flush()
+
+        t = self.totals
+        print(
+            f"📦 {self.name}: {self.batches} batches, {t['operations']} ops | "
+            f"{t['upserted']} upserted, {t['matched']} matched, {t['modified']} modified, {t['errors']} errors"
+        )
@@ -0,0 +1,68 @@
+from database.mongo import resume_collection, job_collection
+from config.settings import LIST_PAGE_SIZE
+
+# Bounded listing for the CLI pickers: keyset pages on the unique business key
+# (never skip/offset) and a projection of only the displayed fields.
+#
+# Search is an exact match on "search_terms", a lowercased multikey field written
+# next to the parsed document (and by backfill-norm): every searchable value plus
+# each of its words, so "smith" or "john smith" finds "John Smith", "smi" does not.
+# Exact terms keep a page on the (search_terms, key) index in key order, so it stops
+# after page_size + 1 keys; a prefix range would have to collect and sort every match.
+
+SEARCH_FIELD = "search_terms"
+
+LISTINGS = {
+    "resume": {
+        "collection": resume_collection,
+        "key": "candidate_id",
+        "fields": ("name", "email", "technology"),
+    },
+    "jd": {
+        "collection": job_collection,
+        "key": "job_id",
+        "fields": ("job_id", "technology"),
+    },
+}
+
+SEARCH_SOURCE_FIELDS = tuple(dict.fromkeys(
+    field for spec in LISTINGS.values() for field in spec["fields"]
+))
+
+
+def search_terms(doc: dict) -> dict:
+    terms = []
+    for field in SEARCH_SOURCE_FIELDS:
+        values = doc.get(field)
+        for value in values if isinstance(values, list) else [values]:
+            if not isinstance(value, str):
+                continue
+            value = " ".join(value.lower().split())
+            for term in [value] + value.split():
+                if term and term not in terms:
+                    terms.append(term)
+    return {SEARCH_FIELD: terms}
+
+
+def _search_filter(search: str) -> dict:
+    # Normalized like the stored terms (lowercase, single spaces)
+    search = " ".join((search or "").lower().split())
+    if not search:
+        return {}
+    return {SEARCH_FIELD: search}
+
+
+def list_page(kind: str, after=None, search: str = None, page_size: int = LIST_PAGE_SIZE):
+    # One page of documents after the given key, plus whether another page follows
+    spec = LISTINGS[kind]
+    key = spec["key"]
+
+    query = _search_filter(search)
+    if after is not None:
+        query[key] = {"$gt": after}
+
+    projection = {"_id": 0, key: 1, **{field: 1 for field in spec["fields"]}}
+    docs = list(
+        spec["collection"].find(query, projection).sort(key, 1).limit(page_size + 1)
+    )
+    return docs[:page_size], len(docs) > page_size
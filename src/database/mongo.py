@@ -1,20 +1,164 @@
+import asyncio
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from pymongo import MongoClient, ASCENDING
-from config.settings import MONGO_URI
+from config.settings import get_env, PARSE_CACHE_TTL_DAYS, MONGO_IO_THREADS
 
-client = MongoClient(MONGO_URI)
-db = client["Job_Matcher"]
+DATABASE_NAME = "Job_Matcher"
 
-resume_collection = db["resumes"]
-job_collection = db["jobs"]
+# The client is created on first use, so importing the matcher, parsers or
+# benchmarks opens no connection; index creation is the explicit ensure_indexes()
+_client = None
+_client_lock = threading.Lock()
 
-resume_collection.create_index("email", unique=True)
-resume_collection.create_index("candidate_id", unique=True)
-job_collection.create_index("job_id", unique=True)
 
-resume_collection.create_index("primary_skills")
-resume_collection.create_index("secondary_skills")
+def get_client() -> MongoClient:
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = MongoClient(get_env("MONGO_URI"))
+    return _client
 
-job_collection.create_index("primary_skills")
-job_collection.create_index("secondary_skills")
 
-print("✅ MongoDB indexes created successfully!")
\ No newline at end of file
+def get_db():
+    return get_client()[DATABASE_NAME]
+
+
+class LazyCollection:
+    # Stands in for a pymongo collection and resolves it on the first attribute access
+
+    def __init__(self, name: str):
+        self._name = name
+        self._collection = None
+
+    @property
+    def collection(self):
+        if self._collection is None:
+            self._collection = get_db()[self._name]
+        return self._collection
+
+    def __getattr__(self, attr):
+        return getattr(self.collection, attr)
+
+    def __repr__(self):
+        return f"LazyCollection({self._name!r})"
+
+
+resume_collection = LazyCollection("resumes")
+job_collection = LazyCollection("jobs")
+parse_cache_collection = LazyCollection("parse_cache")
+manifest_collection = LazyCollection("ingest_manifest")
+match_collection = LazyCollection("matches")
+skill_index_collection = LazyCollection("skill_index")
+version_collection = LazyCollection("collection_versions")
+queue_collection = LazyCollection("ingest_queue")
+batch_collection = LazyCollection("llm_batches")
+
+
+# -----------------------------
+# Indexes
+# -----------------------------
+_indexes_ensured = False
+
+
+def ensure_indexes(force: bool = False):
+    # Idempotent; writers call it once per process, match-only processes never do
+    global _indexes_ensured
+    if _indexes_ensured and not force:
+        return
+
+    resume_collection.create_index("email", unique=True)
+    resume_collection.create_index("candidate_id", unique=True)
+    job_collection.create_index("job_id", unique=True)
+
+    resume_collection.create_index("primary_skills")
+    resume_collection.create_index("secondary_skills")
+
+    job_collection.create_index("primary_skills")
+    job_collection.create_index("secondary_skills")
+
+    # Precomputed match fields (see matcher.normalize) used by the matcher prefilter:
+    # each $or branch matches skills and then range-scans the experience bound
+    for collection in (resume_collection, job_collection):
+        collection.create_index([("primary_skills_norm", ASCENDING), ("experience_norm", ASCENDING)])
+        collection.create_index([("secondary_skills_norm", ASCENDING), ("experience_norm", ASCENDING)])
+
+    # CLI listing: exact-term search on lowercased terms, pages in key order (see database.listing)
+    resume_collection.create_index([("search_terms", ASCENDING), ("candidate_id", ASCENDING)])
+    job_collection.create_index([("search_terms", ASCENDING), ("job_id", ASCENDING)])
+
+    # Age eviction for cached LLM parse results (size eviction lives in parsers.parse_cache)
+    parse_cache_collection.create_index(
+        "created_at", expireAfterSeconds=PARSE_CACHE_TTL_DAYS * 24 * 3600
+    )
+
+    manifest_collection.create_index([("kind", ASCENDING), ("path", ASCENDING)], unique=True)
+    manifest_collection.create_index([("kind", ASCENDING), ("doc_key", ASCENDING)])
+
+    # Work queue claims: ready items by age, and expired leases of crashed workers
+    queue_collection.create_index([("kind", ASCENDING), ("status", ASCENDING), ("available_at", ASCENDING)])
+    queue_collection.create_index([("kind", ASCENDING), ("status", ASCENDING), ("lease_expires", ASCENDING)])
+    queue_collection.create_index("lease_owner")
+    match_collection.create_index([("direction", ASCENDING), ("source_id", ASCENDING)])
+    skill_index_collection.create_index(
+        [("side", ASCENDING), ("field", ASCENDING), ("token", ASCENDING)]
+    )
+
+    _indexes_ensured = True
+    print("✅ MongoDB indexes created successfully!")
+
+
+# -----------------------------
+# Async collection layer
+# -----------------------------
+# pymongo is thread-safe, so blocking calls are pushed onto a dedicated thread pool
+# and awaited from coroutines instead of freezing the event loop.
+_io_executor = ThreadPoolExecutor(max_workers=MONGO_IO_THREADS, thread_name_prefix="mongo-io")
+
+
+class AsyncCollection:
+
+    def __init__(self, collection):
+        self.collection = collection
+
+    async def _run(self, method, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            _io_executor, functools.partial(method, *args, **kwargs)
+        )
+
+    async def find_one(self, *args, **kwargs):
+        return await self._run(self.collection.find_one, *args, **kwargs)
+
+    async def find(self, *args, **kwargs):
+        # Materialises the cursor on the IO thread; use for bounded result sets only
+        return await self._run(lambda: list(self.collection.find(*args, **kwargs)))
+
+    async def insert_one(self, *args, **kwargs):
+        return await self._run(self.collection.insert_one, *args, **kwargs)
+
+    async def update_one(self, *args, **kwargs):
+        return await self._run(self.collection.update_one, *args, **kwargs)
+
+    async def find_one_and_update(self, *args, **kwargs):
+        return await self._run(self.collection.find_one_and_update, *args, **kwargs)
+
+    async def update_many(self, *args, **kwargs):
+        return await self._run(self.collection.update_many, *args, **kwargs)
+
+    async def delete_many(self, *args, **kwargs):
+        return await self._run(self.collection.delete_many, *args, **kwargs)
+
+    async def bulk_write(self, *args, **kwargs):
+        return await self._run(self.collection.bulk_write, *args, **kwargs)
+
+
+async_resume_collection = AsyncCollection(resume_collection)
+async_job_collection = AsyncCollection(job_collection)
+async_parse_cache_collection = AsyncCollection(parse_cache_collection)
+async_manifest_collection = AsyncCollection(manifest_collection)
+async_version_collection = AsyncCollection(version_collection)
+async_queue_collection = AsyncCollection(queue_collection)
+async_batch_collection = AsyncCollection(batch_collection)
@@ -0,0 +1,70 @@
+from datetime import datetime
+from database.mongo import version_collection, async_version_collection
+from config.settings import CHANGE_LOG_SIZE
+
+# One counter document per collection ("resumes", "jobs"), bumped after every write
+# together with a short log of the ids that write touched (None = everything),
+# so caches in any process can drop exactly the entries a write could affect.
+
+_listeners = []
+
+
+def subscribe(listener):
+    # listener(side, ids) runs in-process right after a change is recorded
+    _listeners.append(listener)
+
+
+def _bump(ids):
+    return {
+        "$inc": {"version": 1},
+        "$set": {"changed_at": datetime.utcnow()},
+        "$push": {"log": {"$each": [ids], "$slice": -CHANGE_LOG_SIZE}}
+    }
+
+
+def _clean(ids):
+    if ids is None:
+        return None
+    return sorted({i for i in ids if i is not None})
+
+
+def _notify(side: str, ids):
+    for listener in _listeners:
+        listener(side, None if ids is None else set(ids))
+
+
+def record_changes(side: str, ids=None):
+    ids = _clean(ids)
+    if ids == []:
+        return
+    version_collection.update_one({"_id": side}, _bump(ids), upsert=True)
+    _notify(side, ids)
+
+
+async def record_changes_async(side: str, ids=None):
+    ids = _clean(ids)
+    if ids == []:
+        return
+    await async_version_collection.update_one({"_id": side}, _bump(ids), upsert=True)
+    _notify(side, ids)
+
+
+def read_versions() -> dict:
+    return {d["_id"]: d for d in version_collection.find({})}
+
+
+def changed_ids(doc: dict, since: int):
+    # Ids changed after version `since`, or None when the log no longer reaches back that far
+    behind = doc.get("version", 0) - since
+    log = doc.get("log", [])
+    if behind <= 0:
+        return set()
+    if behind > len(log):
+        return None
+
+    ids = set()
+    for entry in log[-behind:]:
+        if entry is None:
+            return None
+        ids.update(entry)
+    return ids
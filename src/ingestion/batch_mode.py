@@ -0,0 +1,351 @@
+import json
+import time
+import uuid
+import shutil
+import asyncio
+from pathlib import Path
+from datetime import datetime
+from pymongo import UpdateOne
+from database.mongo import async_batch_collection, async_parse_cache_collection
+from database.bulk_writer import BulkWriter
+from ingestion.manifest import iter_changed_files, iter_all_files
+from ingestion.pipeline import Stage, run_pipeline, run_ingestion, print_summary
+from parsers.pdf_extractor import extract_text_async
+from parsers.parse_cache import get_cached, cache_upsert, reset_stats, report_stats
+from parsers.llm_client import get_client, chat_completion
+from parsers import resume_parser, jd_parser
+from config.settings import (
+    INCREMENTAL_INGEST,
+    PARSE_CACHE_ENABLED,
+    PIPELINE_EXTRACT_WORKERS,
+    AZURE_OPENAI_DEPLOYMENT,
+    AZURE_OPENAI_BATCH_DEPLOYMENT,
+    AZURE_MAX_CONCURRENCY,
+    BATCH_BACKEND,
+    BATCH_DIR,
+    BATCH_MAX_REQUESTS,
+    BATCH_POLL_SECONDS
+)
+
+# Offline ingestion through the Azure OpenAI Batch API (higher latency, higher
+# throughput, lower cost than per-file chat calls):
+#
+#   submit  - extract text, write one JSONL request per document with the parser's own
+#             build_messages / REQUEST_OPTIONS, upload and create the batch(es)
+#   collect - poll until done, store every answer in the parse cache under the key of
+#             the deployment that produced it (the live parser also looks up the batch
+#             deployment's key), then run the normal ingestion pipeline: its LLM stage
+#             hits the cache, so post-processing and upserts are unchanged, and anything
+#             the batch did not answer falls back to a live call.
+#
+# Texts already in the parse cache are not sent again. Batches are tracked in llm_batches.
+
+PARSERS = {"resume": resume_parser, "jd": jd_parser}
+
+BATCH_ENDPOINT = "/chat/completions"
+TERMINAL_STATUSES = {"completed", "failed", "expired", "cancelled"}
+
+
+# -----------------------------
+# Request files
+# -----------------------------
+class RequestFiles:
+    # JSONL request files, rolling over every max_requests lines (the API caps batch size)
+
+    def __init__(self, directory: Path, max_requests: int = BATCH_MAX_REQUESTS):
+        self.directory = directory
+        self.max_requests = max(max_requests, 1)
+        self.files = []
+        self._stream = None
+        self._count = 0
+
+    def write(self, request: dict):
+        if self._stream is None or self._count >= self.max_requests:
+            self._roll()
+        self._stream.write(json.dumps(request, ensure_ascii=False) + "\n")
+        self._count += 1
+        self.files[-1][1] = self._count
+
+    def _roll(self):
+        self.close()
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self.directory / f"requests-{len(self.files) + 1:03d}.jsonl"
+        self._stream = open(path, "w", encoding="utf-8")
+        self._count = 0
+        self.files.append([path, 0])
+
+    def close(self):
+        if self._stream is not None:
+            self._stream.close()
+            self._stream = None
+
+
+async def write_requests(kind: str, directory: str, incremental: bool, out_dir: Path) -> RequestFiles:
+    parser = PARSERS[kind]
+    deployment = AZURE_OPENAI_BATCH_DEPLOYMENT or AZURE_OPENAI_DEPLOYMENT
+    source = iter_changed_files(directory, kind) if incremental else iter_all_files(directory)
+    files = RequestFiles(out_dir)
+    seen = set()
+
+    async def extract(item):
+        item["text"] = await extract_text_async(item["entry"]["path"])
+        if not item["text"] or not item["text"].strip():
+            return None
+        return item
+
+    async def request(item):
+        # custom_id is the parse cache key, so collect() knows where each answer goes
+        key = parser.request_cache_key(item["text"], deployment)
+        if key in seen or await get_cached(kind, key, parser.request_cache_key(item["text"])) is not None:
+            return None
+        seen.add(key)
+        files.write({
+            "custom_id": key,
+            "method": "POST",
+            "url": BATCH_ENDPOINT,
+            "body": {"model": deployment, "messages": parser.build_messages(item["text"]), **parser.REQUEST_OPTIONS}
+        })
+        return item
+
+    reset_stats(kind)
+    started = time.perf_counter()
+    try:
+        stats = await run_pipeline(source, [
+            Stage("extract", extract, PIPELINE_EXTRACT_WORKERS),
+            Stage("request", request, 1),
+        ])
+    finally:
+        files.close()
+
+    print_summary(f"{kind} batch requests", stats, time.perf_counter() - started)
+    report_stats(kind)
+    return files
+
+
+# -----------------------------
+# Backends
+# -----------------------------
+class AzureBatchBackend:
+    name = "azure"
+
+    async def submit(self, path: Path) -> str:
+        client = get_client()
+        with open(path, "rb") as f:
+            uploaded = await client.files.create(file=f, purpose="batch")
+        batch = await client.batches.create(
+            input_file_id=uploaded.id, endpoint=BATCH_ENDPOINT, completion_window="24h"
+        )
+        return batch.id
+
+    async def poll(self, batch_id: str) -> dict:
+        batch = await get_client().batches.retrieve(batch_id)
+        return {
+            "status": batch.status,
+            "output_file_id": batch.output_file_id,
+            "error_file_id": batch.error_file_id,
+        }
+
+    async def result_lines(self, batch_id: str, info: dict):
+        lines = []
+        for file_id in (info.get("output_file_id"), info.get("error_file_id")):
+            if file_id:
+                content = await get_client().files.content(file_id)
+                lines.extend(content.text.splitlines())
+        return lines
+
+
+class LocalBatchBackend:
+    # File-based stand-in for local runs and tests: a batch is a directory holding
+    # input.jsonl. The first poll answers it through chat_completion and writes
+    # output.jsonl in the Batch API format, unless an output.jsonl is already there.
+    name = "local"
+
+    def __init__(self, root: str = BATCH_DIR):
+        self.root = Path(root) / "local"
+
+    async def submit(self, path: Path) -> str:
+        batch_id = f"local-{uuid.uuid4().hex[:12]}"
+        batch_dir = self.root / batch_id
+        batch_dir.mkdir(parents=True)
+        shutil.copyfile(path, batch_dir / "input.jsonl")
+        return batch_id
+
+    async def poll(self, batch_id: str) -> dict:
+        batch_dir = self.root / batch_id
+        if not (batch_dir / "output.jsonl").exists():
+            await self._process(batch_dir)
+        return {"status": "completed"}
+
+    async def _process(self, batch_dir: Path):
+        with open(batch_dir / "input.jsonl", encoding="utf-8") as f:
+            requests = [json.loads(line) for line in f if line.strip()]
+
+        async def answer(request):
+            try:
+                response = await chat_completion(**request["body"])
+            except Exception as e:
+                return {"custom_id": request["custom_id"], "response": None, "error": {"message": str(e)}}
+            body = {"choices": [{"message": {"content": response.choices[0].message.content}}]}
+            return {"custom_id": request["custom_id"], "response": {"status_code": 200, "body": body}, "error": None}
+
+        # Bounded chunks, so a large batch does not become one task per request at once
+        results = []
+        for start in range(0, len(requests), AZURE_MAX_CONCURRENCY):
+            results.extend(await asyncio.gather(
+                *(answer(r) for r in requests[start:start + AZURE_MAX_CONCURRENCY])
+            ))
+
+        partial = batch_dir / "output.jsonl.tmp"
+        with open(partial, "w", encoding="utf-8") as f:
+            for result in results:
+                f.write(json.dumps(result, ensure_ascii=False) + "\n")
+        partial.replace(batch_dir / "output.jsonl")
+
+    async def result_lines(self, batch_id: str, info: dict):
+        with open(self.root / batch_id / "output.jsonl", encoding="utf-8") as f:
+            return f.read().splitlines()
+
+
+BACKENDS = {"azure": AzureBatchBackend, "local": LocalBatchBackend}
+
+
+def get_backend(name: str = None):
+    name = (name or BATCH_BACKEND).lower()
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown batch backend '{name}' (available: {', '.join(BACKENDS)})")
+    return BACKENDS[name]()
+
+
+# -----------------------------
+# Submit
+# -----------------------------
+async def submit_batches(kind: str, directory: str, incremental: bool = INCREMENTAL_INGEST, backend: str = None):
+    if not PARSE_CACHE_ENABLED:
+        raise ValueError("Batch mode hands results to the pipeline through the parse cache; set PARSE_CACHE_ENABLED=true")
+
+    backend = get_backend(backend)
+    out_dir = Path(BATCH_DIR) / f"{kind}-{datetime.utcnow():%Y%m%d-%H%M%S}"
+    files = await write_requests(kind, directory, incremental, out_dir)
+
+    batch_ids = []
+    for path, count in files.files:
+        batch_id = await backend.submit(path)
+        await async_batch_collection.insert_one({
+            "_id": batch_id,
+            "backend": backend.name,
+            "kind": kind,
+            "directory": directory,
+            "incremental": incremental,
+            "input_path": str(path),
+            "requests": count,
+            "status": "submitted",
+            "submitted_at": datetime.utcnow(),
+            "collected_at": None
+        })
+        batch_ids.append(batch_id)
+        print(f"📤 Batch {batch_id} ({kind}): {count} requests submitted")
+
+    if not batch_ids:
+        print(f"📤 Batch ({kind}): nothing to submit (no new files, or all answers already cached)")
+    return batch_ids
+
+
+# -----------------------------
+# Collect
+# -----------------------------
+async def store_results(kind: str, lines) -> tuple:
+    # Answers that parse cleanly go into the parse cache; the rest are counted as failed
+    parser = PARSERS[kind]
+    stored = failed = 0
+
+    async with BulkWriter(async_parse_cache_collection, "parse cache") as writer:
+        for line in lines:
+            if not line.strip():
+                continue
+            custom_id = "?"
+            try:
+                # A truncated or malformed line only loses its own answer
+                result = json.loads(line)
+                custom_id = result["custom_id"]
+                response = result.get("response") or {}
+                if response.get("status_code") != 200:
+                    raise ValueError((result.get("error") or {}).get("message") or f"status {response.get('status_code')}")
+                content = response["body"]["choices"][0]["message"]["content"]
+                parser.parse_response(content)
+            except Exception as e:
+                failed += 1
+                if failed <= 10:
+                    print(f"❌ Batch answer {str(custom_id)[:12]}… unusable: {e}")
+                continue
+
+            filter_, update = cache_upsert(kind, custom_id, content)
+            await writer.add(UpdateOne(filter_, update, upsert=True))
+            stored += 1
+
+    return stored, failed
+
+
+async def collect_batches(kind: str = None, wait: bool = True, ingest: bool = True):
+    query = {"collected_at": None}
+    if kind:
+        query["kind"] = kind
+    waiting = await async_batch_collection.find(query)
+    if not waiting:
+        print("📥 No submitted batches waiting to be collected.")
+        return []
+
+    collected = []
+    while waiting:
+        for record in list(waiting):
+            backend = get_backend(record["backend"])
+            info = await backend.poll(record["_id"])
+            status = info["status"]
+
+            if status not in TERMINAL_STATUSES:
+                await async_batch_collection.update_one({"_id": record["_id"]}, {"$set": {"status": status}})
+                continue
+
+            # Failed / expired batches may still carry part of the answers
+            stored, failed = await store_results(record["kind"], await backend.result_lines(record["_id"], info))
+            await async_batch_collection.update_one({"_id": record["_id"]}, {"$set": {
+                "status": status, "stored": stored, "failed": failed, "collected_at": datetime.utcnow()
+            }})
+            print(f"📥 Batch {record['_id']} ({record['kind']}): {status}, {stored} answers cached, {failed} unusable")
+
+            record["stored"] = stored
+            waiting.remove(record)
+            collected.append(record)
+
+        if waiting and wait:
+            print(f"⏳ {len(waiting)} batch(es) still running; next poll in {BATCH_POLL_SECONDS:.0f}s")
+            await asyncio.sleep(BATCH_POLL_SECONDS)
+        elif waiting:
+            break
+
+    if ingest:
+        # Same pipeline as a live run; the LLM stage is answered from the parse cache
+        runs = {}
+        for r in collected:
+            run = runs.setdefault((r["kind"], r["directory"], r["incremental"]), {"requests": 0, "stored": 0})
+            run["requests"] += r["requests"]
+            run["stored"] += r["stored"]
+
+        for (run_kind, directory, incremental), run in sorted(runs.items()):
+            live = run["requests"] - run["stored"]
+            if live > 0:
+                print(f"⚠ Batch ({run_kind}): {live} of {run['requests']} requests have no usable answer "
+                      f"and will be parsed live")
+            await run_ingestion(run_kind, directory, incremental)
+
+    return collected
+
+
+async def batch_status():
+    records = await async_batch_collection.find({}, sort=[("submitted_at", -1)], limit=50)
+    if not records:
+        print("📥 No batches recorded.")
+    for r in records:
+        state = "collected" if r.get("collected_at") else r.get("status")
+        extra = f", {r.get('stored', 0)} cached, {r.get('failed', 0)} unusable" if r.get("collected_at") else ""
+        print(f"📥 {r['_id']} [{r['backend']}] {r['kind']}: {r['requests']} requests, {state}{extra}")
+    return records
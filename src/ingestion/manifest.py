@@ -0,0 +1,155 @@
+import os
+import hashlib
+from datetime import datetime
+from pymongo import UpdateOne, DeleteOne
+from database.mongo import manifest_collection, resume_collection, job_collection
+from database.versions import record_changes
+
+# Which collection / key a manifest entry's doc_key refers to
+DOCUMENT_KEYS = {
+    "resume": (resume_collection, "email"),
+    "jd": (job_collection, "job_id"),
+}
+
+# Change-counter side and matcher id field per kind
+MATCH_SIDES = {
+    "resume": ("resumes", "candidate_id"),
+    "jd": ("jobs", "job_id"),
+}
+
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+# -----------------------------
+# Scan for new / changed files
+# -----------------------------
+def iter_changed_files(directory: str, kind: str):
+    # Yields manifest entries for new/changed PDFs as the directory is walked
+    records = {
+        r["path"]: r
+        for r in manifest_collection.find(
+            {"kind": kind}, {"path": 1, "size": 1, "mtime": 1, "sha256": 1}
+        )
+    }
+
+    touched = []
+    changed = 0
+    unchanged = 0
+
+    for entry in os.scandir(directory):
+        if not entry.is_file() or not entry.name.lower().endswith(".pdf"):
+            continue
+
+        path = os.path.normpath(entry.path)
+        stat = entry.stat()
+        record = records.get(path)
+
+        # Fast path: size and mtime unchanged → assume content unchanged
+        if record and record.get("size") == stat.st_size and record.get("mtime") == stat.st_mtime:
+            unchanged += 1
+            continue
+
+        sha256 = file_sha256(path)
+
+        # Touched but identical content (e.g. copied back in): refresh stat only
+        if record and record.get("sha256") == sha256:
+            touched.append(UpdateOne(
+                {"kind": kind, "path": path},
+                {"$set": {"size": stat.st_size, "mtime": stat.st_mtime}}
+            ))
+            unchanged += 1
+            continue
+
+        changed += 1
+        yield {
+            "path": path,
+            "size": stat.st_size,
+            "mtime": stat.st_mtime,
+            "sha256": sha256
+        }
+
+    if touched:
+        manifest_collection.bulk_write(touched, ordered=False)
+
+    print(f"🗂 Manifest ({kind}): {changed} new/changed, {unchanged} unchanged")
+
+
+def iter_all_files(directory: str):
+    for f in os.listdir(directory):
+        if f.lower().endswith(".pdf"):
+            yield describe_file(os.path.join(directory, f))
+
+
+def scan_directory(directory: str, kind: str):
+    return list(iter_changed_files(directory, kind))
+
+
+# -----------------------------
+# Record successful ingestion
+# -----------------------------
+def build_manifest_update(kind: str, entry: dict, doc_key: str) -> UpdateOne:
+    return UpdateOne(
+        {"kind": kind, "path": entry["path"]},
+        {"$set": {
+            "size": entry["size"],
+            "mtime": entry["mtime"],
+            "sha256": entry["sha256"],
+            "doc_key": doc_key,
+            "processed_at": datetime.utcnow()
+        }},
+        upsert=True
+    )
+
+
+def describe_file(path: str) -> dict:
+    # Manifest entry for a file that was not discovered through scan_directory
+    stat = os.stat(path)
+    return {
+        "path": os.path.normpath(path),
+        "size": stat.st_size,
+        "mtime": stat.st_mtime,
+        "sha256": file_sha256(path)
+    }
+
+
+# -----------------------------
+# Purge entries for deleted files
+# -----------------------------
+def purge_missing(kind: str, delete_documents: bool = False):
+    collection, key_field = DOCUMENT_KEYS[kind]
+
+    missing = [
+        r for r in manifest_collection.find({"kind": kind}, {"path": 1, "doc_key": 1})
+        if not os.path.exists(r["path"])
+    ]
+
+    if not missing:
+        print(f"🗂 Manifest ({kind}): nothing to purge")
+        return 0
+
+    manifest_collection.bulk_write(
+        [DeleteOne({"_id": r["_id"]}) for r in missing], ordered=False
+    )
+
+    removed_docs = 0
+    if delete_documents:
+        doc_keys = {r["doc_key"] for r in missing if r.get("doc_key")}
+        # A document another file still maps to (e.g. a renamed or copied resume) stays
+        doc_keys -= set(manifest_collection.distinct(
+            "doc_key", {"kind": kind, "doc_key": {"$in": list(doc_keys)}}
+        ))
+        doc_keys = list(doc_keys)
+        if doc_keys:
+            side, id_field = MATCH_SIDES[kind]
+            removed_ids = collection.distinct(id_field, {key_field: {"$in": doc_keys}})
+            removed_docs = collection.delete_many({key_field: {"$in": doc_keys}}).deleted_count
+            record_changes(side, removed_ids)
+
+    print(f"🗂 Manifest ({kind}): purged {len(missing)} entries, {removed_docs} documents")
+    return len(missing)
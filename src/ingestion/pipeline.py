@@ -0,0 +1,293 @@
+import os
+import time
+import asyncio
+from config.settings import (
+    INCREMENTAL_INGEST,
+    PIPELINE_QUEUE_SIZE,
+    PIPELINE_EXTRACT_WORKERS,
+    PIPELINE_LLM_WORKERS,
+    PIPELINE_NORMALIZE_WORKERS,
+    PIPELINE_WRITE_WORKERS
+)
+from database.mongo import async_resume_collection, async_job_collection, async_manifest_collection, ensure_indexes
+from database.bulk_writer import BulkWriter
+from database.versions import record_changes_async
+from ingestion.manifest import iter_changed_files, iter_all_files, build_manifest_update
+from parsers.pdf_extractor import extract_text_async
+from parsers.parse_cache import reset_stats, report_stats, evict_parse_cache
+from parsers.llm_client import limiter
+from parsers import resume_parser, jd_parser
+from batch.sharding import in_shard
+
+# Marks the end of input for one worker of the next stage
+_DONE = object()
+
+# Only the first few failures per stage are printed; the rest are counted
+MAX_PRINTED_ERRORS = 10
+
+
+# -----------------------------
+# Per-stage statistics
+# -----------------------------
+class StageStats:
+
+    def __init__(self, name: str, workers: int):
+        self.name = name
+        self.workers = workers
+        self.processed = 0
+        self.dropped = 0
+        self.errors = 0
+        self.busy_seconds = 0.0
+        self.max_latency = 0.0
+        self.started = None
+        self.finished = None
+
+    def record(self, latency: float):
+        if self.started is None:
+            self.started = time.perf_counter() - latency
+        self.busy_seconds += latency
+        self.max_latency = max(self.max_latency, latency)
+
+    def error(self, item, exc: Exception):
+        self.errors += 1
+        if self.errors <= MAX_PRINTED_ERRORS:
+            path = item.get("entry", {}).get("path") if isinstance(item, dict) else item
+            print(f"❌ {self.name} failed for {path}: {exc}")
+
+    @property
+    def handled(self):
+        return self.processed + self.dropped + self.errors
+
+    @property
+    def elapsed(self):
+        if self.started is None or self.finished is None:
+            return 0.0
+        return self.finished - self.started
+
+
+class Stage:
+
+    def __init__(self, name: str, handler, workers: int):
+        self.name = name
+        self.handler = handler
+        self.workers = max(workers, 1)
+
+
+# -----------------------------
+# Pipeline runner
+# -----------------------------
+async def _discover(source, outbox, downstream_workers: int, stats: StageStats):
+    # The source is a plain (blocking) iterator, so each step runs on a thread
+    iterator = iter(source)
+    try:
+        while True:
+            started = time.perf_counter()
+            entry = await asyncio.to_thread(next, iterator, None)
+            if entry is None:
+                break
+            stats.record(time.perf_counter() - started)
+            stats.processed += 1
+            await outbox.put({"entry": entry})
+    except Exception as e:
+        stats.error("discover", e)
+    finally:
+        stats.finished = time.perf_counter()
+        for _ in range(downstream_workers):
+            await outbox.put(_DONE)
+
+
+async def _run_stage(stage: Stage, inbox, outbox, downstream_workers: int, stats: StageStats, tracker=None):
+
+    async def worker():
+        while True:
+            item = await inbox.get()
+            if item is _DONE:
+                return
+
+            started = time.perf_counter()
+            try:
+                result = await stage.handler(item)
+            except Exception as e:
+                stats.record(time.perf_counter() - started)
+                stats.error(item, e)
+                if tracker is not None:
+                    await tracker.failed(item, e)
+                continue
+
+            stats.record(time.perf_counter() - started)
+            if result is None:
+                stats.dropped += 1
+                if tracker is not None:
+                    await tracker.dropped(item)
+                continue
+
+            stats.processed += 1
+            if outbox is not None:
+                await outbox.put(result)
+
+    await asyncio.gather(*(worker() for _ in range(stage.workers)))
+    stats.finished = time.perf_counter()
+
+    if outbox is not None:
+        for _ in range(downstream_workers):
+            await outbox.put(_DONE)
+
+
+async def run_pipeline(source, stages, queue_size: int = PIPELINE_QUEUE_SIZE, tracker=None):
+    # discover → stage 1 → ... → stage N, each hop through a bounded queue;
+    # tracker (see ingestion.work_queue) hears about failed and dropped items
+    queues = [asyncio.Queue(maxsize=queue_size) for _ in stages]
+    discover_stats = StageStats("discover", 1)
+    stats = [StageStats(stage.name, stage.workers) for stage in stages]
+
+    tasks = [_discover(source, queues[0], stages[0].workers, discover_stats)]
+    for i, stage in enumerate(stages):
+        last = i == len(stages) - 1
+        tasks.append(_run_stage(
+            stage,
+            queues[i],
+            None if last else queues[i + 1],
+            0 if last else stages[i + 1].workers,
+            stats[i],
+            tracker
+        ))
+
+    await asyncio.gather(*tasks)
+    return [discover_stats] + stats
+
+
+def print_summary(kind: str, stats, elapsed: float):
+    print(f"\n📊 Pipeline summary ({kind}) — {elapsed:.1f}s")
+    print(f"   {'stage':<10} {'workers':>7} {'ok':>7} {'dropped':>7} {'errors':>7} "
+          f"{'items/s':>8} {'avg ms':>8} {'max ms':>8}")
+    for s in stats:
+        throughput = s.handled / s.elapsed if s.elapsed else 0
+        avg_ms = s.busy_seconds / s.handled * 1000 if s.handled else 0
+        print(f"   {s.name:<10} {s.workers:>7} {s.processed:>7} {s.dropped:>7} {s.errors:>7} "
+              f"{throughput:>8.1f} {avg_ms:>8.1f} {s.max_latency * 1000:>8.1f}")
+
+
+# -----------------------------
+# Resume / JD ingestion
+# -----------------------------
+KINDS = {
+    "resume": {
+        "name": "resumes",
+        "collection": async_resume_collection,
+        "key_field": "email",
+        "doc_key_field": "email",
+        "changed_ids": resume_parser.stored_candidate_ids,
+        "request_parse": resume_parser.request_parse,
+        "build_document": resume_parser.build_resume_document,
+        "store": resume_parser.store_resume,
+    },
+    "jd": {
+        "name": "jobs",
+        "collection": async_job_collection,
+        "key_field": "job_id",
+        "doc_key_field": "job_id",
+        "changed_ids": None,
+        "request_parse": jd_parser.request_parse,
+        "build_document": lambda path, text, parsed: jd_parser.build_job_document(path, parsed),
+        "store": jd_parser.store_job,
+    },
+}
+
+
+class WrittenFile:
+    # Writer key of one document operation: the document's key and the file it came from
+
+    def __init__(self, key, entry: dict, doc_key):
+        self.key = key
+        self.entry = entry
+        self.doc_key = doc_key
+
+
+def build_stages(kind: str, writer, llm_workers: int = None):
+    spec = KINDS[kind]
+
+    async def extract(item):
+        item["text"] = await extract_text_async(item["entry"]["path"])
+        if not item["text"] or not item["text"].strip():
+            print(f"⚠ Empty document skipped: {item['entry']['path']}")
+            return None
+        return item
+
+    async def llm(item):
+        item["parsed"] = await spec["request_parse"](item["text"])
+        return item
+
+    async def normalize(item):
+        document = spec["build_document"](item["entry"]["path"], item["text"], item["parsed"])
+        if document is None:
+            return None
+        return {"entry": item["entry"], "document": document}
+
+    async def write(item):
+        # The writer key carries the file, so the flush callbacks can settle each
+        # operation on its own, even when two files map to one document
+        document = item["document"]
+        await spec["store"](document, writer, WrittenFile(
+            document[spec["key_field"]], item["entry"], document[spec["doc_key_field"]]
+        ))
+        return item
+
+    return [
+        Stage("extract", extract, PIPELINE_EXTRACT_WORKERS),
+        Stage("llm", llm, llm_workers or PIPELINE_LLM_WORKERS),
+        Stage("normalize", normalize, PIPELINE_NORMALIZE_WORKERS),
+        Stage("write", write, PIPELINE_WRITE_WORKERS),
+    ]
+
+
+async def run_ingestion(kind: str, directory: str, incremental: bool = INCREMENTAL_INGEST,
+                        llm_workers: int = None, shard=None, on_result=None, source=None, tracker=None):
+    # source: manifest entries to process instead of scanning directory (queue workers)
+    spec = KINDS[kind]
+    if source is None:
+        source = iter_changed_files(directory, kind) if incremental else iter_all_files(directory)
+    if shard is not None:
+        # Files are split by name so every host sharing the directory takes a disjoint part
+        source = (entry for entry in source if in_shard(os.path.basename(entry["path"]), shard))
+
+    await asyncio.to_thread(ensure_indexes)
+    reset_stats(kind)
+    started = time.perf_counter()
+
+    # A file is marked done in the manifest only once its document was written, so a
+    # rejected write is picked up again by the next incremental run; on_result(record)
+    # hears about every file whose document was flushed, or failed to be ("error")
+    async def flushed(written):
+        for op in written:
+            await manifest_writer.add(build_manifest_update(kind, op.entry, op.doc_key))
+            if on_result is not None:
+                on_result({"kind": kind, "path": op.entry["path"], "doc_key": op.doc_key})
+        if tracker is not None:
+            await tracker.flushed([op.entry for op in written])
+        # Writer keys are the upsert filters; change records name the stored ids
+        keys = list(dict.fromkeys(op.key for op in written))
+        ids = keys if spec["changed_ids"] is None else await spec["changed_ids"](keys)
+        await record_changes_async(spec["name"], ids)
+
+    async def write_failed(failed):
+        for op, error in failed:
+            if on_result is not None:
+                on_result({"kind": kind, "path": op.entry["path"], "doc_key": op.doc_key, "error": error})
+        if tracker is not None:
+            await tracker.unflushed([(op.entry, error) for op, error in failed])
+
+    # Manifest writer closes last, so entries added by the final document flush are written
+    async with BulkWriter(async_manifest_collection, "manifest") as manifest_writer, \
+            BulkWriter(
+                spec["collection"], spec["name"],
+                on_flush=flushed,
+                on_error=write_failed
+            ) as writer:
+        stages = build_stages(kind, writer, llm_workers)
+        stats = await run_pipeline(source, stages, tracker=tracker)
+
+    print_summary(kind, stats, time.perf_counter() - started)
+    report_stats(kind)
+    limiter.report()
+    await asyncio.to_thread(evict_parse_cache)
+    return stats
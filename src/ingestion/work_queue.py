@@ -0,0 +1,318 @@
+import os
+import time
+import uuid
+import socket
+import asyncio
+import multiprocessing
+from datetime import datetime, timedelta
+from pymongo import UpdateOne, ReturnDocument
+from database.mongo import queue_collection, async_queue_collection, ensure_indexes
+from ingestion.manifest import iter_changed_files, iter_all_files
+from config.settings import (
+    INCREMENTAL_INGEST,
+    BULK_WRITE_BATCH_SIZE,
+    AZURE_RPM_LIMIT,
+    AZURE_TPM_LIMIT,
+    QUEUE_LEASE_SECONDS,
+    QUEUE_HEARTBEAT_SECONDS,
+    QUEUE_MAX_ATTEMPTS,
+    QUEUE_RETRY_DELAY_SECONDS,
+    QUEUE_POLL_SECONDS
+)
+
+# Distributed ingestion: files are enqueued once into ingest_queue, and any number of
+# worker processes on any host that sees the same paths claim them with
+# find_one_and_update. A claim is a lease: workers heartbeat while they hold items,
+# and items of a crashed worker become claimable again once the lease expires.
+# An item is acked (deleted) only once its document was written by a flushed batch,
+# so a crash means reprocessing, never a lost file. Failures, rejected writes included,
+# are retried with exponential delay until QUEUE_MAX_ATTEMPTS, then kept as "failed".
+
+PENDING = "pending"
+LEASED = "leased"
+FAILED = "failed"
+
+
+def queue_id(kind: str, path: str) -> str:
+    return f"{kind}:{os.path.normpath(path)}"
+
+
+def worker_name() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+
+
+# -----------------------------
+# Producer
+# -----------------------------
+def enqueue(kind: str, directory: str, incremental: bool = INCREMENTAL_INGEST) -> int:
+    # New / changed files (all files when not incremental) become pending items;
+    # files already waiting with the same content are left alone
+    source = iter_changed_files(directory, kind) if incremental else iter_all_files(directory)
+    queued = {
+        d["_id"]: d
+        for d in queue_collection.find({"kind": kind}, {"status": 1, "entry.sha256": 1})
+    }
+
+    ops = []
+    enqueued = skipped = 0
+    now = datetime.utcnow()
+
+    for entry in source:
+        _id = queue_id(kind, entry["path"])
+        current = queued.get(_id)
+        if (current and current.get("status") in (PENDING, LEASED)
+                and current.get("entry", {}).get("sha256") == entry["sha256"]):
+            skipped += 1
+            continue
+
+        ops.append(UpdateOne({"_id": _id}, {"$set": {
+            "kind": kind,
+            "entry": entry,
+            "status": PENDING,
+            "attempts": 0,
+            "available_at": now,
+            "enqueued_at": now,
+            "lease_owner": None,
+            "lease_expires": None,
+            "last_error": None
+        }}, upsert=True))
+        enqueued += 1
+
+        if len(ops) >= BULK_WRITE_BATCH_SIZE:
+            queue_collection.bulk_write(ops, ordered=False)
+            ops = []
+
+    if ops:
+        queue_collection.bulk_write(ops, ordered=False)
+
+    print(f"📥 Queue ({kind}): {enqueued} enqueued, {skipped} already queued")
+    return enqueued
+
+
+# -----------------------------
+# Claims (blocking; run on the discover thread)
+# -----------------------------
+def claim(kind: str, worker: str, lease_seconds: float = QUEUE_LEASE_SECONDS):
+    # Oldest ready item, or one whose lease ran out, atomically leased to this worker
+    now = datetime.utcnow()
+    return queue_collection.find_one_and_update(
+        {
+            "kind": kind,
+            "attempts": {"$lt": QUEUE_MAX_ATTEMPTS},
+            "$or": [
+                {"status": PENDING, "available_at": {"$lte": now}},
+                {"status": LEASED, "lease_expires": {"$lt": now}},
+            ]
+        },
+        {
+            "$set": {
+                "status": LEASED,
+                "lease_owner": worker,
+                "lease_expires": now + timedelta(seconds=lease_seconds),
+                "claimed_at": now
+            },
+            "$inc": {"attempts": 1}
+        },
+        sort=[("available_at", 1)],
+        return_document=ReturnDocument.AFTER
+    )
+
+
+def fail_abandoned(kind: str) -> int:
+    # Expired leases that already used every attempt (e.g. a file that crashes workers)
+    return queue_collection.update_many(
+        {
+            "kind": kind,
+            "status": LEASED,
+            "lease_expires": {"$lt": datetime.utcnow()},
+            "attempts": {"$gte": QUEUE_MAX_ATTEMPTS}
+        },
+        {"$set": {"status": FAILED, "lease_owner": None, "last_error": "lease expired"}}
+    ).modified_count
+
+
+def outstanding(kind: str, worker: str) -> int:
+    # Items someone may still hand out: pending ones and other workers' leases
+    return queue_collection.count_documents({
+        "kind": kind,
+        "attempts": {"$lt": QUEUE_MAX_ATTEMPTS},
+        "$or": [
+            {"status": PENDING},
+            {"status": LEASED, "lease_owner": {"$ne": worker}},
+        ]
+    })
+
+
+def claimed_entries(kind: str, worker: str, follow: bool = False):
+    # Pipeline source: claims one item at a time. Ends once nothing is left that this
+    # worker could still get (an expired lease or a retry); with follow, polls forever.
+    while True:
+        item = claim(kind, worker)
+        if item is not None:
+            yield item["entry"]
+            continue
+
+        fail_abandoned(kind)
+        if not follow and not outstanding(kind, worker):
+            return
+        time.sleep(QUEUE_POLL_SECONDS)
+
+
+# -----------------------------
+# Acks, retries and heartbeats (pipeline tracker)
+# -----------------------------
+class QueueTracker:
+
+    def __init__(self, kind: str, worker: str):
+        self.kind = kind
+        self.worker = worker
+        self.acked = 0
+        self.retried = 0
+        self.failed_items = 0
+
+    def _owned(self, ids):
+        return {"_id": {"$in": ids}, "lease_owner": self.worker}
+
+    async def flushed(self, entries):
+        # Files whose documents were written by a flushed batch
+        ids = [queue_id(self.kind, entry["path"]) for entry in entries]
+        if ids:
+            result = await async_queue_collection.delete_many(self._owned(ids))
+            self.acked += result.deleted_count
+
+    async def dropped(self, item):
+        # Nothing to store (empty PDF, resume without an email): done as well
+        _id = queue_id(self.kind, item["entry"]["path"])
+        result = await async_queue_collection.delete_many(self._owned([_id]))
+        self.acked += result.deleted_count
+
+    async def unflushed(self, failed):
+        # Files whose documents the writer could not store ((entry, error) pairs):
+        # retried like a failed stage
+        for entry, error in failed:
+            await self._retry(queue_id(self.kind, entry["path"]), error)
+
+    async def failed(self, item, exc: Exception):
+        await self._retry(queue_id(self.kind, item["entry"]["path"]), exc)
+
+    async def _retry(self, _id: str, error):
+        current = await async_queue_collection.find_one(self._owned([_id]), {"attempts": 1})
+        if current is None:
+            return
+
+        attempts = current.get("attempts", 1)
+        if attempts >= QUEUE_MAX_ATTEMPTS:
+            update = {"status": FAILED}
+            self.failed_items += 1
+        else:
+            delay = QUEUE_RETRY_DELAY_SECONDS * (2 ** (attempts - 1))
+            update = {"status": PENDING, "available_at": datetime.utcnow() + timedelta(seconds=delay)}
+            self.retried += 1
+
+        await async_queue_collection.update_one(self._owned([_id]), {"$set": {
+            **update, "lease_owner": None, "lease_expires": None, "last_error": str(error)[:500]
+        }})
+
+    async def heartbeat(self, interval: float = QUEUE_HEARTBEAT_SECONDS):
+        # One update extends every lease this worker holds, however many items are in flight
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await async_queue_collection.update_many(
+                    {"status": LEASED, "lease_owner": self.worker},
+                    {"$set": {"lease_expires": datetime.utcnow() + timedelta(seconds=QUEUE_LEASE_SECONDS)}}
+                )
+            except Exception as e:
+                print(f"⚠ Queue heartbeat failed: {e}")
+
+    async def release(self):
+        # Graceful exit: anything still leased goes straight back to pending
+        await async_queue_collection.update_many(
+            {"status": LEASED, "lease_owner": self.worker},
+            {"$set": {"status": PENDING, "lease_owner": None, "lease_expires": None},
+             "$inc": {"attempts": -1}}
+        )
+
+    def report(self):
+        print(
+            f"📥 Queue worker {self.worker}: {self.acked} done, "
+            f"{self.retried} retried, {self.failed_items} failed"
+        )
+
+
+# -----------------------------
+# Workers
+# -----------------------------
+async def run_worker(kind: str, llm_workers: int = None, follow: bool = False, on_result=None) -> int:
+    # Returns the number of items this worker marked failed (retries are not counted)
+    # Imported here: the pipeline pulls in the parsers and the LLM client
+    from ingestion.pipeline import run_ingestion
+
+    worker = worker_name()
+    tracker = QueueTracker(kind, worker)
+    heartbeat = asyncio.create_task(tracker.heartbeat())
+    try:
+        while True:
+            await run_ingestion(
+                kind, None, llm_workers=llm_workers, on_result=on_result,
+                source=claimed_entries(kind, worker, follow), tracker=tracker
+            )
+            # The source can end while this worker's own last items are still in flight;
+            # one of them may have gone back to pending for a retry
+            if not await asyncio.to_thread(outstanding, kind, worker):
+                break
+    finally:
+        heartbeat.cancel()
+        await tracker.release()
+        tracker.report()
+    return tracker.failed_items
+
+
+def _worker_process(kind: str, llm_workers: int, follow: bool):
+    if asyncio.run(run_worker(kind, llm_workers, follow)):
+        raise SystemExit(1)
+
+
+def run_workers(kind: str, processes: int = 1, llm_workers: int = None, follow: bool = False) -> int:
+    ensure_indexes()
+    if processes <= 1:
+        return 1 if asyncio.run(run_worker(kind, llm_workers, follow)) else 0
+
+    # The client-side Azure caps are per process, so the host's quota is split between them
+    for key, limit in (("AZURE_RPM_LIMIT", AZURE_RPM_LIMIT), ("AZURE_TPM_LIMIT", AZURE_TPM_LIMIT)):
+        if limit:
+            os.environ[key] = str(max(limit // processes, 1))
+
+    context = multiprocessing.get_context("spawn")
+    workers = [
+        context.Process(target=_worker_process, args=(kind, llm_workers, follow), name=f"ingest-{i}")
+        for i in range(processes)
+    ]
+    for p in workers:
+        p.start()
+    for p in workers:
+        p.join()
+
+    failed = sum(p.exitcode != 0 for p in workers)
+    print(f"📥 Queue ({kind}): {processes} worker processes finished, {failed} with errors")
+    return 1 if failed else 0
+
+
+def queue_status():
+    counts = {}
+    for row in queue_collection.aggregate([
+        {"$group": {"_id": {"kind": "$kind", "status": "$status"}, "count": {"$sum": 1}}}
+    ]):
+        counts.setdefault(row["_id"]["kind"], {})[row["_id"]["status"]] = row["count"]
+
+    if not counts:
+        print("📥 Queue is empty.")
+    for kind, by_status in sorted(counts.items()):
+        expired = queue_collection.count_documents(
+            {"kind": kind, "status": LEASED, "lease_expires": {"$lt": datetime.utcnow()}}
+        )
+        print(
+            f"📥 Queue ({kind}): {by_status.get(PENDING, 0)} pending, "
+            f"{by_status.get(LEASED, 0)} leased ({expired} expired), {by_status.get(FAILED, 0)} failed"
+        )
+    return counts
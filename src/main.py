@@ -1,44 +1,133 @@
-import os
+import sys
 import asyncio
-from parsers.resume_parser import parse_resume
-from parsers.jd_parser import parse_jd
+import argparse
 from matcher.matcher import match_job_to_resumes, match_resume_to_jobs
-from database.mongo import resume_collection,job_collection
+from matcher.profiles import PROFILES, get_profile
+from matcher.result_cache import cached_match, match_cache
+from matcher.engine import get_engine
+from matcher.bulk import DIRECTIONS, match_all
+from matcher.backfill import backfill_norm_fields
+from matcher.inverted_index import build_skill_index
+from service.server import run_service
+from database.mongo import ensure_indexes
+from database.listing import LISTINGS, list_page
+from ingestion.manifest import purge_missing
+from batch.commands import INGEST_KINDS, MATCH_KINDS, ingest, match_ids, match_all_pairs
+from batch.sharding import parse_shard, parse_id_range
+from ingestion.work_queue import enqueue, run_workers, queue_status
+from config.settings import INCREMENTAL_INGEST, MATCH_ENGINE, SERVICE_HOST, SERVICE_PORT, SCORING_PROFILE
 
 RESUME_DIR = "data/input/resumes"
 JD_DIR = "data/input/jd"
 
 
-async def parse_all_resumes():
-    files = [
-        os.path.join(RESUME_DIR, f)
-        for f in os.listdir(RESUME_DIR)
-        if f.lower().endswith(".pdf")
-    ]
+async def parse_all_resumes(incremental: bool = INCREMENTAL_INGEST):
+    # Ingestion pulls in the LLM client; imported here so match-only commands stay light
+    from ingestion.pipeline import run_ingestion
+    stats = await run_ingestion("resume", RESUME_DIR, incremental)
 
-    if not files:
-        print("No resume files found.")
+    if not stats[0].processed:
+        print("No new or changed resume files found.")
         return
 
-    await asyncio.gather(*(parse_resume(f) for f in files),return_exceptions=True)
     print("All resumes parsed successfully.\n")
     
 
-async def parse_all_jds():
-    files = [
-        os.path.join(JD_DIR, f)
-        for f in os.listdir(JD_DIR)
-        if f.lower().endswith(".pdf")
-    ]
+async def parse_all_jds(incremental: bool = INCREMENTAL_INGEST):
+    from ingestion.pipeline import run_ingestion
+    stats = await run_ingestion("jd", JD_DIR, incremental)
 
-    if not files:
-        print("No JD files found.")
+    if not stats[0].processed:
+        print("No new or changed JD files found.")
         return
 
-    await asyncio.gather(*(parse_jd(f) for f in files),return_exceptions=True)
     print("All JDs parsed successfully.\n")
 
 
+def match_resume(candidate_id: str, top_n: int, profile=None):
+    profile = get_profile(profile)
+
+    def compute():
+        if MATCH_ENGINE == "memory":
+            return get_engine().match_resume_to_jobs(candidate_id, top_n, profile)
+        return match_resume_to_jobs(candidate_id, top_n, profile)
+
+    return cached_match("resume_to_jobs", candidate_id, top_n, (MATCH_ENGINE, profile.key), compute)
+
+
+def match_job(job_id: str, top_n: int, profile=None):
+    profile = get_profile(profile)
+
+    def compute():
+        if MATCH_ENGINE == "memory":
+            return get_engine().match_job_to_resumes(job_id, top_n, profile)
+        return match_job_to_resumes(job_id, top_n, profile)
+
+    return cached_match("job_to_resumes", job_id, top_n, (MATCH_ENGINE, profile.key), compute)
+
+
+def ask_profile():
+    if len(PROFILES) == 1:
+        return None
+    name = input(
+        f"Enter scoring profile ({', '.join(PROFILES)}; default {SCORING_PROFILE}): "
+    ).strip()
+    return name or None
+
+
+def describe(kind: str, doc: dict) -> str:
+    if kind == "resume":
+        return f"{doc.get('name') or 'Unknown'} | {doc.get('email')}"
+    return f"{doc.get('job_id')} | {doc.get('technology')}"
+
+
+def select_document(kind: str):
+    # Keyset-paged picker with whole-word search; returns a candidate_id / job_id or None.
+    # Each page is one bounded, projected query instead of the whole collection.
+    key = LISTINGS[kind]["key"]
+    label = "candidate" if kind == "resume" else "job"
+    page_starts, search = [None], None
+
+    while True:
+        docs, more = list_page(kind, page_starts[-1], search)
+
+        if not docs and not search and len(page_starts) == 1:
+            print(f"No {label}s found in database.\n")
+            return None
+
+        title = f"Available {label.title()}s" + (f" matching '{search}'" if search else "")
+        print(f"\n{title} (page {len(page_starts)}):")
+        if not docs:
+            print("  (none)")
+        for idx, doc in enumerate(docs, 1):
+            print(f"{idx}. {describe(kind, doc)}")
+
+        hints = ["/word or /full name to search", "/ to clear"]
+        if more:
+            hints.append("n = next page")
+        if len(page_starts) > 1:
+            hints.append("p = previous page")
+        selected = input(f"\nEnter {label} number or {key} ({', '.join(hints)}): ").strip()
+
+        if selected.lower() == "n":
+            if more:
+                page_starts.append(docs[-1][key])
+        elif selected.lower() == "p":
+            if len(page_starts) > 1:
+                page_starts.pop()
+        elif selected.startswith("/"):
+            search = selected[1:].strip() or None
+            page_starts = [None]
+        elif selected.isdigit():
+            index = int(selected) - 1
+            if 0 <= index < len(docs):
+                return docs[index][key]
+            print("Invalid selection.\n")
+            return None
+        else:
+            return selected or None
+
+
 def main_menu():
     while True:
         try:
@@ -47,7 +136,9 @@ def main_menu():
             print("2. Parse JDs")
             print("3. Match Resume → Top JDs")
             print("4. Match Job → Top Resumes")
-            print("5. Exit")
+            print("5. Purge Deleted Input Files")
+            print("6. Match All Jobs ↔ Resumes (refresh shortlists)")
+            print("7. Exit")
 
             choice = input("Enter choice: ").strip()
 
@@ -67,37 +158,19 @@ def main_menu():
 
             elif choice == "3":
                 try:
-                    resumes = list(
-                        resume_collection.find({}, {"candidate_id": 1, "name": 1, "email": 1})
-                    )
-
-                    if not resumes:
-                        print("No resumes found in database.\n")
+                    candidate_id = select_document("resume")
+                    if not candidate_id:
                         continue
 
-                    print("\nAvailable Candidates:")
-                    for idx, r in enumerate(resumes, 1):
-                        print(f"{idx}. {r.get('name', 'Unknown')} | {r.get('email')}")
-
-                    selected = input("\nEnter candidate number or candidate_id: ").strip()
                     number = input("Enter number of top matches to display (default 5): ").strip()
+                    profile = ask_profile()
 
                     if number.isdigit() and int(number) > 0:
                         top_n = int(number)
                     else:
                         top_n = 5
 
-                    if selected.isdigit():
-                        selected_index = int(selected) - 1
-                        if 0 <= selected_index < len(resumes):
-                            candidate_id = resumes[selected_index]["candidate_id"]
-                        else:
-                            print("Invalid selection.\n")
-                            continue
-                    else:
-                        candidate_id = selected
-
-                    results = match_resume_to_jobs(candidate_id, top_n)
+                    results = match_resume(candidate_id, top_n, profile)
 
                     if not results:
                         print("No matching jobs found.\n")
@@ -115,37 +188,19 @@ def main_menu():
 
             elif choice == "4":
                 try:
-                    jobs = list(
-                        job_collection.find({}, {"job_id": 1, "technology": 1})
-                    )
-
-                    if not jobs:
-                        print("No jobs found.\n")
+                    job_id = select_document("jd")
+                    if not job_id:
                         continue
 
-                    print("\nAvailable Jobs:")
-                    for idx, j in enumerate(jobs, 1):
-                        print(f"{idx}. {j.get('job_id')} | {j.get('technology')}")
-
-                    selected = input("\nEnter job number or job_id: ").strip()
                     number = input("Enter number of top matches to display (default 5): ").strip()
+                    profile = ask_profile()
 
                     if number.isdigit() and int(number) > 0:
                         top_n = int(number)
                     else:
                         top_n = 5
 
-                    if selected.isdigit():
-                        selected_index = int(selected) - 1
-                        if 0 <= selected_index < len(jobs):
-                            job_id = jobs[selected_index]["job_id"]
-                        else:
-                            print("Invalid selection.\n")
-                            continue
-                    else:
-                        job_id = selected
-
-                    results = match_job_to_resumes(job_id, top_n)
+                    results = match_job(job_id, top_n, profile)
 
                     if not results:
                         print("No matching resumes found.\n")
@@ -160,11 +215,32 @@ def main_menu():
                     print(f"Error during Job → Resume matching: {e}")
 
             elif choice == "5":
+                try:
+                    delete_docs = input(
+                        "Also delete parsed resumes/JDs for deleted files? (y/N): "
+                    ).strip().lower() == "y"
+                    purge_missing("resume", delete_docs)
+                    purge_missing("jd", delete_docs)
+                except Exception as e:
+                    print(f"Error while purging manifest: {e}")
+
+            elif choice == "6":
+                try:
+                    number = input("Enter number of top matches to store (default 5): ").strip()
+                    top_n = int(number) if number.isdigit() and int(number) > 0 else 5
+                    match_all(top_n)
+                except Exception as e:
+                    print(f"Error during bulk matching: {e}")
+
+            elif choice == "7":
+                match_cache.report()
                 print("Exiting system. Goodbye!")
+                from parsers.pdf_extractor import shutdown_extract_executor
+                shutdown_extract_executor()
                 break
 
             else:
-                print("Invalid choice. Please select 1-5.\n")
+                print("Invalid choice. Please select 1-7.\n")
 
         except KeyboardInterrupt:
             print("\nProgram interrupted by user. Exiting safely.")
@@ -174,5 +250,150 @@ def main_menu():
             print(f"Unexpected system error: {e}")
 
 
-if __name__ == "__main__":
+def parse_profiles(value: str):
+    names = [n.strip() for n in value.split(",") if n.strip()]
+    unknown = [n for n in names if n not in PROFILES]
+    if not names or unknown:
+        raise argparse.ArgumentTypeError(f"expected profiles from {', '.join(PROFILES)}")
+    return names
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Job Matcher System (interactive menu when no command is given)")
+    commands = parser.add_subparsers(dest="command")
+
+    commands.add_parser("ensure-indexes", help="create the MongoDB indexes (ingestion also does this on start)")
+    commands.add_parser(
+        "backfill-norm", help="compute *_norm match fields and search terms for existing resumes and JDs"
+    )
+    commands.add_parser("build-skill-index", help="rebuild the persisted skill → posting list index")
+
+    serve = commands.add_parser("serve", help="run the HTTP match service")
+    serve.add_argument("--host", default=SERVICE_HOST, help="bind address")
+    serve.add_argument("--port", type=int, default=SERVICE_PORT, help="port")
+
+    # Batch commands stream JSON Lines; --shard / --id-range split work across processes
+    def add_batch_options(command):
+        command.add_argument("--output", "-o", default=None, help="JSONL file (default: stdout)")
+        command.add_argument("--shard", type=parse_shard, default=None, metavar="K/N",
+                             help="only ids (or file names) whose stable hash falls in shard K of N")
+
+    ingest = commands.add_parser("ingest", help="parse input PDFs and store them, one JSONL record per document")
+    ingest.add_argument("kind", choices=list(INGEST_KINDS))
+    ingest.add_argument("--dir", default=None, help="input directory (default: data/input/resumes|jd)")
+    ingest.add_argument("--workers", type=int, default=None, help="LLM stage workers (default: PIPELINE_LLM_WORKERS)")
+    ingest.add_argument("--full", action="store_true", help="re-parse every file, not only new or changed ones")
+    add_batch_options(ingest)
+
+    queue = commands.add_parser("queue", help="distributed ingestion through the ingest_queue collection")
+    actions = queue.add_subparsers(dest="action", required=True)
+    enqueue_cmd = actions.add_parser("enqueue", help="add new / changed input files to the queue")
+    enqueue_cmd.add_argument("kind", choices=list(INGEST_KINDS))
+    enqueue_cmd.add_argument("--dir", default=None, help="input directory (default: data/input/resumes|jd)")
+    enqueue_cmd.add_argument("--full", action="store_true", help="enqueue every file, not only new or changed ones")
+    work = actions.add_parser("work", help="claim and ingest queued files until the queue is drained")
+    work.add_argument("kind", choices=list(INGEST_KINDS))
+    work.add_argument("--processes", type=int, default=1, help="worker processes on this host")
+    work.add_argument("--workers", type=int, default=None, help="LLM stage workers per process")
+    work.add_argument("--follow", action="store_true", help="keep polling for new items instead of exiting")
+    actions.add_parser("status", help="pending / leased / failed counts")
+
+    batch = commands.add_parser("batch", help="offline ingestion through the Azure OpenAI Batch API")
+    steps = batch.add_subparsers(dest="action", required=True)
+    submit = steps.add_parser("submit", help="write and submit batch requests for new / changed files")
+    submit.add_argument("kind", choices=list(INGEST_KINDS))
+    submit.add_argument("--dir", default=None, help="input directory (default: data/input/resumes|jd)")
+    submit.add_argument("--full", action="store_true", help="every file, not only new or changed ones")
+    submit.add_argument("--backend", choices=["azure", "local"], default=None, help="default: BATCH_BACKEND")
+    collect = steps.add_parser("collect", help="wait for submitted batches, cache the answers and ingest")
+    collect.add_argument("--kind", choices=list(INGEST_KINDS), default=None)
+    collect.add_argument("--no-wait", action="store_true", help="only collect batches that already finished")
+    collect.add_argument("--no-ingest", action="store_true", help="cache the answers without running ingestion")
+    steps.add_parser("status", help="recent batches and their state")
+
+    match = commands.add_parser("match", help="stream shortlists, one JSONL record per source document")
+    match.add_argument("kind", choices=list(MATCH_KINDS) + ["all"])
+    match.add_argument("ids", nargs="*", help="resume: candidate_ids, job: job_ids (default: all)")
+    match.add_argument("--ids-file", default=None, help="file with one id per line, - for stdin")
+    match.add_argument("--top-n", type=int, default=5)
+    match.add_argument("--profile", choices=list(PROFILES), default=None, help=f"scoring profile (default: {SCORING_PROFILE})")
+    match.add_argument("--profiles", type=parse_profiles, default=None, metavar="A,B",
+                       help="resume|job: one shortlist per profile (A/B comparison)")
+    match.add_argument("--direction", choices=list(DIRECTIONS), default=None, help="all: only this direction")
+    match.add_argument("--id-range", type=parse_id_range, default=None, metavar="START:END",
+                       help="only ids in [START, END); either end may be empty")
+    add_batch_options(match)
+
+    return parser
+
+
+def main():
+    parser = build_parser()
+    args = parser.parse_args()
+
+    if args.command == "ensure-indexes":
+        ensure_indexes()
+        return 0
+
+    if args.command == "backfill-norm":
+        ensure_indexes()
+        backfill_norm_fields()
+        return 0
+
+    if args.command == "build-skill-index":
+        ensure_indexes()
+        build_skill_index()
+        return 0
+
+    if args.command == "serve":
+        run_service(args.host, args.port)
+        return 0
+
+    if args.command == "ingest":
+        return ingest(args.kind, args.dir, args.workers, args.full, args.shard, args.output)
+
+    if args.command == "queue":
+        if args.action == "status":
+            queue_status()
+            return 0
+        kind, default_directory = INGEST_KINDS[args.kind]
+        if args.action == "enqueue":
+            ensure_indexes()
+            enqueue(kind, args.dir or default_directory, INCREMENTAL_INGEST and not args.full)
+            return 0
+        return run_workers(kind, args.processes, args.workers, args.follow)
+
+    if args.command == "batch":
+        # Imported here: batch mode pulls in the parsers and the LLM client
+        from ingestion.batch_mode import submit_batches, collect_batches, batch_status
+        if args.action == "status":
+            asyncio.run(batch_status())
+            return 0
+        if args.action == "submit":
+            ensure_indexes()
+            kind, default_directory = INGEST_KINDS[args.kind]
+            asyncio.run(submit_batches(
+                kind, args.dir or default_directory, INCREMENTAL_INGEST and not args.full, args.backend
+            ))
+            return 0
+        kind = INGEST_KINDS[args.kind][0] if args.kind else None
+        asyncio.run(collect_batches(kind, not args.no_wait, not args.no_ingest))
+        return 0
+
+    if args.command == "match":
+        if args.kind == "all":
+            if args.profiles:
+                parser.error("--profiles applies to match resume|job")
+            directions = (args.direction,) if args.direction else DIRECTIONS
+            return match_all_pairs(args.top_n, args.profile, directions, args.shard, args.id_range, args.output)
+        return match_ids(
+            args.kind, args.ids, args.ids_file, args.top_n, args.profile,
+            args.shard, args.id_range, args.output, args.profiles
+        )
+
     main_menu()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,40 @@
+from pymongo import UpdateOne
+from database.mongo import resume_collection, job_collection
+from database.versions import record_changes
+from database.listing import SEARCH_SOURCE_FIELDS, search_terms
+from matcher.normalize import NORM_FIELDS, EXPERIENCE_FIELDS, SKILL_SCORES_FIELD, build_norm_fields
+from matcher.inverted_index import invalidate_skill_index
+
+BACKFILL_BATCH_SIZE = 1000
+
+
+def backfill_collection(collection, name: str, batch_size: int = BACKFILL_BATCH_SIZE):
+    projection = {
+        raw: 1
+        for raw in tuple(NORM_FIELDS) + EXPERIENCE_FIELDS + (SKILL_SCORES_FIELD,) + SEARCH_SOURCE_FIELDS
+    }
+    ops = []
+    updated = 0
+
+    for doc in collection.find({}, projection).batch_size(batch_size):
+        ops.append(UpdateOne({"_id": doc["_id"]}, {"$set": {**build_norm_fields(doc), **search_terms(doc)}}))
+        if len(ops) >= batch_size:
+            updated += collection.bulk_write(ops, ordered=False).modified_count
+            ops = []
+
+    if ops:
+        updated += collection.bulk_write(ops, ordered=False).modified_count
+
+    print(f"🧮 Backfilled normalized match / search fields: {updated} {name} updated")
+    return updated
+
+
+def backfill_norm_fields():
+    # Rewritten *_norm fields keep their timestamps, so the persisted skill index would
+    # not see them as fresh: it is dropped first (also covers an interrupted backfill).
+    # Every stored answer may change, so both sides are reported as fully changed
+    invalidate_skill_index()
+    if backfill_collection(resume_collection, "resumes"):
+        record_changes("resumes")
+    if backfill_collection(job_collection, "jobs"):
+        record_changes("jobs")
@@ -0,0 +1,91 @@
+import time
+from datetime import datetime
+from pymongo import ReplaceOne
+from database.mongo import match_collection
+from matcher.engine import get_engine, score_block, top_n_indices
+from matcher.profiles import get_profile
+from config.settings import MATCH_BLOCK_CELLS, MATCH_WRITE_BATCH_SIZE
+
+DIRECTIONS = ("job_to_resumes", "resume_to_jobs")
+
+
+def _sides(engine, direction):
+    if direction == "job_to_resumes":
+        return engine.jobs, engine.resumes
+    return engine.resumes, engine.jobs
+
+
+# -----------------------------
+# All-pairs scoring in blocks
+# -----------------------------
+def iter_all_matches(engine=None, top_n: int = 5, directions=DIRECTIONS, rows=None, profile=None):
+    # Yields one shortlist per source document; each block scores up to
+    # MATCH_BLOCK_CELLS (query × candidate) cells with the same rules as the matcher
+    engine = engine or get_engine()
+    profile = get_profile(profile)
+
+    for direction in directions:
+        queries, candidates = _sides(engine, direction)
+        if not len(candidates):
+            continue
+
+        selected = list(range(len(queries))) if rows is None else list(rows)
+        block_size = max(1, MATCH_BLOCK_CELLS // len(candidates))
+
+        for start in range(0, len(selected), block_size):
+            block = selected[start:start + block_size]
+            scores = score_block(queries, block, candidates, profile)
+
+            for i, row in enumerate(block):
+                yield {
+                    "direction": direction,
+                    "source_id": queries.ids[row],
+                    "matches": [
+                        {**candidates.outputs[j], "total_score": float(scores[i, j])}
+                        for j in top_n_indices(scores[i], top_n)
+                    ]
+                }
+
+
+# -----------------------------
+# Write shortlists to the matches collection
+# -----------------------------
+def match_all(top_n: int = 5, directions=DIRECTIONS, reload: bool = True, profile=None):
+    engine = get_engine(reload=reload)
+    profile = get_profile(profile)
+    computed_at = datetime.utcnow()
+    started = time.perf_counter()
+
+    ops = []
+    counts = {d: 0 for d in directions}
+
+    def flush():
+        if ops:
+            match_collection.bulk_write(ops, ordered=False)
+            ops.clear()
+
+    for shortlist in iter_all_matches(engine, top_n, directions, profile=profile):
+        doc_id = f"{shortlist['direction']}:{shortlist['source_id']}"
+        ops.append(ReplaceOne(
+            {"_id": doc_id},
+            {**shortlist, "top_n": top_n, "profile": profile.name, "computed_at": computed_at},
+            upsert=True
+        ))
+        counts[shortlist["direction"]] += 1
+        if len(ops) >= MATCH_WRITE_BATCH_SIZE:
+            flush()
+    flush()
+
+    # Shortlists for documents that no longer exist
+    stale = match_collection.delete_many({
+        "direction": {"$in": list(directions)},
+        "computed_at": {"$lt": computed_at}
+    }).deleted_count
+
+    elapsed = time.perf_counter() - started
+    print(
+        f"🔗 Bulk match: {counts.get('job_to_resumes', 0)} job shortlists, "
+        f"{counts.get('resume_to_jobs', 0)} resume shortlists, {stale} stale removed "
+        f"in {elapsed:.1f}s"
+    )
+    return counts
@@ -0,0 +1,389 @@
+import copy
+import numpy as np
+from datetime import datetime
+from scipy import sparse
+from database.mongo import resume_collection, job_collection
+from database.versions import read_versions
+from matcher.normalize import NORM_FIELDS, SKILL_FIELDS, SKILL_SCORES_FIELD, EXPERIENCE_NORM, norm_fields_of
+from matcher.inverted_index import SkillIndex
+from matcher.profiles import get_profile
+from config.settings import SKILL_INDEX_PRUNING
+
+# In-process alternative to the aggregation pipelines in matcher.matcher.
+# Every document's skills are loaded once into a token vocabulary and sparse
+# row matrices, so one query scores all candidates with a few mat-vec products.
+# Overlap counts do not depend on the scoring profile; a profile only decides
+# how they are combined (total_scores), so several profiles share one pass.
+
+SCORED_FIELDS = ("primary_skills", "secondary_skills", "location", "education")
+
+RESUME_OUTPUT_FIELDS = ("candidate_id", "name", "email")
+JOB_OUTPUT_FIELDS = ("job_id", "job_summary", "technology", "category")
+
+
+# -----------------------------
+# Experience fit (mirrors matcher.experience_fit and the $match bound)
+# -----------------------------
+def experience_gap(query_experience, candidate_experience, candidates_are_jobs: bool):
+    # Required years - candidate years, subtracted in the same order as the pipeline
+    if candidates_are_jobs:
+        return candidate_experience - query_experience
+    return query_experience - candidate_experience
+
+
+def experience_allowed(query_experience, candidate_experience, candidates_are_jobs: bool, profile):
+    if not profile.experience_hard_filter:
+        return np.ones(np.broadcast(query_experience, candidate_experience).shape, dtype=bool)
+    if candidates_are_jobs:
+        return candidate_experience <= query_experience + profile.experience_grace_years
+    return candidate_experience >= query_experience - profile.experience_grace_years
+
+
+def experience_fit(gap, weight, grace_years):
+    if grace_years <= 0:
+        return np.where(gap <= 0, weight, 0)
+    return np.where(gap <= 0, weight, np.maximum(0, weight * (1 - gap / grace_years)))
+
+
+def _binary_matrix(rows, vocab, weights=None):
+    # One row per token list; 1 per present token, or its weight when weights
+    # (aligned with each token list) are given
+    indptr = [0]
+    indices = []
+    data = []
+    for i, tokens in enumerate(rows):
+        present = {}
+        for j, t in enumerate(tokens):
+            if t in vocab:
+                present[vocab[t]] = weights[i][j] if weights is not None else 1
+        columns = sorted(present)
+        indices.extend(columns)
+        data.extend(present[c] for c in columns)
+        indptr.append(len(indices))
+    return sparse.csr_matrix(
+        (np.array(data, dtype=np.float64), np.array(indices, dtype=np.int64), np.array(indptr, dtype=np.int64)),
+        shape=(len(rows), len(vocab))
+    )
+
+
+# -----------------------------
+# One collection, as candidates and as queries
+# -----------------------------
+class MatchSide:
+
+    def __init__(self, docs, id_field, output_fields, is_jobs: bool):
+        self.id_field = id_field
+        self.is_jobs = is_jobs
+        self.ids = [d.get(id_field) for d in docs]
+        self.position = {doc_id: i for i, doc_id in enumerate(self.ids)}
+        self.outputs = [
+            {f: d[f] for f in (id_field,) + output_fields if f in d}
+            for d in docs
+        ]
+
+        # The *_norm fields serve both as query values and as candidate values
+        self.values = []
+        self.importance = []
+        experience = []
+        for d in docs:
+            norm = norm_fields_of(d)
+            self.values.append({f: norm[NORM_FIELDS[f]] for f in SCORED_FIELDS})
+            self.importance.append({f: norm[f"{NORM_FIELDS[f]}_weights"] for f in SKILL_FIELDS})
+            experience.append(norm[EXPERIENCE_NORM])
+
+        # Years required (jobs) or held (resumes)
+        self.experience = np.array(experience, dtype=np.float64)
+
+        self.vocab = {}
+        for row in self.values:
+            for tokens in row.values():
+                for t in tokens:
+                    self.vocab.setdefault(t, len(self.vocab))
+
+        self.matrices = {
+            f: _binary_matrix([row[f] for row in self.values], self.vocab)
+            for f in SCORED_FIELDS
+        }
+
+        # Same as {"$max": ["$<field>_norm_size", 1]}
+        self.denominators = {
+            f: np.maximum(np.array([len(row[f]) for row in self.values], dtype=np.float64), 1)
+            for f in SKILL_FIELDS
+        }
+
+        # Weighted skill scoring: skill importance instead of 1, and its total per document
+        self.weighted_matrices = {
+            f: _binary_matrix([row[f] for row in self.values], self.vocab, [row[f] for row in self.importance])
+            for f in SKILL_FIELDS
+        }
+        self.weight_totals = {
+            f: np.maximum(np.array([sum(row[f]) for row in self.importance], dtype=np.float64), 1)
+            for f in SKILL_FIELDS
+        }
+
+    def __len__(self):
+        return len(self.ids)
+
+    def query_vectors(self, rows, vocab):
+        # Stacks query tokens of the given rows into a (len(rows) × |vocab|) matrix per field
+        return {
+            f: _binary_matrix([self.values[r][f] for r in rows], vocab)
+            for f in SCORED_FIELDS
+        }
+
+    def weighted_query_vectors(self, rows, vocab):
+        # Same for the skill fields, with skill importance as values
+        return {
+            f: _binary_matrix(
+                [self.values[r][f] for r in rows], vocab, [self.importance[r][f] for r in rows]
+            )
+            for f in SKILL_FIELDS
+        }
+
+    def query_importance(self, row):
+        # field → ({token: importance}, importance total) of one query document
+        return {
+            f: (dict(zip(self.values[row][f], self.importance[row][f])), self.weight_totals[f][row])
+            for f in SKILL_FIELDS
+        }
+
+
+# -----------------------------
+# Scoring
+# -----------------------------
+def skill_fraction(counts: dict, field: str, candidates: MatchSide, columns, profile, query_totals=None):
+    # binary: shared skills / candidate skill count.
+    # weighted: JD importance of the shared skills / JD importance of all its skills, so
+    # the job's weights and total are used whichever side the job is on; counts holds the
+    # importance sums as "<field>_weighted" and query_totals the query's totals.
+    if not profile.weighted:
+        return counts[field] / candidates.denominators[field][columns]
+    if candidates.is_jobs:
+        return counts[f"{field}_weighted"] / candidates.weight_totals[field][columns]
+    return counts[f"{field}_weighted"] / query_totals[field]
+
+
+def total_scores(counts: dict, candidates: MatchSide, columns, query_experience, profile, query_totals=None):
+    # Combines per-field overlap counts exactly like the compiled pipeline stages;
+    # columns selects the candidate rows the counts belong to. -inf where the
+    # experience bound or min_score would have dropped the candidate.
+    w = profile.weights
+    candidate_experience = candidates.experience[columns]
+
+    primary_score = skill_fraction(counts, "primary_skills", candidates, columns, profile, query_totals) * w["primary"]
+    secondary_score = skill_fraction(counts, "secondary_skills", candidates, columns, profile, query_totals) * w["secondary"]
+    experience_score = experience_fit(
+        experience_gap(query_experience, candidate_experience, candidates.is_jobs),
+        w["experience"], profile.experience_grace_years
+    )
+    location_score = np.where(counts["location"] > 0, w["location"], 0)
+    education_score = np.where(counts["education"] > 0, w["education"], 0)
+
+    total = np.round(
+        primary_score + secondary_score + experience_score + location_score + education_score, 2
+    )
+    allowed = experience_allowed(query_experience, candidate_experience, candidates.is_jobs, profile)
+    if profile.min_score is not None:
+        allowed = allowed & (total >= profile.min_score)
+    return np.where(allowed, total, -np.inf)
+
+
+def overlap_block(queries: MatchSide, rows, candidates: MatchSide, weighted: bool = False):
+    # Per-field overlap counts of query rows against every candidate, (len(rows) × N) each,
+    # and the $or/$in prefilter mask; weighted adds the importance sums of the shared skills
+    q = queries.query_vectors(rows, candidates.vocab)
+    counts = {f: (q[f] @ candidates.matrices[f].T).toarray() for f in SCORED_FIELDS}
+    prefilter = (counts["primary_skills"] > 0) | (counts["secondary_skills"] > 0)
+
+    if weighted:
+        if candidates.is_jobs:
+            for f in SKILL_FIELDS:
+                counts[f"{f}_weighted"] = (q[f] @ candidates.weighted_matrices[f].T).toarray()
+        else:
+            qw = queries.weighted_query_vectors(rows, candidates.vocab)
+            for f in SKILL_FIELDS:
+                counts[f"{f}_weighted"] = (qw[f] @ candidates.matrices[f].T).toarray()
+    return counts, prefilter
+
+
+def query_totals_of(queries: MatchSide, rows):
+    # Importance totals of the query rows, as a column per field
+    return {f: queries.weight_totals[f][rows][:, None] for f in SKILL_FIELDS}
+
+
+def score_block(queries: MatchSide, rows, candidates: MatchSide, profile=None):
+    # Scores query rows against every candidate: returns a (len(rows) × N) array,
+    # -inf where the $or/$in prefilter would have dropped the candidate.
+    profile = get_profile(profile)
+    counts, prefilter = overlap_block(queries, rows, candidates, profile.weighted)
+    total = total_scores(
+        counts, candidates, slice(None), queries.experience[rows][:, None], profile,
+        query_totals_of(queries, rows)
+    )
+    return np.where(prefilter, total, -np.inf)
+
+
+def score_pruned(queries: MatchSide, row, candidates: MatchSide, index: SkillIndex, top_n: int, profile):
+    # Single query through the inverted index: overlap counts come from the posting
+    # lists, and only candidates that can still reach the top-N are scored.
+    # Returns (candidate rows, scores); rows are sorted, so ties keep load order.
+    query = queries.values[row]
+    importance = queries.query_importance(row) if profile.weighted else None
+    counts = index.overlap_counts(query, importance)
+    query_experience = queries.experience[row]
+    query_totals = {f: queries.weight_totals[f][row] for f in SKILL_FIELDS}
+
+    def score_rows(columns):
+        return total_scores(
+            {f: c[columns] for f, c in counts.items()}, candidates, columns, query_experience, profile,
+            query_totals
+        )
+
+    blocks = index.blocks_for(query, profile, importance)
+    columns = index.candidate_rows(blocks, top_n, profile, score_rows)
+    return columns, score_rows(columns)
+
+
+def top_n_indices(scores, top_n: int):
+    # Indices of the top_n finite scores, best first (ties keep load order)
+    valid = np.flatnonzero(np.isfinite(scores))
+    if top_n <= 0 or not len(valid):
+        return valid[:0]
+    if len(valid) > top_n:
+        # Keep every candidate tied with the N-th score so the cut is by load order
+        kth = -np.partition(-scores[valid], top_n - 1)[top_n - 1]
+        valid = valid[scores[valid] >= kth]
+    order = np.lexsort((valid, -scores[valid]))[:top_n]
+    return valid[order]
+
+
+# -----------------------------
+# Engine
+# -----------------------------
+# name → (id field, output fields, whether the side's experience is a requirement)
+SIDE_SPECS = {
+    "resumes": ("candidate_id", RESUME_OUTPUT_FIELDS[1:], False),
+    "jobs": ("job_id", JOB_OUTPUT_FIELDS[1:], True),
+}
+
+PROJECTIONS = {
+    name: {
+        "_id": 0, "minimum_experience_in_years": 1, "total_experience_years": 1, EXPERIENCE_NORM: 1,
+        SKILL_SCORES_FIELD: 1,
+        **{f: 1 for f in SCORED_FIELDS + tuple(NORM_FIELDS.values()) + output_fields},
+        **{f"{NORM_FIELDS[f]}_weights": 1 for f in SKILL_FIELDS},
+    }
+    for name, output_fields in (("resumes", RESUME_OUTPUT_FIELDS), ("jobs", JOB_OUTPUT_FIELDS))
+}
+
+
+def build_side(name: str, docs):
+    side = MatchSide(docs, *SIDE_SPECS[name])
+    return side, SkillIndex(side, match_fields=("location", "education"))
+
+
+class MatchEngine:
+
+    def __init__(self, resumes, jobs, loaded_at=None):
+        self.loaded_at = loaded_at or datetime.utcnow()
+        self.resumes, self.resume_index = build_side("resumes", resumes)
+        self.jobs, self.job_index = build_side("jobs", jobs)
+        self.pruning = SKILL_INDEX_PRUNING
+
+    @classmethod
+    def from_mongo(cls):
+        loaded_at = datetime.utcnow()
+        return cls(load_side("resumes"), load_side("jobs"), loaded_at)
+
+    def replace_side(self, name: str, docs, loaded_at):
+        # New engine with one side rebuilt from docs and the other shared, so a
+        # running engine is never modified while queries read it
+        engine = copy.copy(self)
+        engine.loaded_at = min(self.loaded_at, loaded_at)
+        if name == "resumes":
+            engine.resumes, engine.resume_index = build_side(name, docs)
+        else:
+            engine.jobs, engine.job_index = build_side(name, docs)
+        return engine
+
+    def _sides(self, direction: str):
+        if direction == "job_to_resumes":
+            return self.jobs, self.resumes, self.resume_index
+        return self.resumes, self.jobs, self.job_index
+
+    def match(self, direction: str, doc_id, top_n: int = 5, profile=None):
+        profile = get_profile(profile)
+        queries, candidates, index = self._sides(direction)
+        row = queries.position.get(doc_id)
+        if row is None or not len(candidates):
+            return []
+
+        if not self.pruning:
+            scores = score_block(queries, [row], candidates, profile)[0]
+            return [
+                {**candidates.outputs[i], "total_score": float(scores[i])}
+                for i in top_n_indices(scores, top_n)
+            ]
+
+        columns, scores = score_pruned(queries, row, candidates, index, top_n, profile)
+        return [
+            {**candidates.outputs[columns[i]], "total_score": float(scores[i])}
+            for i in top_n_indices(scores, top_n)
+        ]
+
+    def compare_profiles(self, direction: str, doc_id, profiles, top_n: int = 5):
+        # A/B: overlap counts are computed once and combined per profile
+        profiles = {p.name: p for p in map(get_profile, profiles)}
+        queries, candidates, _ = self._sides(direction)
+        row = queries.position.get(doc_id)
+        if row is None or not len(candidates):
+            return {name: [] for name in profiles}
+
+        weighted = any(p.weighted for p in profiles.values())
+        counts, prefilter = overlap_block(queries, [row], candidates, weighted)
+        counts = {f: c[0] for f, c in counts.items()}
+        query_totals = {f: queries.weight_totals[f][row] for f in SKILL_FIELDS}
+
+        results = {}
+        for name, profile in profiles.items():
+            scores = np.where(
+                prefilter[0],
+                total_scores(counts, candidates, slice(None), queries.experience[row], profile, query_totals),
+                -np.inf
+            )
+            results[name] = [
+                {**candidates.outputs[i], "total_score": float(scores[i])}
+                for i in top_n_indices(scores, top_n)
+            ]
+        return results
+
+    def match_resume_to_jobs(self, candidate_id: str, top_n: int = 5, profile=None):
+        return self.match("resume_to_jobs", candidate_id, top_n, profile)
+
+    def match_job_to_resumes(self, job_id: str, top_n: int = 5, profile=None):
+        return self.match("job_to_resumes", job_id, top_n, profile)
+
+
+def load_side(name: str):
+    collection = resume_collection if name == "resumes" else job_collection
+    return list(collection.find({}, PROJECTIONS[name]))
+
+
+_engine = None
+_engine_versions = {}
+
+
+def get_engine(reload: bool = False) -> MatchEngine:
+    # A side whose change counter moved since it was loaded (ingestion, backfill-norm,
+    # another process) is rebuilt before the engine is handed out again
+    global _engine, _engine_versions
+    versions = {side: doc.get("version", 0) for side, doc in read_versions().items() if side in SIDE_SPECS}
+    if _engine is None or reload:
+        _engine = MatchEngine.from_mongo()
+    else:
+        for side in SIDE_SPECS:
+            if versions.get(side, 0) != _engine_versions.get(side, 0):
+                _engine = _engine.replace_side(side, load_side(side), datetime.utcnow())
+                print(f"🔄 Match engine reloaded {side}")
+    _engine_versions = versions
+    return _engine
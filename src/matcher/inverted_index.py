@@ -0,0 +1,287 @@
+import numpy as np
+from datetime import datetime
+from pymongo import ReplaceOne
+from database.mongo import skill_index_collection
+from config.settings import SKILL_INDEX_PRUNING, SKILL_INDEX_CHUNK_SIZE, SKILL_INDEX_MAX_IDS
+
+# Skill → posting list index with MaxScore-style pruning.
+#
+# Each posting list is split into blocks of candidates with the same number of
+# distinct skills in that field, so every block carries an exact upper bound on
+# what the term can add to a candidate's score (weight / skill count). Weights
+# come from the query's scoring profile, so blocks store the skill count. For
+# weighted skill scoring a block also keeps each posting's skill importance and
+# the largest importance / importance total in it, which bounds the term when
+# the candidates are jobs; when the job is the query the bound is exact.
+# For a query, blocks are sorted by bound; the longest low-bound prefix whose
+# bounds plus everything a candidate can earn outside the skills still stay below
+# the current top-N threshold θ is "non-essential": a candidate that only shows
+# up there cannot make the shortlist and is never scored.
+
+# Totals are rounded to 2 decimals, so only bounds clearly below θ are pruned
+ROUNDING_MARGIN = 0.01
+
+# Persisted layout; indexes built with another one are ignored until rebuilt
+INDEX_FORMAT = 3
+
+
+# -----------------------------
+# MaxScore helpers (shared by the engine and the Mongo path)
+# -----------------------------
+# A block is (upper_bound, count, postings)
+
+def term_bound(profile, field: str, size: float, max_ratio: float, token: str,
+               query_importance, candidates_are_jobs: bool) -> float:
+    # Most the term can add to a candidate in a block with this skill count / max_ratio;
+    # query_importance: field → ({token: importance}, total) of the query document
+    weight = profile.skill_weights[field]
+    if not profile.weighted:
+        return weight / size
+    if candidates_are_jobs:
+        return weight * max_ratio
+    importance, total = query_importance[field]
+    return weight * importance.get(token, 0) / total
+
+
+def seed_blocks(blocks, top_n: int):
+    # Highest-bound blocks until they hold at least top_n postings; scoring them gives the first θ
+    seeds, count = [], 0
+    for block in sorted(blocks, key=lambda b: -b[0]):
+        seeds.append(block)
+        count += block[1]
+        if count >= top_n:
+            break
+    return seeds
+
+
+def threshold(scores, top_n: int) -> float:
+    # Score of the current N-th best candidate, -inf while fewer than N were seen
+    scores = sorted((s for s in scores if np.isfinite(s)), reverse=True)
+    return scores[top_n - 1] if top_n > 0 and len(scores) >= top_n else -np.inf
+
+
+def essential_blocks(blocks, theta: float, rest_bound: float, min_score=None):
+    # Nothing below the profile's min_score is returned either, so it is a floor for θ
+    if min_score is not None:
+        theta = max(theta, min_score)
+    ordered = sorted(blocks, key=lambda b: b[0])
+    bound = rest_bound
+    for i, (upper_bound, _, _) in enumerate(ordered):
+        bound += upper_bound
+        if bound >= theta - ROUNDING_MARGIN:
+            return ordered[i:]
+    return []
+
+
+# -----------------------------
+# In-memory index over one MatchSide
+# -----------------------------
+# A stored block is (skill count, count, postings, importance, max_ratio); postings
+# stay sorted, so ties keep load order
+
+def _size_blocks(rows, sizes, importance, totals):
+    order = np.argsort(sizes, kind="stable")
+    rows, sizes, importance = rows[order], sizes[order], importance[order]
+    cuts = np.flatnonzero(np.diff(sizes)) + 1
+    return [
+        (float(block_sizes[0]), len(block), block, block_importance,
+         float((block_importance / totals[block]).max()))
+        for block, block_sizes, block_importance in zip(
+            np.split(rows, cuts), np.split(sizes, cuts), np.split(importance, cuts)
+        )
+    ]
+
+
+class SkillIndex:
+
+    def __init__(self, side, skill_fields=("primary_skills", "secondary_skills"), match_fields=()):
+        # skill_fields: fields scored as overlap / skill count (blocked by skill count);
+        # match_fields: other fields whose overlap is only counted (no pruning bound)
+        self.side = side
+        self.skill_fields = tuple(skill_fields)
+        self.fields = self.skill_fields + tuple(match_fields)
+        self.postings = {}
+
+        for field in self.fields:
+            skill = field in self.skill_fields
+            matrix = (side.weighted_matrices if skill else side.matrices)[field].tocsc()
+            for token, column in side.vocab.items():
+                span = slice(matrix.indptr[column], matrix.indptr[column + 1])
+                rows = matrix.indices[span]
+                if not len(rows):
+                    continue
+                if skill:
+                    self.postings[(field, token)] = _size_blocks(
+                        rows, side.denominators[field][rows], matrix.data[span], side.weight_totals[field]
+                    )
+                else:
+                    self.postings[(field, token)] = [(1.0, len(rows), np.sort(rows), None, 0.0)]
+
+    def blocks_for(self, query: dict, profile, query_importance=None):
+        # query: field → tokens, as in MatchSide.values; bounds follow the profile
+        return [
+            (term_bound(profile, field, size, max_ratio, token, query_importance, self.side.is_jobs), count, rows)
+            for field in self.skill_fields
+            for token in query.get(field, ())
+            for size, count, rows, _, max_ratio in self.postings.get((field, token), ())
+        ]
+
+    def overlap_counts(self, query: dict, query_importance=None):
+        # Term-at-a-time: per field, how many query tokens each candidate shares.
+        # With query_importance (weighted scoring) also "<field>_weighted": the job-side
+        # importance of the shared skills.
+        counts = {}
+        for field in self.fields:
+            counts[field] = np.zeros(len(self.side), dtype=np.float64)
+            for token in query.get(field, ()):
+                for _, _, rows, _, _ in self.postings.get((field, token), ()):
+                    counts[field][rows] += 1
+
+        if query_importance is not None:
+            for field in self.skill_fields:
+                weighted = np.zeros(len(self.side), dtype=np.float64)
+                importance = query_importance[field][0]
+                for token in query.get(field, ()):
+                    for _, _, rows, row_importance, _ in self.postings.get((field, token), ()):
+                        weighted[rows] += row_importance if self.side.is_jobs else importance[token]
+                counts[f"{field}_weighted"] = weighted
+        return counts
+
+    def candidate_rows(self, blocks, top_n: int, profile, score_rows):
+        # score_rows(rows) → exact scores for those candidate rows
+        if not blocks:
+            return np.array([], dtype=np.int64)
+
+        seeds = np.unique(np.concatenate([b[2] for b in seed_blocks(blocks, top_n)]))
+        theta = threshold(score_rows(seeds), top_n)
+
+        # The min_score floor can rule out every block
+        essential = essential_blocks(blocks, theta, profile.rest_bound, profile.min_score)
+        if not essential:
+            return np.empty(0, dtype=np.int64)
+        return np.unique(np.concatenate([b[2] for b in essential]))
+
+
+# -----------------------------
+# Persisted index (used by the aggregation-pipeline matcher)
+# -----------------------------
+def persist_skill_index(side_name: str, index: SkillIndex, built_at: datetime,
+                        chunk_size: int = SKILL_INDEX_CHUNK_SIZE):
+    # built_at must not be later than the moment the indexed documents were read:
+    # anything written after it is treated as fresh by pruned_prefilter
+    ids = index.side.ids
+    ops = []
+
+    for (field, token), blocks in index.postings.items():
+        for number, (size, _, rows, importance, _) in enumerate(blocks):
+            for start in range(0, len(rows), chunk_size):
+                chunk_rows = rows[start:start + chunk_size]
+                chunk = [ids[r] for r in chunk_rows]
+                max_ratio = (
+                    float((importance[start:start + chunk_size] / index.side.weight_totals[field][chunk_rows]).max())
+                    if importance is not None else 0.0
+                )
+                ops.append(ReplaceOne(
+                    {"_id": f"{side_name}|{field}|{token}|{number}|{start}"},
+                    {
+                        "side": side_name,
+                        "field": field,
+                        "token": token,
+                        "size": size,
+                        "max_ratio": max_ratio,
+                        "count": len(chunk),
+                        "ids": chunk,
+                        "built_at": built_at
+                    },
+                    upsert=True
+                ))
+                if len(ops) >= 1000:
+                    skill_index_collection.bulk_write(ops, ordered=False)
+                    ops = []
+
+    if ops:
+        skill_index_collection.bulk_write(ops, ordered=False)
+
+    skill_index_collection.delete_many({"side": side_name, "built_at": {"$ne": built_at}})
+    skill_index_collection.replace_one(
+        {"_id": f"{side_name}|meta"},
+        {"side": side_name, "meta": True, "built_at": built_at, "count": len(ids), "format": INDEX_FORMAT},
+        upsert=True
+    )
+    return built_at
+
+
+def build_skill_index(engine=None):
+    from matcher.engine import get_engine
+
+    engine = engine or get_engine(reload=True)
+    for side_name, index in (("resumes", engine.resume_index), ("jobs", engine.job_index)):
+        persist_skill_index(side_name, index, engine.loaded_at)
+        print(f"📇 Skill index ({side_name}): {len(index.postings)} terms")
+
+
+def invalidate_skill_index():
+    # Without its meta document an index is ignored by pruned_prefilter until rebuilt
+    if skill_index_collection.delete_many({"meta": True}).deleted_count:
+        print("📇 Skill index marked stale; run build-skill-index to prune again")
+
+
+def pruned_prefilter(side_name: str, id_field: str, fresh_field: str, query: dict,
+                     prefilter: dict, top_n: int, profile, run, query_importance=None):
+    # Narrows the pipeline's skill prefilter to candidates that can still reach the
+    # top-N. run(filter) executes the pipeline and returns its results;
+    # query_importance is needed for weighted skill scoring (see term_bound).
+    # Documents written after the index was built are always kept, so results match
+    # the unpruned pipeline while the index is stale.
+    meta = skill_index_collection.find_one({"_id": f"{side_name}|meta"}) if SKILL_INDEX_PRUNING else None
+    if not meta or meta.get("format") != INDEX_FORMAT:
+        return prefilter
+
+    terms = [
+        {"field": field, "token": {"$in": tokens}}
+        for field, tokens in query.items()
+        if tokens
+    ]
+    if not terms:
+        return prefilter
+
+    blocks = [
+        (
+            term_bound(profile, d["field"], d["size"], d["max_ratio"], d["token"], query_importance,
+                       side_name == "jobs"),
+            d["count"],
+            d["_id"]
+        )
+        for d in skill_index_collection.find(
+            {"side": side_name, "meta": {"$exists": False}, "$or": terms},
+            {"field": 1, "token": 1, "size": 1, "max_ratio": 1, "count": 1}
+        )
+    ]
+
+    def ids_of(selected):
+        return [
+            doc_id
+            for d in skill_index_collection.find({"_id": {"$in": [b[2] for b in selected]}}, {"ids": 1})
+            for doc_id in d["ids"]
+        ]
+
+    def restrict(ids):
+        return {"$and": [
+            prefilter,
+            {"$or": [{id_field: {"$in": ids}}, {fresh_field: {"$gt": meta["built_at"]}}]}
+        ]}
+
+    def too_many(selected):
+        # The id list travels inside the pipeline, and a command is capped at 16MB of BSON;
+        # past SKILL_INDEX_MAX_IDS postings the plain prefilter is used instead
+        return sum(b[1] for b in selected) > SKILL_INDEX_MAX_IDS
+
+    seeds = seed_blocks(blocks, top_n)
+    if too_many(seeds):
+        return prefilter
+    theta = threshold([r["total_score"] for r in run(restrict(ids_of(seeds)))], top_n)
+
+    essential = essential_blocks(blocks, theta, profile.rest_bound, profile.min_score)
+    if too_many(essential):
+        return prefilter
+    return restrict(ids_of(essential))
@@ -1,236 +1,295 @@
+from functools import lru_cache
 from database.mongo import resume_collection, job_collection
+from matcher.normalize import SKILL_FIELDS, norm_fields_of
+from matcher.inverted_index import pruned_prefilter
+from matcher.profiles import get_profile
 
-PRIMARY_WEIGHT = 50
-SECONDARY_WEIGHT = 20
-EXPERIENCE_WEIGHT = 15
-LOCATION_WEIGHT = 5
-EDUCATION_WEIGHT = 10
+# Weights of the default profile (see matcher.profiles / scoring_profiles.json)
+DEFAULT_PROFILE = get_profile("default")
 
+PRIMARY_WEIGHT = DEFAULT_PROFILE.weights["primary"]
+SECONDARY_WEIGHT = DEFAULT_PROFILE.weights["secondary"]
+EXPERIENCE_WEIGHT = DEFAULT_PROFILE.weights["experience"]
+LOCATION_WEIGHT = DEFAULT_PROFILE.weights["location"]
+EDUCATION_WEIGHT = DEFAULT_PROFILE.weights["education"]
 
-def normalize_list(value):
-    if isinstance(value, list):
-        return [str(v).strip().lower() for v in value if str(v).strip()]
-    if isinstance(value, str):
-        return [v.strip().lower() for v in value.split(",") if v.strip()]
-    return []
 
+# Candidates are scored on the precomputed *_norm fields written by the parsers
+# (see matcher.normalize / `main.py backfill-norm`), so no per-document
+# normalization happens inside the pipeline.
+#
+# The scoring stages only depend on the profile and the direction: they are
+# compiled once and reused, with the query document's values passed as
+# aggregation variables ($$q_*).
 
-def safe_array(field_name):
+# direction → where queries and candidates live and what is returned
+DIRECTIONS = {
+    "resume_to_jobs": {
+        "queries": resume_collection,
+        "query_id": "candidate_id",
+        "candidates": job_collection,
+        "side": "jobs",
+        "candidate_id": "job_id",
+        "fresh_field": "created_at",
+        "candidates_are_jobs": True,
+        "output": ("job_id", "job_summary", "technology", "category"),
+    },
+    "job_to_resumes": {
+        "queries": job_collection,
+        "query_id": "job_id",
+        "candidates": resume_collection,
+        "side": "resumes",
+        "candidate_id": "candidate_id",
+        "fresh_field": "updated_at",
+        "candidates_are_jobs": False,
+        "output": ("candidate_id", "name", "email"),
+    },
+}
+
+
+def experience_fit(gap, weight, grace_years):
+    # gap = required years - candidate years: full weight when met, linear decay
+    # over the grace years (mirrored in matcher.engine)
+    if grace_years <= 0:
+        return {"$cond": [{"$lte": [gap, 0]}, weight, 0]}
     return {
-        "$cond": {
-            "if": {"$isArray": f"${field_name}"},
-            "then": {
-                "$map": {
-                    "input": f"${field_name}",
-                    "as": "item",
-                    "in": {
-                        "$cond": [
-                            {"$eq": [{"$type": "$$item"}, "string"]},
-                            {"$toLower": "$$item"},
-                            ""
-                        ]
-                    }
-                }
-            },
-            "else": {
-                "$cond": {
-                    "if": {"$eq": [{"$type": f"${field_name}"}, "string"]},
-                    "then": [{"$toLower": f"${field_name}"}],
-                    "else": []
-                }
-            }
-        }
+        "$cond": [
+            {"$lte": [gap, 0]},
+            weight,
+            {"$max": [0, {"$multiply": [
+                weight,
+                {"$subtract": [1, {"$divide": [gap, grace_years]}]}
+            ]}]}
+        ]
     }
 
-def match_resume_to_jobs(candidate_id: str, top_n: int = 5):
-    resume = resume_collection.find_one({"candidate_id": candidate_id})
-    if not resume:
-        return []
 
-    resume_primary = normalize_list(resume.get("primary_skills"))
-    resume_secondary = normalize_list(resume.get("secondary_skills"))
-    resume_location = normalize_list(resume.get("location"))
-    resume_education = normalize_list(resume.get("education"))
-    resume_experience = resume.get("experience_years", 0)
-
-    pipeline = [
-    # 🔹 Pre-filter jobs using $match
-    {
-        "$match": {
-            "$or": [
-                {"primary_skills": {"$in": resume_primary}},
-                {"secondary_skills": {"$in": resume_secondary}}
-            ]
-        }
-    },
+def experience_bound(profile, query_experience: float, candidates_are_jobs: bool):
+    # Index-friendly $match on experience_norm for the hard filter, or None
+    if not profile.experience_hard_filter:
+        return None
+    if candidates_are_jobs:
+        return {"$lte": query_experience + profile.experience_grace_years}
+    return {"$gte": query_experience - profile.experience_grace_years}
 
-    # 🔹 Normalize fields safely
-    {
-        "$addFields": {
-            "primary_array": safe_array("primary_skills"),
-            "secondary_array": safe_array("secondary_skills"),
-            "education_array": safe_array("education"),
-            "location_array": safe_array("location")
-        }
-    },
 
-    # 🔹 Compute skill intersections
-    {
-        "$addFields": {
-            "primary_match": {"$size": {"$setIntersection": ["$primary_array", resume_primary]}},
-            "secondary_match": {"$size": {"$setIntersection": ["$secondary_array", resume_secondary]}}
-        }
-    },
+# -----------------------------
+# Compiled stages
+# -----------------------------
+def _overlap(field):
+    return {"$size": {"$setIntersection": [f"${field}_norm", f"$$q_{field}"]}}
 
-    # 🔹 Compute scores
-    {
-        "$addFields": {
-            "primary_score": {
-                "$multiply": [
-                    {"$divide": ["$primary_match", {"$max": [{"$size": "$primary_array"}, 1]}]},
-                    PRIMARY_WEIGHT
-                ]
-            },
-            "secondary_score": {
-                "$multiply": [
-                    {"$divide": ["$secondary_match", {"$max": [{"$size": "$secondary_array"}, 1]}]},
-                    SECONDARY_WEIGHT
-                ]
-            },
-            "experience_score": {
-                "$cond": [
-                    {"$gte": ["$experience_years", resume_experience]},
-                    EXPERIENCE_WEIGHT,
-                    0
-                ]
-            },
-            "location_score": {
-                "$cond": [
-                    {"$gt": [{"$size": {"$setIntersection": ["$location_array", resume_location]}}, 0]},
-                    LOCATION_WEIGHT,
-                    0
-                ]
-            },
-            "education_score": {
-                "$cond": [
-                    {"$gt": [{"$size": {"$setIntersection": ["$education_array", resume_education]}}, 0]},
-                    EDUCATION_WEIGHT,
-                    0
-                ]
-            }
-        }
-    },
 
-    # 🔹 Total score
-    {
-        "$addFields": {
-            "total_score": {
-                "$round": [
-                    {"$add": ["$primary_score", "$secondary_score", "$experience_score", "$location_score", "$education_score"]},
-                    2
-                ]
-            }
-        }
-    },
+def _importance_overlap(field, candidates_are_jobs: bool):
+    # JD importance of the shared skills: the job's "<field>_norm_weights" are aligned
+    # with its norm list, on the candidate or in the query variables
+    if candidates_are_jobs:
+        pairs, other = [f"${field}_norm", f"${field}_norm_weights"], f"$$q_{field}"
+    else:
+        pairs, other = [f"$$q_{field}", f"$$q_{field}_weights"], {"$ifNull": [f"${field}_norm", []]}
+    return {"$sum": {"$map": {
+        "input": {"$zip": {"inputs": pairs}},
+        "as": "pair",
+        "in": {"$cond": [
+            {"$in": [{"$arrayElemAt": ["$$pair", 0]}, other]},
+            {"$arrayElemAt": ["$$pair", 1]},
+            0
+        ]}
+    }}}
+
 
-    # 🔹 Sort and limit
-    {"$sort": {"total_score": -1}},
-    {"$limit": top_n},
-
-    # 🔹 Final projection
-    {
-        "$project": {
-            "_id": 0,
-            "job_id": 1,
-            "job_summary": 1,
-            "technology": 1,
-            "category": 1,
-            "total_score": 1
-        }
+def _component_stage(candidates_are_jobs: bool, weighted: bool = False):
+    # Per-candidate overlap counts and experience gap, shared by every profile
+    gap = ["$experience_norm", "$$q_experience"] if candidates_are_jobs else ["$$q_experience", "$experience_norm"]
+    fields = {
+        "primary_match": _overlap("primary_skills"),
+        "secondary_match": _overlap("secondary_skills"),
+        "location_match": _overlap("location"),
+        "education_match": _overlap("education"),
+        "experience_gap": {"$subtract": gap}
     }
-]
+    if weighted:
+        fields["primary_weighted"] = _importance_overlap("primary_skills", candidates_are_jobs)
+        fields["secondary_weighted"] = _importance_overlap("secondary_skills", candidates_are_jobs)
+    return {"$addFields": fields}
 
-    return list(job_collection.aggregate(pipeline))
 
+def _skill_fraction(name, profile, candidates_are_jobs: bool):
+    # Mirrors matcher.engine.skill_fraction; name is "primary" or "secondary"
+    field = f"{name}_skills"
+    if not profile.weighted:
+        return {"$divide": [f"${name}_match", {"$max": [f"${field}_norm_size", 1]}]}
+    total = f"${field}_norm_weight_total" if candidates_are_jobs else f"$$q_{field}_weight_total"
+    return {"$divide": [f"${name}_weighted", {"$max": [total, 1]}]}
+
+
+def _score_expression(profile, candidates_are_jobs: bool):
+    w = profile.weights
+    terms = []
+    if w["primary"]:
+        terms.append({"$multiply": [_skill_fraction("primary", profile, candidates_are_jobs), w["primary"]]})
+    if w["secondary"]:
+        terms.append({"$multiply": [_skill_fraction("secondary", profile, candidates_are_jobs), w["secondary"]]})
+    if w["experience"]:
+        terms.append(experience_fit("$experience_gap", w["experience"], profile.experience_grace_years))
+    if w["location"]:
+        terms.append({"$cond": [{"$gt": ["$location_match", 0]}, w["location"], 0]})
+    if w["education"]:
+        terms.append({"$cond": [{"$gt": ["$education_match", 0]}, w["education"], 0]})
+    return {"$round": [{"$add": terms or [0]}, 2]}
 
-def match_job_to_resumes(job_id: str, top_n: int = 5):
-    job = job_collection.find_one({"job_id": job_id})
-    if not job:
-        return []
 
-    job_primary = normalize_list(job.get("primary_skills"))
-    job_secondary = normalize_list(job.get("secondary_skills"))
-    job_location = normalize_list(job.get("location"))
-    job_education = normalize_list(job.get("education"))
-    job_experience = job.get("minimum_experience_in_years", 0)
-
-    pipeline = [
-        {
-            "$match": {
-                "$or": [
-                    {"primary_skills": {"$in": job_primary}},
-                    {"secondary_skills": {"$in": job_secondary}}
-                ]
-            }
-        },
-
-        {
-            "$addFields": {
-                "primary_array": safe_array("primary_skills"),
-                "secondary_array": safe_array("secondary_skills"),
-                "education_array": safe_array("education"),
-                "location_array": safe_array("location"),
-            }
-        },
-
-        {
-            "$addFields": {
-                "primary_match": {"$size": {"$setIntersection": ["$primary_array", job_primary]}},
-                "secondary_match": {"$size": {"$setIntersection": ["$secondary_array", job_secondary]}}
-            }
-        },
-
-        {
-            "$addFields": {
-                "primary_score": {
-                    "$multiply": [
-                        {"$divide": ["$primary_match", {"$max": [{"$size": "$primary_array"}, 1]}]},
-                          PRIMARY_WEIGHT
-                    ]
-                },
-                "secondary_score": {
-                    "$multiply": [
-                        {"$divide": ["$secondary_match", {"$max": [{"$size": "$secondary_array"}, 1]}]}, 
-                        SECONDARY_WEIGHT
-                    ]
-                },
-                "experience_score": {
-                    "$cond": [
-                        {"$gte": ["$experience_years", job_experience]}, EXPERIENCE_WEIGHT
-                        , 0
-                    ]
-                },
-                "location_score": {
-                    "$cond": [
-                        {"$gt": [{"$size": {"$setIntersection": ["$location_array", job_location]}}, 0]}, 
-                        LOCATION_WEIGHT, 
-                        0
-                    ]
-                },
-                "education_score": {
-                    "$cond": [
-                        {"$gt": [{"$size": {"$setIntersection": ["$education_array", job_education]}}, 0]},
-                        EDUCATION_WEIGHT, 
-                        0
-                    ]
-                },
-        }},
-        {"$addFields": {
-            "total_score": {"$round": [{"$add": ["$primary_score", "$secondary_score", "$experience_score", "$location_score", "$education_score"]}, 2]}
-        }},
+def _projection(direction: str, score_field: str):
+    return {"$project": {
+        "_id": 0,
+        **{f: 1 for f in DIRECTIONS[direction]["output"]},
+        "total_score": 1 if score_field == "total_score" else f"${score_field}"
+    }}
+
+
+@lru_cache(maxsize=256)
+def compile_pipeline(direction: str, profile, top_n: int):
+    # Everything after the $match prefilter, for one profile
+    candidates_are_jobs = DIRECTIONS[direction]["candidates_are_jobs"]
+    stages = [
+        _component_stage(candidates_are_jobs, profile.weighted),
+        {"$addFields": {"total_score": _score_expression(profile, candidates_are_jobs)}},
+    ]
+    if profile.min_score is not None:
+        stages.append({"$match": {"total_score": {"$gte": profile.min_score}}})
+    return stages + [
         {"$sort": {"total_score": -1}},
         {"$limit": top_n},
-        {"$project": {"_id": 0, "candidate_id": 1, "name": 1, "email": 1, "total_score": 1}}
+        _projection(direction, "total_score"),
     ]
 
-    return list(resume_collection.aggregate(pipeline))
\ No newline at end of file
+
+@lru_cache(maxsize=64)
+def compile_comparison(direction: str, profiles: tuple, top_n: int):
+    # One pass over the shared candidate set: components once, then one $facet
+    # branch per profile with its own thresholds, sort and limit
+    candidates_are_jobs = DIRECTIONS[direction]["candidates_are_jobs"]
+    facets = {}
+    scores = {}
+
+    for i, profile in enumerate(profiles):
+        score_field = f"score_{i}"
+        scores[score_field] = _score_expression(profile, candidates_are_jobs)
+
+        branch = []
+        if profile.experience_hard_filter:
+            grace = profile.experience_grace_years
+            bound = (
+                {"$lte": ["$experience_norm", {"$add": ["$$q_experience", grace]}]}
+                if candidates_are_jobs
+                else {"$gte": ["$experience_norm", {"$subtract": ["$$q_experience", grace]}]}
+            )
+            branch.append({"$match": {"$expr": bound}})
+        if profile.min_score is not None:
+            branch.append({"$match": {score_field: {"$gte": profile.min_score}}})
+        facets[profile.name] = branch + [
+            {"$sort": {score_field: -1}},
+            {"$limit": top_n},
+            _projection(direction, score_field),
+        ]
+
+    return [
+        _component_stage(candidates_are_jobs, any(p.weighted for p in profiles)),
+        {"$addFields": scores},
+        {"$facet": facets},
+    ]
+
+
+# -----------------------------
+# Queries
+# -----------------------------
+def _query(direction: str, doc_id: str):
+    spec = DIRECTIONS[direction]
+    doc = spec["queries"].find_one({spec["query_id"]: doc_id})
+    if not doc:
+        return None
+
+    norm = norm_fields_of(doc)
+    variables = {
+        "q_primary_skills": norm["primary_skills_norm"],
+        "q_secondary_skills": norm["secondary_skills_norm"],
+        "q_location": norm["location_norm"],
+        "q_education": norm["education_norm"],
+        "q_experience": norm["experience_norm"],
+    }
+    for field in SKILL_FIELDS:
+        weights = norm[f"{field}_norm_weights"]
+        variables[f"q_{field}_weights"] = weights
+        variables[f"q_{field}_weight_total"] = sum(weights)
+    prefilter = {
+        "$or": [
+            {"primary_skills_norm": {"$in": variables["q_primary_skills"]}},
+            {"secondary_skills_norm": {"$in": variables["q_secondary_skills"]}}
+        ]
+    }
+    return variables, prefilter
+
+
+def match(direction: str, doc_id: str, top_n: int = 5, profile=None):
+    profile = get_profile(profile)
+    spec = DIRECTIONS[direction]
+    query = _query(direction, doc_id)
+    if query is None:
+        return []
+    variables, prefilter = query
+
+    # Candidates outside the hard experience bound never qualify: filter them in the index
+    bound = experience_bound(profile, variables["q_experience"], spec["candidates_are_jobs"])
+    if bound is not None:
+        prefilter["experience_norm"] = bound
+
+    stages = compile_pipeline(direction, profile, top_n)
+
+    def run(match_filter):
+        return list(spec["candidates"].aggregate([{"$match": match_filter}] + stages, let=variables))
+
+    # Inverted skill index: skip candidates that cannot reach the top-N
+    query_importance = {
+        field: (
+            dict(zip(variables[f"q_{field}"], variables[f"q_{field}_weights"])),
+            max(variables[f"q_{field}_weight_total"], 1)
+        )
+        for field in SKILL_FIELDS
+    }
+    match_filter = pruned_prefilter(
+        spec["side"], spec["candidate_id"], spec["fresh_field"],
+        {"primary_skills": variables["q_primary_skills"], "secondary_skills": variables["q_secondary_skills"]},
+        prefilter, top_n, profile, run, query_importance
+    )
+    return run(match_filter)
+
+
+def compare_profiles(direction: str, doc_id: str, profiles, top_n: int = 5):
+    # A/B: shortlists of several profiles over the same candidates, in one aggregation
+    profiles = tuple({p.name: p for p in map(get_profile, profiles)}.values())
+    if not profiles:
+        return {}
+    query = _query(direction, doc_id)
+    if query is None:
+        return {p.name: [] for p in profiles}
+    variables, prefilter = query
+
+    # The prefilter has to admit every profile's candidates: use the loosest bound
+    spec = DIRECTIONS[direction]
+    bounds = [experience_bound(p, variables["q_experience"], spec["candidates_are_jobs"]) for p in profiles]
+    if bounds and all(b is not None for b in bounds):
+        op = "$lte" if spec["candidates_are_jobs"] else "$gte"
+        values = [b[op] for b in bounds]
+        prefilter["experience_norm"] = {op: max(values) if op == "$lte" else min(values)}
+
+    stages = compile_comparison(direction, profiles, top_n)
+    results = list(spec["candidates"].aggregate([{"$match": prefilter}] + stages, let=variables))
+    return results[0] if results else {p.name: [] for p in profiles}
+
+
+def match_resume_to_jobs(candidate_id: str, top_n: int = 5, profile=None):
+    return match("resume_to_jobs", candidate_id, top_n, profile)
+
+
+def match_job_to_resumes(job_id: str, top_n: int = 5, profile=None):
+    return match("job_to_resumes", job_id, top_n, profile)
@@ -0,0 +1,123 @@
+from config.skill_aliases import canonical_skills, canonicalize_skills
+
+# Canonical match fields written alongside the raw parser output, so the matcher
+# can read them directly instead of re-normalizing every document per query.
+# Skill fields hold canonical skill IDs (config.skill_aliases).
+
+# raw field → precomputed field (a "<field>_size" count is stored next to each)
+NORM_FIELDS = {
+    "primary_skills": "primary_skills_norm",
+    "secondary_skills": "secondary_skills_norm",
+    "location": "location_norm",
+    "education": "education_norm",
+}
+
+# Skill importance for weighted scoring: JD scores (1-10) from required_skills_with_scores,
+# stored as "<field>_weights" aligned with the norm list plus a "<field>_weight_total".
+# Skills without a score (resume skills, good-to-have skills) get UNSCORED_IMPORTANCE.
+SKILL_FIELDS = ("primary_skills", "secondary_skills")
+SKILL_SCORES_FIELD = "required_skills_with_scores"
+UNSCORED_IMPORTANCE = 3
+
+# Years of experience as one number on both sides: what a job requires, what a resume has
+EXPERIENCE_FIELDS = ("minimum_experience_in_years", "total_experience_years")
+EXPERIENCE_NORM = "experience_norm"
+
+# Placeholder values the parsers emit when something is missing
+_EMPTY_VALUES = {"", "n/a", "not specified", "not available", "others"}
+
+
+def norm_values(value):
+    # Lowercased, stripped, de-duplicated; strings are treated as comma-separated lists
+    if isinstance(value, str):
+        items = value.split(",")
+    elif isinstance(value, list):
+        items = value
+    else:
+        return []
+
+    seen = []
+    for item in items:
+        if not isinstance(item, str):
+            continue
+        item = " ".join(item.lower().split())
+        if item not in _EMPTY_VALUES and item not in seen:
+            seen.append(item)
+    return seen
+
+
+def education_values(value):
+    # Resumes store a list of {"Degree", "University", "Period"} dicts; match on the degree
+    if isinstance(value, list):
+        value = [
+            item.get("Degree", "") if isinstance(item, dict) else item
+            for item in value
+        ]
+    return norm_values(value)
+
+
+def experience_value(doc: dict) -> float:
+    # Missing or unparseable experience counts as 0 years
+    for field in EXPERIENCE_FIELDS:
+        value = doc.get(field)
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            return float(value)
+        if isinstance(value, str):
+            try:
+                return float(value)
+            except ValueError:
+                pass
+    return 0.0
+
+
+def skill_importance(doc: dict) -> dict:
+    # Normalized skill → JD score, clamped to 1-10; the highest score wins on duplicates
+    scores = doc.get(SKILL_SCORES_FIELD)
+    if not isinstance(scores, dict):
+        return {}
+
+    importance = {}
+    for skill, score in scores.items():
+        if not isinstance(score, (int, float)) or isinstance(score, bool):
+            continue
+        for value in norm_values(skill):
+            for canonical in canonical_skills(value):
+                importance[canonical] = max(importance.get(canonical, 0), min(max(int(score), 1), 10))
+    return importance
+
+
+def build_norm_fields(doc: dict) -> dict:
+    fields = {}
+    for raw, norm in NORM_FIELDS.items():
+        if raw == "education":
+            values = education_values(doc.get(raw))
+        elif raw in SKILL_FIELDS:
+            values = canonicalize_skills(norm_values(doc.get(raw)))
+            if raw == "secondary_skills":
+                # Aliases of a primary skill are not counted twice
+                values = [v for v in values if v not in fields[NORM_FIELDS["primary_skills"]]]
+        else:
+            values = norm_values(doc.get(raw))
+        fields[norm] = values
+        fields[f"{norm}_size"] = len(values)
+
+    importance = skill_importance(doc)
+    for raw in SKILL_FIELDS:
+        norm = NORM_FIELDS[raw]
+        weights = [importance.get(value, UNSCORED_IMPORTANCE) for value in fields[norm]]
+        fields[f"{norm}_weights"] = weights
+        fields[f"{norm}_weight_total"] = sum(weights)
+
+    fields[EXPERIENCE_NORM] = experience_value(doc)
+    return fields
+
+
+def norm_fields_of(doc: dict) -> dict:
+    # Stored fields when the document has them, computed on the fly otherwise
+    names = tuple(NORM_FIELDS.values()) + tuple(
+        f"{NORM_FIELDS[raw]}_weights" for raw in SKILL_FIELDS
+    ) + (EXPERIENCE_NORM,)
+    if all(norm in doc for norm in names):
+        return {norm: doc[norm] for norm in names}
+    computed = build_norm_fields(doc)
+    return {norm: computed[norm] for norm in names}
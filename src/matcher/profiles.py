@@ -0,0 +1,130 @@
+import json
+from pathlib import Path
+from config.settings import (
+    EXPERIENCE_GRACE_YEARS,
+    EXPERIENCE_HARD_FILTER,
+    SCORING_PROFILE,
+    SCORING_PROFILES_PATH
+)
+
+# Declarative scoring profiles. A profile says which score components are used,
+# their weights and the thresholds; matcher.matcher compiles it into cached
+# aggregation stages and matcher.engine into a vectorized scorer.
+
+COMPONENTS = ("primary", "secondary", "experience", "location", "education")
+
+DEFAULT_WEIGHTS = {"primary": 50, "secondary": 20, "experience": 15, "location": 5, "education": 10}
+
+# binary: shared skills / candidate skill count (the original primary/secondary split);
+# weighted: JD importance of the shared skills / JD importance of all its skills
+SKILL_SCORING_MODES = ("binary", "weighted")
+
+
+class ScoringProfile:
+
+    def __init__(
+        self,
+        name: str,
+        weights: dict = None,
+        components=None,
+        experience_grace_years: float = EXPERIENCE_GRACE_YEARS,
+        experience_hard_filter: bool = EXPERIENCE_HARD_FILTER,
+        min_score: float = None,
+        skill_scoring: str = "binary"
+    ):
+        weights = weights or {}
+        components = COMPONENTS if components is None else tuple(components)
+
+        unknown = (set(weights) | set(components)) - set(COMPONENTS)
+        if unknown:
+            raise ValueError(f"Scoring profile {name}: unknown components {sorted(unknown)}")
+        if skill_scoring not in SKILL_SCORING_MODES:
+            raise ValueError(f"Scoring profile {name}: skill_scoring must be one of {SKILL_SCORING_MODES}")
+
+        self.name = name
+        self.weights = {
+            c: weights.get(c, DEFAULT_WEIGHTS[c]) if c in components else 0
+            for c in COMPONENTS
+        }
+        self.components = tuple(c for c in COMPONENTS if self.weights[c])
+        self.experience_grace_years = float(experience_grace_years)
+        self.experience_hard_filter = bool(experience_hard_filter)
+        self.min_score = min_score
+        self.skill_scoring = skill_scoring
+
+        # Everything the scores depend on; used for pipeline and result caching
+        self.key = (
+            tuple(self.weights[c] for c in COMPONENTS),
+            self.experience_grace_years,
+            self.experience_hard_filter,
+            self.min_score,
+            self.skill_scoring,
+        )
+
+    @classmethod
+    def from_dict(cls, name: str, spec: dict):
+        return cls(
+            name,
+            weights=spec.get("weights"),
+            components=spec.get("components"),
+            experience_grace_years=spec.get("experience_grace_years", EXPERIENCE_GRACE_YEARS),
+            experience_hard_filter=spec.get("experience_hard_filter", EXPERIENCE_HARD_FILTER),
+            min_score=spec.get("min_score"),
+            skill_scoring=spec.get("skill_scoring", "binary"),
+        )
+
+    @property
+    def skill_weights(self) -> dict:
+        # Fields scored as overlap / skill count
+        return {"primary_skills": self.weights["primary"], "secondary_skills": self.weights["secondary"]}
+
+    @property
+    def weighted(self) -> bool:
+        return self.skill_scoring == "weighted"
+
+    @property
+    def rest_bound(self) -> float:
+        # The most a candidate can earn outside the skill terms
+        return self.weights["experience"] + self.weights["location"] + self.weights["education"]
+
+    def __eq__(self, other):
+        return isinstance(other, ScoringProfile) and self.key == other.key
+
+    def __hash__(self):
+        return hash(self.key)
+
+    def __repr__(self):
+        return f"ScoringProfile({self.name!r}, weights={self.weights})"
+
+
+def _load():
+    path = Path(SCORING_PROFILES_PATH) if SCORING_PROFILES_PATH else (
+        Path(__file__).resolve().parents[2] / "scoring_profiles.json"
+    )
+    profiles = {"default": ScoringProfile("default")}
+
+    try:
+        specs = json.loads(path.read_text(encoding="utf-8"))
+    except FileNotFoundError:
+        return profiles
+    except Exception as e:
+        print(f"⚠ Could not load scoring profiles from {path}: {e}")
+        return profiles
+
+    for name, spec in specs.items():
+        profiles[name] = ScoringProfile.from_dict(name, spec)
+    return profiles
+
+
+PROFILES = _load()
+
+
+def get_profile(profile=None) -> ScoringProfile:
+    # Accepts a profile, a profile name, or None for SCORING_PROFILE
+    if isinstance(profile, ScoringProfile):
+        return profile
+
+    name = profile or SCORING_PROFILE
+    if name not in PROFILES:
+        raise ValueError(f"Unknown scoring profile: {name} (available: {', '.join(PROFILES)})")
+    return PROFILES[name]
@@ -0,0 +1,143 @@
+import copy
+import time
+import threading
+from collections import OrderedDict
+from database.versions import read_versions, changed_ids, subscribe
+from config.settings import (
+    MATCH_CACHE_ENABLED,
+    MATCH_CACHE_MAX_ENTRIES,
+    MATCH_CACHE_TTL_SECONDS,
+    MATCH_CACHE_POLL_SECONDS
+)
+
+# direction → (side every answer depends on, side of the query document)
+# A changed job can alter any resume → jobs shortlist, but only its own job → resumes one.
+DEPENDENCIES = {
+    "resume_to_jobs": ("jobs", "resumes"),
+    "job_to_resumes": ("resumes", "jobs"),
+}
+
+
+class MatchResultCache:
+    # LRU + TTL cache of match shortlists keyed by (direction, id, top_n, config).
+    # Writes are picked up from database.versions: in-process immediately, and from
+    # other processes by polling the change counters every poll_interval seconds.
+
+    def __init__(self, max_entries: int, ttl: float, poll_interval: float):
+        self.max_entries = max(max_entries, 1)
+        self.ttl = ttl
+        self.poll_interval = poll_interval
+
+        self.entries = OrderedDict()
+        self.versions = None
+        self.epoch = 0
+        self._last_poll = 0.0
+        self._lock = threading.Lock()
+
+        self.stats = {"hits": 0, "misses": 0, "invalidated": 0, "expired": 0, "evicted": 0}
+
+    # -----------------------------
+    # Invalidation
+    # -----------------------------
+    def invalidate(self, side: str, ids=None):
+        # ids=None: every document on that side may have changed
+        with self._lock:
+            self.epoch += 1
+            for key in list(self.entries):
+                direction, doc_id = key[0], key[1]
+                depends_on, own_side = DEPENDENCIES[direction]
+                if side == depends_on or (side == own_side and (ids is None or doc_id in ids)):
+                    del self.entries[key]
+                    self.stats["invalidated"] += 1
+
+    def poll(self, force: bool = False):
+        now = time.monotonic()
+        if not force and now - self._last_poll < self.poll_interval:
+            return
+        self._last_poll = now
+
+        docs = read_versions()
+        current = {side: doc.get("version", 0) for side, doc in docs.items()}
+
+        if self.versions is None:
+            self.versions = current
+            return
+
+        for side, doc in docs.items():
+            seen = self.versions.get(side, 0)
+            if current[side] != seen:
+                self.invalidate(side, changed_ids(doc, seen))
+                self.versions[side] = current[side]
+
+    # -----------------------------
+    # Lookup / store
+    # -----------------------------
+    def lookup(self, key):
+        # Returns (results or None, epoch); pass the epoch back to store()
+        self.poll()
+        with self._lock:
+            entry = self.entries.get(key)
+            if entry is not None and time.monotonic() - entry[1] > self.ttl:
+                del self.entries[key]
+                self.stats["expired"] += 1
+                entry = None
+
+            if entry is None:
+                self.stats["misses"] += 1
+                return None, self.epoch
+
+            self.entries.move_to_end(key)
+            self.stats["hits"] += 1
+            return copy.deepcopy(entry[0]), self.epoch
+
+    def store(self, key, results, epoch: int):
+        with self._lock:
+            # Something was invalidated while the answer was computed: it may be stale
+            if epoch != self.epoch:
+                return
+            self.entries[key] = (copy.deepcopy(results), time.monotonic())
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+                self.stats["evicted"] += 1
+
+    def clear(self):
+        with self._lock:
+            self.epoch += 1
+            self.entries.clear()
+
+    # -----------------------------
+    # Reporting
+    # -----------------------------
+    def snapshot(self) -> dict:
+        s = dict(self.stats)
+        total = s["hits"] + s["misses"]
+        s["hit_rate"] = s["hits"] / total if total else 0.0
+        s["entries"] = len(self.entries)
+        return s
+
+    def report(self):
+        s = self.snapshot()
+        print(
+            f"🗃 Match cache: {s['hits']} hits, {s['misses']} misses ({s['hit_rate'] * 100:.1f}% hit rate) | "
+            f"{s['entries']} entries, {s['invalidated']} invalidated, {s['expired']} expired, {s['evicted']} evicted"
+        )
+
+
+match_cache = MatchResultCache(MATCH_CACHE_MAX_ENTRIES, MATCH_CACHE_TTL_SECONDS, MATCH_CACHE_POLL_SECONDS)
+subscribe(match_cache.invalidate)
+
+
+def cached_match(direction: str, doc_id: str, top_n: int, config, compute):
+    # config: anything else the answer depends on (engine, weights)
+    if not MATCH_CACHE_ENABLED:
+        return compute()
+
+    key = (direction, doc_id, top_n, config)
+    results, epoch = match_cache.lookup(key)
+    if results is not None:
+        return results
+
+    results = compute()
+    match_cache.store(key, results, epoch)
+    return results
@@ -1,32 +1,32 @@
 import os
 import json
-import asyncio
 from datetime import datetime
-from openai import AsyncAzureOpenAI
-from database.mongo import job_collection
-from parsers.pdf_extractor import extract_text_from_pdf
+from pymongo import UpdateOne
+from database.mongo import async_job_collection
+from database.versions import record_changes_async
+from parsers.pdf_extractor import extract_text_async
+from parsers.parse_cache import prompt_version, cache_key, cached_parse
+from matcher.normalize import build_norm_fields
+from database.listing import search_terms
 from config.settings import (
-    AZURE_OPENAI_API_KEY,
-    AZURE_OPENAI_ENDPOINT,
-    AZURE_OPENAI_API_VERSION,
     AZURE_OPENAI_DEPLOYMENT,
-    AZURE_CONCURRENCY
+    PROMPT_TECH_MODE,
+    PROMPT_TECH_SUBSET_SIZE
 )
 
-client = AsyncAzureOpenAI(
-    api_key=AZURE_OPENAI_API_KEY,
-    azure_endpoint=AZURE_OPENAI_ENDPOINT,
-    api_version=AZURE_OPENAI_API_VERSION
-)
-
-semaphore = asyncio.Semaphore(AZURE_CONCURRENCY)
+# Bump whenever build_prompt / the request below changes, so cached parses are not reused
+PROMPT_VERSION = "2"
 
-from config.tech_mapping import TECH_CATEGORIES_JSON_STR as technologies_and_categories
+from config.tech_mapping import TECH_CATEGORIES_JSON_STR, mapping_for_prompt, classify_locally
+from config.skill_aliases import canonical_skills, canonicalize_skills
 
 
 
 
-def build_prompt(job_description: str) -> str:
+def build_prompt(job_description: str, mode: str = PROMPT_TECH_MODE) -> str:
+    technologies_and_categories = mapping_for_prompt(
+        job_description, mode, TECH_CATEGORIES_JSON_STR, PROMPT_TECH_SUBSET_SIZE
+    )
     return f"""
  You are an expert enterprise-grade Job Description (JD) parser designed for an Applicant Tracking System (ATS). 
 Your task is to extract structured, standardized, and normalized information from the provided job description (JD).
@@ -102,14 +102,8 @@ SKILL EXTRACTION GUIDELINES:
    - Methodologies (Agile, Scrum, CI/CD)
 2. Exclude soft skills (e.g., communication, teamwork).
 3. Exclude generic phrases (e.g., “problem solving”, “dynamic environment”).
-4. Normalize skill names strictly:
-   - Use "Node.js" not nodejs or Node.JS
-   - Use "React.js"
-   - Use "JavaScript"
-   - Use "TypeScript"
-   - Use "PostgreSQL"
-5. Ensure consistent naming across outputs.
-6. Assign scores:
+4. Use the common name of each skill; spelling variants are canonicalized after extraction.
+5. Assign scores:
    - 9-10 → Core mandatory skills
    - 7-8 → Important but not dominant
    - 4-6 → Supporting skills
@@ -188,103 +182,162 @@ def safe_json_load(content: str):
         return json.loads(content[start:end])
 
 
-async def parse_jd(pdf_path: str):
+def build_job_update(job_data: dict) -> UpdateOne:
+    return UpdateOne(
+        {"job_id": job_data["job_id"]},
+        {"$set": job_data},
+        upsert=True
+    )
 
-    async with semaphore:
 
-        print(f" Processing: {pdf_path}")
+# Everything but the text is fixed per prompt version, so the same request can be
+# sent live (request_parse) or written to a batch file (ingestion.batch_mode)
+REQUEST_OPTIONS = {"temperature": 0}
 
-        text = extract_text_from_pdf(pdf_path)
 
-        if not text or not text.strip():
-            print("⚠ Empty JD detected.")
-            return
+def build_messages(text: str) -> list:
+    return [
+        {
+            "role": "system",
+            "content": "You are a precise enterprise ATS job parser."
+        },
+        {
+            "role": "user",
+            "content": build_prompt(text)
+        }
+    ]
 
-        job_id = os.path.splitext(os.path.basename(pdf_path))[0]
 
-        response = await client.chat.completions.create(
-            model=AZURE_OPENAI_DEPLOYMENT,
-            messages=[
-                {
-                    "role": "system",
-                    "content": "You are a precise enterprise ATS job parser."
-                },
-                {
-                    "role": "user",
-                    "content": build_prompt(text)
-                }
-            ],
-            temperature=0
-        )
+def request_cache_key(text: str, deployment: str = None) -> str:
+    # The mapping mode and subset size change the prompt, so they are part of the cache key
+    version = prompt_version(PROMPT_VERSION, PROMPT_TECH_MODE, PROMPT_TECH_SUBSET_SIZE)
+    return cache_key("jd", text, version, deployment or AZURE_OPENAI_DEPLOYMENT)
 
-        raw_output = response.choices[0].message.content
-        parsed = safe_json_load(raw_output)
 
+def parse_response(raw_output: str) -> dict:
+    return safe_json_load(raw_output)
 
 
-        required_skills_list = parsed.get("required_skills_with_scores", [])
-        good_to_have = parsed.get("good_to_have_skills", [])
+async def request_parse(text: str) -> dict:
+    return await cached_parse("jd", text, request_cache_key, build_messages, REQUEST_OPTIONS, parse_response)
 
-        # Convert list → dict safely
-        required_skills_dict = {
-            item["skill_name"]: item["score"]
-            for item in required_skills_list
-            if isinstance(item, dict)
-            and "skill_name" in item
-            and "score" in item
-        }
 
-        # Primary = score >= 8
-        primary_skills = [
-            skill.lower()
-            for skill, score in required_skills_dict.items()
-            if score >= 8
-        ]
-
-        # Secondary = score < 8 + good_to_have
-        secondary_skills = [
-            skill.lower()
-            for skill, score in required_skills_dict.items()
-            if score < 8
-        ] + [s.lower() for s in good_to_have]
-
-        secondary_skills = list(set(secondary_skills) - set(primary_skills))
-
-        # Safe experience conversion
-        try:
-            min_exp = int(parsed.get("minimum_experience_in_years", 0))
-        except Exception:
-            min_exp = 0
-
-
-        job_data = {
-            "job_id": job_id,
-            "job_summary": parsed.get("job_summary", ""),
-            "key_responsibilities": parsed.get("key_responsibilities", []),
-
-            "required_skills_with_scores": {
-                k.lower(): v for k, v in required_skills_dict.items()
-            },
-
-            "primary_skills": list(set(primary_skills)),
-            "secondary_skills": list(set(secondary_skills)),
-
-            "minimum_experience_in_years": min_exp,
-            "technology": parsed.get("technology", "Others"),
-            "category": parsed.get("category", "Others"),
-            "location": parsed.get("location", "N/A"),
-            "justification": parsed.get("justification", ""),
-            "created_at": datetime.utcnow()
-        }
+def build_job_document(pdf_path: str, parsed: dict) -> dict:
+
+    job_id = os.path.splitext(os.path.basename(pdf_path))[0]
+
+    required_skills_list = parsed.get("required_skills_with_scores", [])
+    good_to_have = parsed.get("good_to_have_skills", [])
+
+    # Convert list → dict safely
+    required_skills_dict = {
+        item["skill_name"]: item["score"]
+        for item in required_skills_list
+        if isinstance(item, dict)
+        and "skill_name" in item
+        and "score" in item
+    }
 
-        # -----------------------------------
-        # 🚀 UPSERT TO MONGODB
-        # -----------------------------------
+    # Canonical skill ID → score; aliases of one skill keep the highest score
+    canonical_scores = {}
+    for skill, score in required_skills_dict.items():
+        if not isinstance(skill, str) or not isinstance(score, (int, float)):
+            continue
+        for canonical in canonical_skills(skill):
+            canonical_scores[canonical] = max(canonical_scores.get(canonical, score), score)
 
-        job_collection.update_one(
-            {"job_id": job_id},
-            {"$set": job_data},
-            upsert=True
+    # Primary = score >= 8
+    primary_skills = [
+        skill
+        for skill, score in canonical_scores.items()
+        if score >= 8
+    ]
+
+    # Secondary = score < 8 + good_to_have
+    secondary_skills = [
+        skill
+        for skill, score in canonical_scores.items()
+        if score < 8
+    ] + canonicalize_skills(good_to_have)
+
+    secondary_skills = list(set(secondary_skills) - set(primary_skills))
+
+    # Safe experience conversion
+    try:
+        min_exp = int(parsed.get("minimum_experience_in_years", 0))
+    except Exception:
+        min_exp = 0
+
+    technology = parsed.get("technology", "Others")
+    category = parsed.get("category", "Others")
+    justification = parsed.get("justification", "")
+
+    if PROMPT_TECH_MODE == "local":
+        technology, category, justification = classify_locally(
+            [(skill, score) for skill, score in required_skills_dict.items()
+             if isinstance(score, (int, float))]
+            + [(s, 1) for s in good_to_have]
         )
 
-        print(f"✅ Stored/Updated JD: {job_id}")
\ No newline at end of file
+
+    job_data = {
+        "job_id": job_id,
+        "job_summary": parsed.get("job_summary", ""),
+        "key_responsibilities": parsed.get("key_responsibilities", []),
+
+        "required_skills_with_scores": canonical_scores,
+
+        "primary_skills": list(set(primary_skills)),
+        "secondary_skills": list(set(secondary_skills)),
+
+        "minimum_experience_in_years": min_exp,
+        "technology": technology,
+        "category": category,
+        "location": parsed.get("location", "N/A"),
+        "justification": justification,
+        "created_at": datetime.utcnow()
+    }
+
+    job_data.update(build_norm_fields(job_data))
+    job_data.update(search_terms(job_data))
+    return job_data
+
+
+# -----------------------------------
+# 🚀 UPSERT TO MONGODB
+# -----------------------------------
+async def store_job(job_data: dict, writer=None, writer_key=None) -> str:
+
+    job_id = job_data["job_id"]
+
+    if writer is not None:
+        await writer.add(build_job_update(job_data), job_id if writer_key is None else writer_key)
+        print(f"✅ Queued JD: {job_id}")
+        return job_id
+
+    await async_job_collection.update_one(
+        {"job_id": job_id},
+        {"$set": job_data},
+        upsert=True
+    )
+    await record_changes_async("jobs", [job_id])
+
+    print(f"✅ Stored/Updated JD: {job_id}")
+    return job_id
+
+
+async def parse_jd(pdf_path: str, writer=None):
+
+    print(f" Processing: {pdf_path}")
+
+    # CPU-bound extraction runs in the process pool, outside the LLM rate limiter
+    text = await extract_text_async(pdf_path)
+
+    if not text or not text.strip():
+        print("⚠ Empty JD detected.")
+        return
+
+    parsed = await request_parse(text)
+    job_data = build_job_document(pdf_path, parsed)
+
+    return await store_job(job_data, writer)
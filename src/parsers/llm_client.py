@@ -0,0 +1,230 @@
+import time
+import random
+import asyncio
+from openai import (
+    AsyncAzureOpenAI,
+    APIStatusError,
+    APIConnectionError,
+    APITimeoutError,
+    RateLimitError
+)
+from config.settings import (
+    get_env,
+    AZURE_CONCURRENCY,
+    AZURE_RPM_LIMIT,
+    AZURE_TPM_LIMIT,
+    AZURE_MIN_CONCURRENCY,
+    AZURE_MAX_CONCURRENCY,
+    LLM_TARGET_LATENCY_SECONDS,
+    LLM_MAX_RETRIES,
+    LLM_BACKOFF_BASE_SECONDS,
+    LLM_BACKOFF_MAX_SECONDS,
+    LLM_EST_COMPLETION_TOKENS
+)
+
+_client = None
+
+
+def get_client() -> AsyncAzureOpenAI:
+    # Built on the first LLM call, so importing the parsers needs no Azure credentials.
+    # Retries are handled by chat_completion, so the SDK's own retry loop is disabled
+    global _client
+    if _client is None:
+        get_env("AZURE_OPENAI_DEPLOYMENT_NAME")
+        _client = AsyncAzureOpenAI(
+            api_key=get_env("AZURE_OPENAI_API_KEY"),
+            azure_endpoint=get_env("AZURE_OPENAI_ENDPOINT"),
+            api_version=get_env("AZURE_OPENAI_API_VERSION"),
+            max_retries=0
+        )
+    return _client
+
+
+# -----------------------------
+# Adaptive rate limiter
+# -----------------------------
+class AdaptiveRateLimiter:
+    # Token buckets for requests/min and tokens/min, plus an AIMD concurrency
+    # limit: +1 per window of fast successes, halved on throttling.
+    # Uses only time + asyncio.sleep so one instance works across asyncio.run calls.
+
+    def __init__(
+        self,
+        rpm: int,
+        tpm: int,
+        initial_concurrency: int,
+        min_concurrency: int,
+        max_concurrency: int,
+        target_latency: float
+    ):
+        self.rpm = rpm
+        self.tpm = tpm
+        self.min_concurrency = max(min_concurrency, 1)
+        self.max_concurrency = max(max_concurrency, self.min_concurrency)
+        self.limit = float(min(max(initial_concurrency, self.min_concurrency), self.max_concurrency))
+        self.target_latency = target_latency
+
+        self.in_flight = 0
+        self.request_allowance = float(rpm)
+        self.token_allowance = float(tpm)
+        self.blocked_until = 0.0
+        self._last_refill = time.monotonic()
+
+        self.stats = {"requests": 0, "retries": 0, "throttled": 0, "failures": 0, "tokens": 0}
+
+    def _refill(self, now: float):
+        elapsed = now - self._last_refill
+        self._last_refill = now
+        if self.rpm:
+            self.request_allowance = min(self.rpm, self.request_allowance + elapsed * self.rpm / 60)
+        if self.tpm:
+            self.token_allowance = min(self.tpm, self.token_allowance + elapsed * self.tpm / 60)
+
+    async def acquire(self, tokens: int):
+        tokens = min(tokens, self.tpm) if self.tpm else tokens
+
+        while True:
+            now = time.monotonic()
+            self._refill(now)
+
+            if now < self.blocked_until:
+                wait = self.blocked_until - now
+            elif self.in_flight >= int(self.limit):
+                wait = 0.05
+            elif self.rpm and self.request_allowance < 1:
+                wait = (1 - self.request_allowance) * 60 / self.rpm
+            elif self.tpm and self.token_allowance < tokens:
+                wait = (tokens - self.token_allowance) * 60 / self.tpm
+            else:
+                self.in_flight += 1
+                self.request_allowance -= 1
+                self.token_allowance -= tokens
+                self.stats["requests"] += 1
+                return
+
+            await asyncio.sleep(min(wait, 1.0))
+
+    def release(self, latency: float, throttled: bool = False, failed: bool = False, cancelled: bool = False):
+        self.in_flight -= 1
+
+        if cancelled:
+            # Says nothing about the service, so the concurrency limit stays as it is
+            return
+        if throttled:
+            self.stats["throttled"] += 1
+            self.limit = max(self.min_concurrency, self.limit / 2)
+        elif failed:
+            self.stats["failures"] += 1
+        elif latency > self.target_latency:
+            self.limit = max(self.min_concurrency, self.limit - 1)
+        else:
+            self.limit = min(self.max_concurrency, self.limit + 1 / self.limit)
+
+    def record_usage(self, estimated: int, actual: int):
+        # Correct the token bucket once the real usage is known
+        self.stats["tokens"] += actual
+        if self.tpm:
+            self.token_allowance = min(self.tpm, self.token_allowance + estimated - actual)
+
+    def block_for(self, seconds: float):
+        # Every caller waits out a 429, so one throttle does not start a retry storm
+        self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+
+    def report(self):
+        s = self.stats
+        print(
+            f"🚦 Azure OpenAI: {s['requests']} requests, {s['retries']} retries, "
+            f"{s['throttled']} throttled, {s['failures']} failures, {s['tokens']} tokens | "
+            f"concurrency now {int(self.limit)}"
+        )
+
+
+limiter = AdaptiveRateLimiter(
+    rpm=AZURE_RPM_LIMIT,
+    tpm=AZURE_TPM_LIMIT,
+    initial_concurrency=AZURE_CONCURRENCY,
+    min_concurrency=AZURE_MIN_CONCURRENCY,
+    max_concurrency=AZURE_MAX_CONCURRENCY,
+    target_latency=LLM_TARGET_LATENCY_SECONDS
+)
+
+
+# -----------------------------
+# Helpers
+# -----------------------------
+def estimate_tokens(messages) -> int:
+    # ~4 characters per token, plus room for the completion
+    chars = sum(len(m.get("content") or "") for m in messages)
+    return chars // 4 + LLM_EST_COMPLETION_TOKENS
+
+
+def retry_after_seconds(error: APIStatusError):
+    headers = getattr(error.response, "headers", None) or {}
+    for header, scale in (("retry-after-ms", 0.001), ("retry-after", 1)):
+        value = headers.get(header)
+        if value:
+            try:
+                return float(value) * scale
+            except ValueError:
+                pass
+    return None
+
+
+def backoff_seconds(attempt: int) -> float:
+    delay = min(LLM_BACKOFF_MAX_SECONDS, LLM_BACKOFF_BASE_SECONDS * (2 ** attempt))
+    return random.uniform(delay / 2, delay)
+
+
+# -----------------------------
+# Chat completion with retries
+# -----------------------------
+async def chat_completion(**kwargs):
+    client = get_client()
+    estimated = estimate_tokens(kwargs.get("messages", []))
+
+    for attempt in range(LLM_MAX_RETRIES + 1):
+        await limiter.acquire(estimated)
+        started = time.monotonic()
+
+        try:
+            response = await client.chat.completions.create(**kwargs)
+
+        except RateLimitError as e:
+            limiter.release(time.monotonic() - started, throttled=True)
+            delay = retry_after_seconds(e) or backoff_seconds(attempt)
+            limiter.block_for(delay)
+            error = e
+
+        except APIStatusError as e:
+            limiter.release(time.monotonic() - started, failed=True)
+            if e.status_code < 500:
+                raise
+            delay = retry_after_seconds(e) or backoff_seconds(attempt)
+            error = e
+
+        except (APIConnectionError, APITimeoutError) as e:
+            limiter.release(time.monotonic() - started, failed=True)
+            delay = backoff_seconds(attempt)
+            error = e
+
+        except Exception:
+            limiter.release(time.monotonic() - started, failed=True)
+            raise
+
+        except BaseException:
+            # Cancelled mid-request (e.g. a worker shutting down): the slot is still freed
+            limiter.release(time.monotonic() - started, cancelled=True)
+            raise
+
+        else:
+            limiter.release(time.monotonic() - started)
+            usage = getattr(response, "usage", None)
+            if usage is not None and getattr(usage, "total_tokens", None):
+                limiter.record_usage(estimated, usage.total_tokens)
+            return response
+
+        if attempt == LLM_MAX_RETRIES:
+            raise error
+
+        limiter.stats["retries"] += 1
+        await asyncio.sleep(delay)
@@ -0,0 +1,147 @@
+import hashlib
+from datetime import datetime, timedelta
+from database.mongo import parse_cache_collection, async_parse_cache_collection
+from parsers.llm_client import chat_completion
+from config.settings import (
+    AZURE_OPENAI_DEPLOYMENT,
+    AZURE_OPENAI_BATCH_DEPLOYMENT,
+    PARSE_CACHE_ENABLED,
+    PARSE_CACHE_MAX_ENTRIES,
+    PARSE_CACHE_TTL_DAYS
+)
+
+# Hit / miss counters per parser kind ("resume", "jd") for the current run
+stats = {}
+
+
+def _count(kind: str, field: str):
+    stats.setdefault(kind, {"hits": 0, "misses": 0})[field] += 1
+
+
+# -----------------------------
+# Cache key
+# -----------------------------
+def prompt_version(version: str, tech_mode: str, subset_size: int) -> str:
+    # Everything besides the text that shapes the prompt ("full" keeps the bare version)
+    if tech_mode == "full":
+        return version
+    if tech_mode == "compact":
+        return f"{version}-{tech_mode}-{subset_size}"
+    return f"{version}-{tech_mode}"
+
+
+def cache_key(kind: str, text: str, prompt_version: str, deployment: str) -> str:
+    digest = hashlib.sha256()
+    for part in (kind, prompt_version, deployment, text):
+        digest.update((part or "").encode("utf-8"))
+        digest.update(b"\x00")
+    return digest.hexdigest()
+
+
+# -----------------------------
+# Lookup / store
+# -----------------------------
+async def get_cached(kind: str, *keys: str):
+    # One lookup (and one hit or miss) per request; with several keys (e.g. the live and
+    # the batch deployment's), the first one found wins
+    if not PARSE_CACHE_ENABLED:
+        return None
+
+    entries = {
+        e["_id"]: e
+        for e in await async_parse_cache_collection.find(
+            {"_id": {"$in": list(keys)}}, {"content": 1, "created_at": 1}
+        )
+    }
+
+    # The TTL monitor only runs once a minute, so check the age here as well
+    cutoff = datetime.utcnow() - timedelta(days=PARSE_CACHE_TTL_DAYS)
+    for key in keys:
+        entry = entries.get(key)
+        if entry and entry.get("created_at") and entry["created_at"] >= cutoff:
+            _count(kind, "hits")
+            return entry["content"]
+
+    _count(kind, "misses")
+    return None
+
+
+def cache_upsert(kind: str, key: str, content: str):
+    return {"_id": key}, {"$set": {"kind": kind, "content": content, "created_at": datetime.utcnow()}}
+
+
+async def store_cached(kind: str, key: str, content: str):
+    if not PARSE_CACHE_ENABLED:
+        return
+
+    filter_, update = cache_upsert(kind, key, content)
+    await async_parse_cache_collection.update_one(filter_, update, upsert=True)
+
+
+# -----------------------------
+# Cached LLM request (shared by the resume and JD parsers)
+# -----------------------------
+async def cached_parse(kind: str, text: str, request_cache_key, build_messages, options: dict, parse_response):
+    # request_cache_key(text, deployment=None), build_messages(text) and parse_response(raw)
+    # come from the parser module, so a live call and a batch request stay identical
+    key = request_cache_key(text)
+    keys = [key]
+    if AZURE_OPENAI_BATCH_DEPLOYMENT not in ("", AZURE_OPENAI_DEPLOYMENT):
+        # Also answered by offline batches on their own deployment (ingestion.batch_mode)
+        keys.append(request_cache_key(text, AZURE_OPENAI_BATCH_DEPLOYMENT))
+    raw = await get_cached(kind, *keys)
+    cached = raw is not None
+
+    if not cached:
+        # Rate limiting, throttling backoff and retries live in llm_client
+        response = await chat_completion(
+            model=AZURE_OPENAI_DEPLOYMENT,
+            messages=build_messages(text),
+            **options
+        )
+        raw = response.choices[0].message.content
+
+    parsed = parse_response(raw)
+
+    # Only cache responses that parsed cleanly
+    if not cached:
+        await store_cached(kind, key, raw)
+
+    return parsed
+
+
+# -----------------------------
+# Eviction
+# -----------------------------
+def evict_parse_cache():
+    if not PARSE_CACHE_ENABLED:
+        return 0
+
+    cutoff = datetime.utcnow() - timedelta(days=PARSE_CACHE_TTL_DAYS)
+    removed = parse_cache_collection.delete_many({"created_at": {"$lt": cutoff}}).deleted_count
+
+    excess = parse_cache_collection.estimated_document_count() - PARSE_CACHE_MAX_ENTRIES
+    if excess > 0:
+        oldest = [
+            doc["_id"]
+            for doc in parse_cache_collection.find({}, {"_id": 1})
+            .sort("created_at", 1)
+            .limit(excess)
+        ]
+        removed += parse_cache_collection.delete_many({"_id": {"$in": oldest}}).deleted_count
+
+    return removed
+
+
+# -----------------------------
+# Reporting
+# -----------------------------
+def reset_stats(kind: str):
+    stats[kind] = {"hits": 0, "misses": 0}
+
+
+def report_stats(kind: str):
+    counts = stats.get(kind, {"hits": 0, "misses": 0})
+    total = counts["hits"] + counts["misses"]
+    rate = (counts["hits"] / total * 100) if total else 0
+    print(f"🗄 Parse cache ({kind}): {counts['hits']} hits, {counts['misses']} misses ({rate:.1f}% hit rate)")
@@ -1,8 +1,57 @@
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
 from pypdf import PdfReader
+from config.settings import PDF_EXTRACT_WORKERS, PDF_MAX_PAGES, PDF_MAX_CHARS
 
-def extract_text_from_pdf(path):
+# Created lazily so importing this module (e.g. in pool workers) stays cheap
+_executor = None
+
+
+def iter_pdf_pages(path, max_pages=PDF_MAX_PAGES, max_chars=PDF_MAX_CHARS):
+    # Yields page text one page at a time, stopping early once a cap is reached
     reader = PdfReader(path)
-    text = ""
-    for page in reader.pages:
-        text += page.extract_text() or ""
-    return text
\ No newline at end of file
+    remaining = max_chars or None
+
+    for index in range(len(reader.pages)):
+        if max_pages and index >= max_pages:
+            break
+
+        text = reader.pages[index].extract_text() or ""
+
+        if remaining is not None:
+            text = text[:remaining]
+            remaining -= len(text)
+
+        yield text
+
+        if remaining is not None and remaining <= 0:
+            break
+
+
+def extract_text_from_pdf(path, max_pages=PDF_MAX_PAGES, max_chars=PDF_MAX_CHARS):
+    return "".join(iter_pdf_pages(path, max_pages, max_chars))
+
+
+def get_extract_executor():
+    global _executor
+    if _executor is None:
+        # spawn, not fork: by now the process has Mongo client and event loop threads,
+        # and a forked child could inherit one of their locks held
+        _executor = ProcessPoolExecutor(
+            max_workers=max(PDF_EXTRACT_WORKERS, 1),
+            mp_context=multiprocessing.get_context("spawn")
+        )
+    return _executor
+
+
+async def extract_text_async(path):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_extract_executor(), extract_text_from_pdf, path)
+
+
+def shutdown_extract_executor():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=True)
+        _executor = None
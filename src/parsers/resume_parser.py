@@ -1,29 +1,25 @@
 import uuid
 import json
-import asyncio
 import re
 from datetime import datetime
-from openai import AsyncAzureOpenAI
-from database.mongo import resume_collection
-from parsers.pdf_extractor import extract_text_from_pdf
+from pymongo import UpdateOne, ReturnDocument
+from database.mongo import async_resume_collection
+from database.versions import record_changes_async
+from parsers.pdf_extractor import extract_text_async
+from parsers.parse_cache import prompt_version, cache_key, cached_parse
+from matcher.normalize import build_norm_fields
+from database.listing import search_terms
 from config.settings import (
-    AZURE_OPENAI_API_KEY,
-    AZURE_OPENAI_ENDPOINT,
-    AZURE_OPENAI_API_VERSION,
     AZURE_OPENAI_DEPLOYMENT,
-    AZURE_CONCURRENCY
+    PROMPT_TECH_MODE,
+    PROMPT_TECH_SUBSET_SIZE
 )
 
-from config.tech_mapping import TECH_CATEGORIES_MAP as technologies_and_categories
+from config.tech_mapping import TECH_CATEGORIES_MAP, mapping_for_prompt, classify_locally
+from config.skill_aliases import canonicalize_skills
 
-client = AsyncAzureOpenAI(
-    api_key=AZURE_OPENAI_API_KEY,
-    azure_endpoint=AZURE_OPENAI_ENDPOINT,
-    api_version=AZURE_OPENAI_API_VERSION
-)
-
-# Controls concurrency for N resumes
-semaphore = asyncio.Semaphore(AZURE_CONCURRENCY)
+# Bump whenever build_prompt / the request below changes, so cached parses are not reused
+PROMPT_VERSION = "3"
 
 def clean_json_response(text: str) -> str:
     text = text.strip()
@@ -33,9 +29,11 @@ def clean_json_response(text: str) -> str:
         text = re.sub(r"^```json|```$", "", text, flags=re.MULTILINE).strip()
 
     return text
-current_date = datetime.utcnow().strftime("%d/%m/%Y")
 
-def build_prompt(text: str) -> str:
+def build_prompt(text: str, mode: str = PROMPT_TECH_MODE) -> str:
+    technologies_and_categories = mapping_for_prompt(
+        text, mode, TECH_CATEGORIES_MAP, PROMPT_TECH_SUBSET_SIZE
+    )
     return f"""
             You are an enterprise-grade Resume Parser designed for an Applicant Tracking System (ATS).
 Your task is to extract accurate, structured, and normalized information from the provided resume content.
@@ -109,13 +107,14 @@ Each entry must contain:
     dd/mm/yyyy - dd/mm/yyyy
 
     Rules:
-    • If end date is "Present", replace it with {current_date}
+    • If the role is ongoing, keep "Present" as the end date (e.g. "01/03/2021 - Present")
     • If day is missing → use "XX"
     • If month is missing → use "XX/XX/yyyy"
     • If completely missing → "Not Specified"
 
 - "Experience_In_Months":
     Calculate total months for that role.
+    If the role is ongoing ("Present") → return 0.
     If period missing → return 0.
 
 - "Company":
@@ -166,14 +165,8 @@ Extract top skills based on:
 Rules:
 1. Only standardized professional skills.
 2. No soft skills.
-3. Proper casing:
-   - Node.js
-   - React.js
-   - JavaScript
-   - TypeScript
-   - PostgreSQL
-4. Abbreviations like SQL, UI → uppercase.
-5. If none → [].
+3. Use the common name of each skill; spelling variants are canonicalized after extraction.
+4. If none → [].
 
 ------------------------------------------------------------
 SECONDARY SKILLS:
@@ -292,14 +285,6 @@ NOW PROCESS THE RESUME ABOVE.
                 """
 
 
-# -----------------------------
-# Normalize skill text
-# -----------------------------
-def normalize_skill(skill: str) -> str:
-    skill = (skill or "").lower()
-    skill = re.sub(r"[^a-z0-9\s]", " ", skill)
-    skill = re.sub(r"\s+", " ", skill)
-    return skill.strip()
 import re
 
 def normalize_location(location: str) -> str:
@@ -322,110 +307,236 @@ def extract_email(text: str) -> str:
     return match.group(0).lower() if match else ""
 
 # -----------------------------
-# Main Async Parser
+# Idempotent upsert keyed on email
+# -----------------------------
+# Fields written only when the candidate is first seen
+IMMUTABLE_RESUME_FIELDS = ("candidate_id", "created_at")
+
+# Fixed namespace so the same email always maps to the same candidate_id
+CANDIDATE_ID_NAMESPACE = uuid.uuid5(uuid.NAMESPACE_URL, "job-matcher/candidates")
+
+
+def make_candidate_id(email: str) -> str:
+    return str(uuid.uuid5(CANDIDATE_ID_NAMESPACE, email.strip().lower()))
+
+
+def resume_upsert(resume_data: dict):
+    mutable = {
+        k: v for k, v in resume_data.items()
+        if k not in IMMUTABLE_RESUME_FIELDS and k != "email"
+    }
+    mutable["updated_at"] = datetime.utcnow()
+
+    immutable = {k: resume_data[k] for k in IMMUTABLE_RESUME_FIELDS if k in resume_data}
+
+    return (
+        {"email": resume_data["email"]},
+        {"$set": mutable, "$setOnInsert": immutable}
+    )
+
+
+def build_resume_update(resume_data: dict) -> UpdateOne:
+    filter_, update = resume_upsert(resume_data)
+    return UpdateOne(filter_, update, upsert=True)
+
+
+async def stored_candidate_ids(emails) -> list:
+    # candidate_id is only set on insert, and resumes stored before it was derived from
+    # the email keep their original id: change records must name the stored one.
+    # Called once per writer flush, with every email of the batch.
+    docs = await async_resume_collection.find(
+        {"email": {"$in": list(emails)}}, {"_id": 0, "candidate_id": 1}
+    )
+    return [d["candidate_id"] for d in docs if d.get("candidate_id")]
+
+# -----------------------------
+# LLM request (cached)
+# -----------------------------
+# Everything but the text is fixed per prompt version, so the same request can be
+# sent live (request_parse) or written to a batch file (ingestion.batch_mode)
+REQUEST_OPTIONS = {"temperature": 0, "response_format": {"type": "json_object"}}
+
+
+def build_messages(text: str) -> list:
+    return [
+        {
+            "role": "system",
+            "content": "You are a senior ATS resume parser. Return ONLY valid JSON."
+        },
+        {"role": "user", "content": build_prompt(text)}
+    ]
+
+
+def request_cache_key(text: str, deployment: str = None) -> str:
+    # The mapping mode and subset size change the prompt, so they are part of the cache key
+    version = prompt_version(PROMPT_VERSION, PROMPT_TECH_MODE, PROMPT_TECH_SUBSET_SIZE)
+    return cache_key("resume", text, version, deployment or AZURE_OPENAI_DEPLOYMENT)
+
+
+def parse_response(raw_content: str) -> dict:
+    return json.loads(clean_json_response(raw_content))
+
+
+async def request_parse(text: str) -> dict:
+    return await cached_parse("resume", text, request_cache_key, build_messages, REQUEST_OPTIONS, parse_response)
+
 # -----------------------------
-async def parse_resume(pdf_path: str):
-
-    async with semaphore:
-
-        try:
-            text = extract_text_from_pdf(pdf_path)
-            extracted_email = extract_email(text)
-
-            response = await client.chat.completions.create(
-                model=AZURE_OPENAI_DEPLOYMENT,
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "You are a senior ATS resume parser. Return ONLY valid JSON."
-                    },
-                    {"role": "user", "content": build_prompt(text)}
-                ],
-                temperature=0,
-                response_format={"type": "json_object"}
-            )
-
-            raw_content = response.choices[0].message.content
-            cleaned = clean_json_response(raw_content)
-            parsed = json.loads(cleaned)
-
-        except Exception as e:
-            print(f"❌ Parsing failed for {pdf_path}: {e}")
-            return
-
-
-        # 1️⃣ Mentioned years → months
-        mentioned_years = float(
-            parsed.get("Experience_Mentioned_In_Resume", 0) or 0
+# Resume Document
+# -----------------------------
+def ongoing_months(period) -> int:
+    # "dd/mm/yyyy - Present" → whole months from the start until today; None for other periods
+    if not isinstance(period, str):
+        return None
+    start, _, end = period.partition("-")
+    if end.strip().lower() != "present":
+        return None
+
+    parts = [p.strip() for p in start.split("/")]
+    try:
+        year = int(parts[-1])
+    except ValueError:
+        return None
+    month = int(parts[-2]) if len(parts) >= 2 and parts[-2].isdigit() else 1
+
+    today = datetime.utcnow()
+    return max((today.year - year) * 12 + today.month - month, 0)
+
+
+def build_resume_document(pdf_path: str, text: str, parsed: dict):
+
+    extracted_email = extract_email(text)
+
+    # 1️⃣ Mentioned years → months
+    mentioned_years = float(
+        parsed.get("Experience_Mentioned_In_Resume", 0) or 0
+    )
+    mentioned_months = int(mentioned_years * 12)
+
+    # 2️⃣ Calculated months from each role
+    experience_details = parsed.get("Experience", [])
+
+    calculated_months = 0
+    for exp in experience_details:
+        if isinstance(exp, dict):
+            # Ongoing roles are counted up to today here, so cached parses never go stale
+            ongoing = ongoing_months(exp.get("Period"))
+            if ongoing is not None:
+                exp["Experience_In_Months"] = ongoing
+            months = exp.get("Experience_In_Months", 0)
+            try:
+                calculated_months += int(months)
+            except:
+                pass
+
+    # 3️⃣ Enterprise logic → take maximum
+    total_experience_months = max(mentioned_months, calculated_months)
+    total_experience_years = round(total_experience_months / 12, 1)
+
+    # Canonical skill IDs; a skill already listed as primary is not repeated as secondary
+    primary_skills = canonicalize_skills(parsed.get("Primary_Skills", []))
+    secondary_skills = [
+        s for s in canonicalize_skills(parsed.get("Secondary_Skills", []))
+        if s not in primary_skills
+    ]
+
+    technology = parsed.get("Technology", "Others")
+    category = parsed.get("Category", "Others")
+    justification = parsed.get("Justification", "")
+
+    if PROMPT_TECH_MODE == "local":
+        # Most recent role weighs more than older history, as in the prompt rules
+        recent_skills = experience_details[0].get("Skills", []) if (
+            experience_details and isinstance(experience_details[0], dict)
+        ) else []
+        technology, category, justification = classify_locally(
+            [(s, 3) for s in parsed.get("Primary_Skills", [])]
+            + [(s, 2) for s in recent_skills if isinstance(recent_skills, list)]
+            + [(s, 1) for s in parsed.get("Secondary_Skills", [])]
         )
-        mentioned_months = int(mentioned_years * 12)
-
-        # 2️⃣ Calculated months from each role
-        experience_details = parsed.get("Experience", [])
-
-        calculated_months = 0
-        for exp in experience_details:
-            if isinstance(exp, dict):
-                months = exp.get("Experience_In_Months", 0)
-                try:
-                    calculated_months += int(months)
-                except:
-                    pass
-
-        # 3️⃣ Enterprise logic → take maximum
-        total_experience_months = max(mentioned_months, calculated_months)
-        total_experience_years = round(total_experience_months / 12, 1)
-
-        # ---------------------------------
-        # Resume Document
-        # ---------------------------------
-        resume_data = {
-            "candidate_id": str(uuid.uuid4()),
-            "name": (parsed.get("Employee_Name") or "").strip(),
-            "email": extracted_email,
-
-            "primary_skills": [
-                normalize_skill(s)
-                for s in parsed.get("Primary_Skills", [])
-                if isinstance(s, str)
-            ],
-
-            "secondary_skills": [
-                normalize_skill(s)
-                for s in parsed.get("Secondary_Skills", [])
-                if isinstance(s, str)
-            ],
-
-            "location": [
-                normalize_location(loc)
-                for loc in parsed.get("Location", [])
-                if isinstance(loc, str)
-            ],
-
-            "total_experience_months": total_experience_months,
-            "total_experience_years": total_experience_years,
-
-            "education": parsed.get("Education", []),
-            "experience_details": experience_details,
-
-            "technology": parsed.get("Technology", "Others"),
-            "category": parsed.get("Category", "Others"),
-            "justification": parsed.get("Justification", ""),
-
-            "profile_summary": parsed.get("Profile_Summary", ""),
-            "certifications": parsed.get("Certifications", []),
-
-            "created_at": datetime.utcnow()
-        }
-
-        if not resume_data["email"]:
-            print(f"⚠ Skipped (no email): {pdf_path}")
-            return
-
-        if resume_collection.find_one({"email": resume_data["email"]}):
-            print(f"⚠ Duplicate skipped: {resume_data['email']}")
-            return
-
-        resume_collection.insert_one(resume_data)
-
-        print(f"✅ Stored: {resume_data['email']}")
\ No newline at end of file
+
+    resume_data = {
+        "candidate_id": make_candidate_id(extracted_email) if extracted_email else "",
+        "name": (parsed.get("Employee_Name") or "").strip(),
+        "email": extracted_email,
+
+        "primary_skills": primary_skills,
+        "secondary_skills": secondary_skills,
+
+        "location": [
+            normalize_location(loc)
+            for loc in parsed.get("Location", [])
+            if isinstance(loc, str)
+        ],
+
+        "total_experience_months": total_experience_months,
+        "total_experience_years": total_experience_years,
+
+        "education": parsed.get("Education", []),
+        "experience_details": experience_details,
+
+        "technology": technology,
+        "category": category,
+        "justification": justification,
+
+        "profile_summary": parsed.get("Profile_Summary", ""),
+        "certifications": parsed.get("Certifications", []),
+
+        "created_at": datetime.utcnow()
+    }
+
+    if not resume_data["email"]:
+        print(f"⚠ Skipped (no email): {pdf_path}")
+        return None
+
+    resume_data.update(build_norm_fields(resume_data))
+    resume_data.update(search_terms(resume_data))
+
+    return resume_data
+
+# -----------------------------
+# Store
+# -----------------------------
+async def store_resume(resume_data: dict, writer=None, writer_key=None) -> str:
+    # Writes are keyed on email, the upsert filter (see stored_candidate_ids), unless the
+    # caller passes its own writer_key
+
+    if writer is not None:
+        key = resume_data["email"] if writer_key is None else writer_key
+        await writer.add(build_resume_update(resume_data), key)
+        print(f"✅ Queued: {resume_data['email']}")
+        return resume_data["email"]
+
+    # The stored candidate_id comes back with the write itself
+    filter_, update = resume_upsert(resume_data)
+    stored = await async_resume_collection.find_one_and_update(
+        filter_, update, {"_id": 0, "candidate_id": 1},
+        upsert=True, return_document=ReturnDocument.AFTER
+    )
+    await record_changes_async("resumes", [stored["candidate_id"]])
+
+    print(f"✅ Stored/Updated: {resume_data['email']}")
+    return resume_data["email"]
+
+# -----------------------------
+# Main Async Parser
+# -----------------------------
+async def parse_resume(pdf_path: str, writer=None):
+
+    # CPU-bound extraction runs in the process pool, outside the LLM rate limiter
+    try:
+        text = await extract_text_async(pdf_path)
+    except Exception as e:
+        print(f"❌ Extraction failed for {pdf_path}: {e}")
+        return
+
+    try:
+        parsed = await request_parse(text)
+    except Exception as e:
+        print(f"❌ Parsing failed for {pdf_path}: {e}")
+        return
+
+    resume_data = build_resume_document(pdf_path, text, parsed)
+    if resume_data is None:
+        return
+
+    return await store_resume(resume_data, writer)
@@ -0,0 +1,368 @@
+import json
+import time
+import asyncio
+import statistics
+from collections import OrderedDict, deque
+from datetime import datetime
+from urllib.parse import urlsplit, parse_qs, unquote
+from database.mongo import resume_collection, job_collection
+from database.versions import read_versions, changed_ids
+from matcher.engine import MatchEngine, SIDE_SPECS, PROJECTIONS
+from matcher.bulk import iter_all_matches
+from matcher.profiles import get_profile
+from config.settings import (
+    SERVICE_HOST,
+    SERVICE_PORT,
+    SERVICE_REFRESH_SECONDS,
+    SERVICE_REBUILD_SECONDS,
+    SERVICE_MAX_BODY_BYTES
+)
+
+# Long-running match service: resumes and jobs are loaded once into a MatchEngine,
+# kept warm, and refreshed from the change counters in database.versions (only
+# changed documents are re-read). The engine side itself is rebuilt from all of its
+# documents, so rebuilds are spaced SERVICE_REBUILD_SECONDS apart per side and take
+# every change of the interval at once. Stdlib asyncio HTTP/1.1 with keep-alive.
+#
+#   GET  /health
+#   GET  /stats
+#   GET  /match/resume/<candidate_id>?top_n=5&profile=<name>
+#   GET  /match/job/<job_id>?top_n=5&profiles=<a>,<b>   (A/B: one shortlist per profile)
+#   POST /match/batch   {"resumes": [...], "jobs": [...], "top_n": 5, "profile": "<name>"}
+#   POST /reload
+
+COLLECTIONS = {"resumes": resume_collection, "jobs": job_collection}
+
+REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed", 413: "Payload Too Large",
+           500: "Internal Server Error"}
+
+DEFAULT_TOP_N = 5
+
+
+class HTTPError(Exception):
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+def parse_top_n(value) -> int:
+    try:
+        top_n = int(value)
+    except (TypeError, ValueError):
+        raise HTTPError(400, "top_n must be an integer")
+    if top_n <= 0:
+        raise HTTPError(400, "top_n must be positive")
+    return top_n
+
+
+def parse_profile(value):
+    try:
+        return get_profile(value)
+    except ValueError as e:
+        raise HTTPError(400, str(e))
+
+
+class MatchService:
+
+    def __init__(self, refresh_interval: float = SERVICE_REFRESH_SECONDS,
+                 rebuild_interval: float = SERVICE_REBUILD_SECONDS):
+        self.refresh_interval = refresh_interval
+        self.rebuild_interval = rebuild_interval
+        self.engine = None
+        self.docs = {}
+        self.versions = {}
+        self.stale = set()
+        self.rebuilt = {}
+
+        self.started_at = datetime.utcnow()
+        self.refreshed_at = None
+        self.refreshes = 0
+        self.requests = 0
+        self.errors = 0
+        self.latencies = deque(maxlen=1000)
+        self._refresh_lock = asyncio.Lock()
+
+    # -----------------------------
+    # Warm state
+    # -----------------------------
+    def _load_side(self, name: str):
+        id_field = SIDE_SPECS[name][0]
+        docs = COLLECTIONS[name].find({}, PROJECTIONS[name])
+        return OrderedDict((d.get(id_field), d) for d in docs)
+
+    def _apply_changes(self, name: str, ids):
+        # Re-reads only the changed documents; load order is kept for the rest
+        id_field = SIDE_SPECS[name][0]
+        docs = self.docs[name]
+        fetched = {
+            d.get(id_field): d
+            for d in COLLECTIONS[name].find({id_field: {"$in": list(ids)}}, PROJECTIONS[name])
+        }
+        for doc_id in ids:
+            if doc_id in fetched:
+                docs[doc_id] = fetched[doc_id]
+            else:
+                docs.pop(doc_id, None)
+
+    def load(self):
+        loaded_at = datetime.utcnow()
+        self.versions = {side: doc.get("version", 0) for side, doc in read_versions().items()}
+        self.docs = {name: self._load_side(name) for name in SIDE_SPECS}
+        self.engine = MatchEngine(
+            list(self.docs["resumes"].values()), list(self.docs["jobs"].values()), loaded_at
+        )
+        self.refreshed_at = loaded_at
+        self.stale = set()
+        self.rebuilt = {name: time.monotonic() for name in SIDE_SPECS}
+        print(f"🔥 Match service loaded {len(self.engine.resumes)} resumes / {len(self.engine.jobs)} jobs")
+
+    def refresh(self, force: bool = False):
+        # Runs in a worker thread; queries keep using the old engine until the swap.
+        # Changed documents are read right away; their side is marked stale and rebuilt
+        # once rebuild_interval has passed since its last rebuild (force: now)
+        loaded_at = datetime.utcnow()
+
+        for side, doc in read_versions().items():
+            if side not in SIDE_SPECS:
+                continue
+            seen = self.versions.get(side, 0)
+            current = doc.get("version", 0)
+            if current == seen:
+                continue
+
+            # Re-reading is idempotent, so a failed read is simply retried next time
+            ids = changed_ids(doc, seen)
+            if ids is None:
+                self.docs[side] = self._load_side(side)
+            else:
+                self._apply_changes(side, ids)
+            self.versions[side] = current
+            self.stale.add(side)
+
+        now = time.monotonic()
+        due = [
+            side for side in SIDE_SPECS
+            if side in self.stale and (force or now - self.rebuilt.get(side, 0) >= self.rebuild_interval)
+        ]
+
+        # Stale flags only clear with the swap, so a failed rebuild is retried
+        engine = self.engine
+        for side in due:
+            engine = engine.replace_side(side, list(self.docs[side].values()), loaded_at)
+        if due:
+            self.engine = engine
+            self.stale.difference_update(due)
+            self.rebuilt.update({side: now for side in due})
+            self.refreshes += 1
+            self.refreshed_at = loaded_at
+            print(f"🔄 Match service refreshed {', '.join(due)}")
+        return due
+
+    async def refresh_periodically(self):
+        while True:
+            await asyncio.sleep(self.refresh_interval)
+            try:
+                async with self._refresh_lock:
+                    await asyncio.to_thread(self.refresh)
+            except Exception as e:
+                print(f"⚠ Match service refresh failed: {e}")
+
+    async def reload(self):
+        async with self._refresh_lock:
+            await asyncio.to_thread(self.load)
+
+    # -----------------------------
+    # Queries
+    # -----------------------------
+    def match(self, kind: str, doc_id: str, top_n: int, profiles):
+        # One profile: a shortlist; several: {profile name: shortlist} from one pass
+        engine = self.engine
+        if kind == "resume":
+            direction, side, label = "resume_to_jobs", engine.resumes, "candidate_id"
+        else:
+            direction, side, label = "job_to_resumes", engine.jobs, "job_id"
+
+        if doc_id not in side.position:
+            raise HTTPError(404, f"unknown {label} {doc_id}")
+        if len(profiles) == 1:
+            return engine.match(direction, doc_id, top_n, profiles[0])
+        return engine.compare_profiles(direction, doc_id, profiles, top_n)
+
+    def match_batch(self, request: dict):
+        engine = self.engine
+        top_n = parse_top_n(request.get("top_n", DEFAULT_TOP_N))
+        profile = parse_profile(request.get("profile"))
+        response = {"top_n": top_n, "profile": profile.name}
+
+        for key, direction, side in (
+            ("resumes", "resume_to_jobs", engine.resumes),
+            ("jobs", "job_to_resumes", engine.jobs),
+        ):
+            ids = request.get(key) or []
+            if not isinstance(ids, list):
+                raise HTTPError(400, f"{key} must be a list of ids")
+
+            rows = [side.position[i] for i in ids if i in side.position]
+            results = {
+                shortlist["source_id"]: shortlist["matches"]
+                for shortlist in iter_all_matches(engine, top_n, (direction,), rows, profile)
+            }
+            response[key] = {i: results.get(i) for i in ids}
+
+        return response
+
+    def stats(self) -> dict:
+        engine = self.engine
+        latencies = sorted(self.latencies)
+        return {
+            "resumes": len(engine.resumes),
+            "jobs": len(engine.jobs),
+            "started_at": self.started_at.isoformat(),
+            "refreshed_at": self.refreshed_at.isoformat() if self.refreshed_at else None,
+            "refreshes": self.refreshes,
+            "versions": self.versions,
+            "stale": sorted(self.stale),
+            "requests": self.requests,
+            "errors": self.errors,
+            "latency_ms": {
+                "avg": statistics.mean(latencies) if latencies else 0,
+                "p50": latencies[len(latencies) // 2] if latencies else 0,
+                "p99": latencies[int(len(latencies) * 0.99)] if latencies else 0,
+            },
+        }
+
+    # -----------------------------
+    # Routing
+    # -----------------------------
+    async def dispatch(self, method: str, target: str, body: bytes):
+        url = urlsplit(target)
+        parts = [unquote(p) for p in url.path.strip("/").split("/") if p]
+        query = parse_qs(url.query)
+
+        if parts == ["health"]:
+            return {"status": "ok", "resumes": len(self.engine.resumes), "jobs": len(self.engine.jobs)}
+
+        if parts == ["stats"]:
+            return self.stats()
+
+        if len(parts) == 3 and parts[0] == "match" and parts[1] in ("resume", "job"):
+            if method != "GET":
+                raise HTTPError(405, "use GET")
+            top_n = parse_top_n(query.get("top_n", [DEFAULT_TOP_N])[0])
+            names = [n for n in ",".join(query.get("profiles", [])).split(",") if n]
+            if not names:
+                names = query.get("profile", [None])[:1]
+            profiles = [parse_profile(n) for n in names]
+
+            response = {"id": parts[2], "top_n": top_n}
+            if len(profiles) == 1:
+                response["profile"] = profiles[0].name
+            response["matches"] = self.match(parts[1], parts[2], top_n, profiles)
+            return response
+
+        if parts == ["match", "batch"]:
+            if method != "POST":
+                raise HTTPError(405, "use POST")
+            try:
+                request = json.loads(body or b"{}")
+            except ValueError:
+                raise HTTPError(400, "body must be JSON")
+            if not isinstance(request, dict):
+                raise HTTPError(400, "body must be a JSON object")
+            # Blocked scoring can take a while for big batches; keep the loop serving
+            return await asyncio.to_thread(self.match_batch, request)
+
+        if parts == ["reload"]:
+            if method != "POST":
+                raise HTTPError(405, "use POST")
+            await self.reload()
+            return {"status": "reloaded", "resumes": len(self.engine.resumes), "jobs": len(self.engine.jobs)}
+
+        raise HTTPError(404, f"no route for {url.path}")
+
+    # -----------------------------
+    # HTTP/1.1
+    # -----------------------------
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+
+                try:
+                    method, target, version = request_line.decode("latin-1").split()
+                except ValueError:
+                    break
+
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+
+                started = time.perf_counter()
+                self.requests += 1
+                keep_alive = version == "HTTP/1.1" and headers.get("connection", "").lower() != "close"
+
+                try:
+                    length = int(headers.get("content-length", "0") or 0)
+                    if length > SERVICE_MAX_BODY_BYTES:
+                        keep_alive = False
+                        raise HTTPError(413, "request body too large")
+                    body = await reader.readexactly(length) if length else b""
+                    status, payload = 200, await self.dispatch(method.upper(), target, body)
+                except HTTPError as e:
+                    status, payload = e.status, {"error": str(e)}
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    raise
+                except Exception as e:
+                    status, payload = 500, {"error": str(e)}
+
+                if status >= 400:
+                    self.errors += 1
+
+                data = json.dumps(payload, default=str).encode("utf-8")
+                writer.write(
+                    (
+                        f"HTTP/1.1 {status} {REASONS.get(status, '')}\r\n"
+                        f"Content-Type: application/json\r\n"
+                        f"Content-Length: {len(data)}\r\n"
+                        f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+                    ).encode("latin-1") + data
+                )
+                await writer.drain()
+                self.latencies.append((time.perf_counter() - started) * 1000)
+
+                if not keep_alive:
+                    break
+
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+
+async def serve(host: str = SERVICE_HOST, port: int = SERVICE_PORT):
+    service = MatchService()
+    await asyncio.to_thread(service.load)
+
+    server = await asyncio.start_server(service.handle_connection, host, port)
+    refresher = asyncio.create_task(service.refresh_periodically())
+    print(f"🚀 Match service listening on http://{host}:{port}")
+
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        refresher.cancel()
+
+
+def run_service(host: str = SERVICE_HOST, port: int = SERVICE_PORT):
+    try:
+        asyncio.run(serve(host, port))
+    except KeyboardInterrupt:
+        print("\nMatch service stopped.")